@@ -0,0 +1,209 @@
+"""
+지역(광역시/도) · 시군구 코드 로컬 인덱스
+
+Tour API areaCode2 결과를 한 번 받아 디스크(JSON)에 저장해 두고,
+요청마다 원격 호출 없이 이름 → 코드를 조회합니다.
+
+    python area_index.py build   # 전체 인덱스 생성 (최초 1회)
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import requests
+from config import TOUR_API_KEY, TOUR_API_BASE_URL, AREA_INDEX_PATH, AREA_INDEX_MAX_AGE
+from metrics import span
+from upstream import tour_upstream
+from log import logger
+
+AREA_CODE_URL = f"{TOUR_API_BASE_URL}/areaCode2"
+
+_SUFFIXES = ("특별자치도", "특별자치시", "특별시", "광역시", "도", "시", "군", "구")
+_STRIP_RE = re.compile(r"[\s\.\,\-·()]")
+
+
+def normalize_name(name: str) -> str:
+    """지역명 정규화 (공백/구두점 제거 후 행정구역 접미사 제거: "강남구" -> "강남")"""
+    name = _STRIP_RE.sub("", name or "")
+    for suffix in _SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix) + 1:
+            return name[:-len(suffix)]
+    return name
+
+
+# 광역시/도 옛 이름·약칭 → 정규화 이름 (주소 데이터와 Tour API 지역명 맞추기)
+AREA_ALIASES = {
+    "전라북": "전북", "전라남": "전남", "경상북": "경북", "경상남": "경남",
+    "충청북": "충북", "충청남": "충남"
+}
+
+
+def normalize_area_name(name: str) -> str:
+    """광역시/도 이름 정규화 ("서울특별시"/"서울" -> "서울", "전라북도"/"전북특별자치도" -> "전북")"""
+    name = normalize_name(name)
+    return AREA_ALIASES.get(name, name)
+
+
+def fetch_area_codes(area_code: Optional[str] = None) -> Dict[str, str]:
+    """areaCode2 호출 → {코드: 이름} (area_code가 없으면 광역시/도 목록)"""
+    params = {
+        "numOfRows": "1000",
+        "serviceKey": TOUR_API_KEY,
+        "MobileOS": "WEB",
+        "MobileApp": "AppTest",
+        "_type": "json"
+    }
+    if area_code:
+        params["areaCode"] = area_code
+    with span("tour_api", op="areaCode2"):
+        response = tour_upstream.call(requests.get, AREA_CODE_URL, params=params)
+    response.raise_for_status()
+    items = response.json()["response"]["body"]["items"]
+    items = items.get("item", []) if isinstance(items, dict) else []
+    if isinstance(items, dict):  # 결과가 1건이면 리스트가 아닌 객체로 옴
+        items = [items]
+    return {str(item["code"]): item["name"] for item in items}
+
+
+class AreaIndex:
+    """광역시/도 코드별 시군구 이름 → 코드 인덱스 (정확 일치 + 정규화 이름 조회)"""
+
+    def __init__(self, path: str = AREA_INDEX_PATH):
+        self.path = path
+        self.built_at = 0.0
+        self.areas: Dict[str, dict] = {}  # area_code -> {"name": str, "sigungu": {code: name}}
+        # (정확 이름 → 코드, 정규화 이름 → 코드) 를 광역시/도별로 묶어 한 번에 교체
+        # (요청 스레드는 잠금 없이 읽으므로 갱신 중에도 이전 인덱스 전체를 보게 됨)
+        self._tables: Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]] = ({}, {})
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.version = 0  # 인덱스가 바뀔 때마다 증가 (파생 인덱스 재생성 판단용)
+
+    # ---------- 조회 ----------
+    def lookup(self, area_code: str, sigungu_name: str) -> Optional[str]:
+        """시군구 코드 조회 (정확 일치 → 정규화 일치 → 부분 일치 순)"""
+        area_code = str(area_code)
+        exact_tables, normalized_tables = self._tables
+        exact = exact_tables.get(area_code)
+        if exact is None:
+            return None
+        code = exact.get(sigungu_name)
+        if code:
+            return code
+        normalized = normalize_name(sigungu_name)
+        code = normalized_tables[area_code].get(normalized)
+        if code:
+            return code
+        for name, code in exact.items():
+            if sigungu_name in name:
+                return code
+        return None
+
+    def has_area(self, area_code: str) -> bool:
+        return str(area_code) in self._tables[0]
+
+    def is_stale(self, max_age: float = AREA_INDEX_MAX_AGE) -> bool:
+        return not self.areas or time.time() - self.built_at > max_age
+
+    # ---------- 갱신 ----------
+    def set_area(self, area_code: str, name: str, sigungu: Dict[str, str]):
+        if not area_code:
+            raise ValueError("광역시/도 코드 없이 시군구 목록을 저장할 수 없습니다")
+        with self._lock:
+            # 복사본을 고쳐 교체 (다른 스레드가 순회 중인 dict 를 바꾸지 않도록)
+            areas = dict(self.areas)
+            areas[str(area_code)] = {"name": name, "sigungu": sigungu}
+            exact, normalized = dict(self._tables[0]), dict(self._tables[1])
+            exact[str(area_code)], normalized[str(area_code)] = self._index_area(sigungu)
+            self.areas = areas
+            self._tables = (exact, normalized)
+            self.version += 1
+
+    def build(self):
+        """Tour API에서 전체 지역/시군구 코드를 받아 인덱스 재생성 후 저장"""
+        areas = {}
+        for area_code, area_name in fetch_area_codes().items():
+            areas[area_code] = {"name": area_name, "sigungu": fetch_area_codes(area_code)}
+        with self._lock:
+            self.areas = areas
+            self.built_at = time.time()
+            self._reindex()
+        self.save()
+        logger.info("🗂️ 지역 코드 인덱스 생성 완료: %s개 지역, %s개 시군구",
+                    len(areas), sum(len(a['sigungu']) for a in areas.values()))
+
+    def refresh_in_background(self, max_age: float = AREA_INDEX_MAX_AGE):
+        """인덱스가 없거나 오래됐으면 백그라운드 스레드에서 재생성"""
+        if not self.is_stale(max_age) or self._refreshing:
+            return
+        self._refreshing = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                logger.warning("⚠️ 지역 코드 인덱스 갱신 실패: %s", e)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="area-index-refresh", daemon=True).start()
+
+    # ---------- 저장/불러오기 ----------
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.warning("⚠️ 지역 코드 인덱스 파일 없음: %s (python area_index.py build 로 생성)", self.path)
+            return False
+        except json.JSONDecodeError:
+            logger.warning("⚠️ 지역 코드 인덱스 파일 손상: %s", self.path)
+            return False
+        with self._lock:
+            # 이전 버전이 광역시/도 코드 없이 저장한 항목("None")은 버림
+            self.areas = {code: area for code, area in data.get("areas", {}).items() if code not in ("", "None")}
+            self.built_at = data.get("built_at", 0.0)
+            self._reindex()
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            data = {"built_at": self.built_at, "areas": self.areas}
+        # 워커마다 다른 임시 파일에 쓴 뒤 원자적 교체 (여러 워커가 동시에 저장해도 안전)
+        fd, tmp_path = tempfile.mkstemp(prefix=".area_index-", suffix=".tmp", dir=os.path.dirname(self.path) or ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _reindex(self):
+        """self.areas 로 조회 테이블을 새로 만들어 한 번에 교체 (self._lock 안에서 호출)"""
+        exact, normalized = {}, {}
+        for area_code, area in self.areas.items():
+            exact[area_code], normalized[area_code] = self._index_area(area["sigungu"])
+        self._tables = (exact, normalized)
+        self.version += 1
+
+    @staticmethod
+    def _index_area(sigungu: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        return ({name: code for code, name in sigungu.items()},
+                {normalize_name(name): code for code, name in sigungu.items()})
+
+
+# 프로세스 전역 인덱스 (서버 시작 시 load)
+area_index = AreaIndex()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        area_index.build()
+    else:
+        print("사용법: python area_index.py build")
@@ -0,0 +1,211 @@
+"""
+벤치마크용 외부 API 대역 서버 (LaaS · Tour API · Tmap)
+
+bench/fixtures/ 의 녹화된 응답을 그대로 돌려주며, 서비스별 지연 시간과 오류를
+주입할 수 있습니다. bench/run.py 가 직접 띄우지만 단독으로도 실행할 수 있습니다.
+
+    FAKE_LATENCY_MS="laas=800,tour=80" FAKE_ERROR_RATE="laas=0.01" \\
+        python -m uvicorn bench.fake_upstream:app --port 9100
+
+환경변수
+- FAKE_LATENCY_MS: 서비스별 평균 지연 (laas, document, tour, tmap)
+- FAKE_JITTER: 지연 흔들림 비율 (0.2 → 평균의 ±20%)
+- FAKE_ERROR_RATE: 서비스별 오류 응답 비율 (0~1, 오류는 503)
+- FAKE_TOUR_TOTAL: areaBasedList2 전체 건수 (녹화 항목을 반복해 페이지를 채움)
+- FAKE_STREAM_CHUNK: 스트리밍 응답 한 조각의 글자 수
+
+LaaS 해시는 "bench-<이름>" 형식이어야 하며 fixtures/laas/<이름>.json 으로 응답합니다.
+(장소 해시에 후보 목록 파라미터가 없으면 선택 장소 추출 응답인 place_pick.json)
+"""
+import asyncio
+import copy
+import json
+import os
+import random
+import threading
+from typing import Dict, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SERVICES = ("laas", "document", "tour", "tmap")
+HASH_PREFIX = "bench-"
+
+
+def parse_spec(value: str, cast=float) -> Dict[str, float]:
+    """"laas=800,tour=80" → {"laas": 800.0, "tour": 80.0} (서비스 이름 없이 숫자만 주면 전체에 적용)"""
+    spec = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            name, number = part.split("=", 1)
+            spec[name.strip()] = cast(number)
+        else:
+            spec.update({name: cast(part) for name in SERVICES})
+    return spec
+
+
+LATENCY_MS = parse_spec(os.getenv("FAKE_LATENCY_MS", "laas=600,document=150,tour=80,tmap=120"))
+JITTER = float(os.getenv("FAKE_JITTER", "0.2"))
+ERROR_RATE = parse_spec(os.getenv("FAKE_ERROR_RATE", ""))
+TOUR_TOTAL = int(os.getenv("FAKE_TOUR_TOTAL", "1200"))
+STREAM_CHUNK = int(os.getenv("FAKE_STREAM_CHUNK", "12"))
+
+
+def _load(*parts: str):
+    with open(os.path.join(FIXTURE_DIR, *parts), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class UpstreamStats:
+    """서비스별 호출/주입 오류 수 (벤치마크 구간마다 앞뒤 차이로 upstream 호출 수 계산)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, service: str, error: bool):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            if error:
+                self.errors[service] = self.errors.get(service, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+
+upstream_stats = UpstreamStats()
+app = FastAPI(title="plogging bench upstream")
+
+
+async def _inject(service: str) -> Optional[JSONResponse]:
+    """지연 후, 오류를 주입할 차례면 503 응답 반환"""
+    latency = LATENCY_MS.get(service, 0.0) / 1000
+    if latency > 0:
+        await asyncio.sleep(max(0.0, latency * random.uniform(1 - JITTER, 1 + JITTER)))
+    error = random.random() < ERROR_RATE.get(service, 0.0)
+    upstream_stats.record(service, error)
+    if error:
+        return JSONResponse({"error": f"injected {service} failure"}, status_code=503)
+    return None
+
+
+# ========================== LaaS ==========================
+def _laas_fixture(data: dict) -> Optional[str]:
+    hash_value = str(data.get("hash") or "")
+    if not hash_value.startswith(HASH_PREFIX):
+        return None
+    name = hash_value[len(HASH_PREFIX):]
+    if name == "place" and not (data.get("params") or {}).get("recommended_place"):
+        name = "place_pick"
+    path = os.path.join(FIXTURE_DIR, "laas", f"{name}.json")
+    return path if os.path.exists(path) else None
+
+
+def _stream_chunks(completion: dict):
+    content = completion["choices"][0]["message"].get("content") or ""
+    for i in range(0, len(content), STREAM_CHUNK):
+        chunk = {"choices": [{"index": 0, "delta": {"content": content[i:i + STREAM_CHUNK]}}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/api/preset/v2/chat/completions")
+async def laas_chat(request: Request):
+    data = await request.json()
+    fixture = _laas_fixture(data)
+    if fixture is None:
+        return JSONResponse({"error": f"unknown hash: {data.get('hash')}"}, status_code=400)
+    failure = await _inject("laas")
+    if failure:
+        return failure
+    completion = _load(fixture)
+    if data.get("stream"):
+        return StreamingResponse(_stream_chunks(completion), media_type="text/event-stream")
+    return completion
+
+
+@app.post("/api/document/{collection_code}/similar/text")
+async def laas_document(collection_code: str, request: Request):
+    data = await request.json()
+    failure = await _inject("document")
+    if failure:
+        return failure
+    documents = _load("laas", "document.json")["data"]
+    offset, limit = int(data.get("offset", 0)), int(data.get("limit", 10))
+    return {"data": documents[offset:offset + limit]}
+
+
+# ========================== Tour API ==========================
+def _envelope(items: list, total: int, rows: int, page: int) -> dict:
+    return {"response": {
+        "header": {"resultCode": "0000", "resultMsg": "OK"},
+        "body": {"items": {"item": items} if items else "", "numOfRows": rows, "pageNo": page, "totalCount": total}
+    }}
+
+
+@app.get("/B551011/KorService2/areaCode2")
+async def tour_area_code(areaCode: Optional[str] = None):
+    failure = await _inject("tour")
+    if failure:
+        return failure
+    name = f"areaCode2-{areaCode}.json" if areaCode else "areaCode2.json"
+    if os.path.exists(os.path.join(FIXTURE_DIR, "tour", name)):
+        return _load("tour", name)
+    return _envelope([], 0, 1000, 1)
+
+
+@app.get("/B551011/KorService2/areaBasedList2")
+async def tour_area_based_list(numOfRows: int = 10, pageNo: int = 1):
+    """녹화 항목을 반복해 TOUR_TOTAL 건짜리 목록을 만들고 요청한 페이지만 반환 (반복분은 contentid/좌표를 살짝 바꿈)"""
+    failure = await _inject("tour")
+    if failure:
+        return failure
+    recorded = _load("tour", "areaBasedList2.json")["response"]["body"]["items"]["item"]
+    start = (pageNo - 1) * numOfRows
+    items = []
+    for n in range(start, min(start + numOfRows, TOUR_TOTAL)):
+        item = copy.copy(recorded[n % len(recorded)])
+        cycle = n // len(recorded)
+        if cycle:
+            item["contentid"] = f"{item['contentid']}{cycle:04d}"
+            # 번호는 괄호 설명 앞에 붙임 ("세텍(SETEC)" → "세텍 2(SETEC)", 제목 매칭은 괄호 속을 무시하므로)
+            base = item["title"].split("(", 1)[0]
+            item["title"] = f"{base.rstrip()} {cycle}{item['title'][len(base):]}"
+            item["mapx"] = f"{float(item['mapx']) + cycle * 0.0003:.10f}"
+            item["mapy"] = f"{float(item['mapy']) - cycle * 0.0002:.10f}"
+        items.append(item)
+    return _envelope(items, TOUR_TOTAL, numOfRows, pageNo)
+
+
+@app.get("/B551011/KorService2/detailCommon2")
+async def tour_detail_common():
+    failure = await _inject("tour")
+    if failure:
+        return failure
+    return _load("tour", "detailCommon2.json")
+
+
+# ========================== Tmap ==========================
+@app.post("/tmap/routes/pedestrian")
+async def tmap_pedestrian():
+    failure = await _inject("tmap")
+    if failure:
+        return failure
+    return _load("tmap", "pedestrian.json")
+
+
+# ========================== 상태 ==========================
+@app.get("/fake/stats")
+async def fake_stats():
+    return {
+        **upstream_stats.snapshot(),
+        "latency_ms": LATENCY_MS,
+        "jitter": JITTER,
+        "error_rate": ERROR_RATE,
+        "tour_total": TOUR_TOTAL
+    }
@@ -0,0 +1,444 @@
+"""
+플로깅 API 부하 테스트 / 벤치마크
+
+외부 API 대역 서버(bench/fake_upstream.py)를 띄우고, API 서버가 그 주소를 쓰도록
+설정해 실행한 뒤 시나리오마다 동시 사용자 수를 바꿔 가며 호출합니다.
+실제 API 쿼터는 쓰지 않으며, 결과(p50/p95/p99, RPS, upstream 호출 수)는
+bench/results/ 에 저장되고 직전 결과와 비교해 회귀를 표시합니다.
+
+    cd backend
+    python -m bench.run                                   # 전체 시나리오, 동시 사용자 1/8/32
+    python -m bench.run -s location_extract,trash_rag -c 1,16,64 -d 20
+    python -m bench.run --latency laas=1500,tour=80 --error-rate laas=0.02
+    python -m bench.run --env LLM_CACHE_HASHES= --workers 2
+    python -m bench.run --compare bench/results/20261018-120000-1a2b3c4.json --fail-on-regression
+
+시나리오
+- location_extract: /location/extract (지역명 사전으로 끝나는 문장과 LLM 이 필요한 문장을 섞음)
+- recommend_region: /recommend/place 지역 요청 (Tour API 후보 + 추천 문구)
+- recommend_pick: /recommend/place 시작 장소 선택 → 경로 최적화 + 경로 문구 (세션마다 지역 요청 후 측정)
+- chat_image: /chat/image (업로드 사진 전처리 + 멀티모달 호출)
+- evaluate_trashbag: /evaluate/trashbag
+- trash_rag: /location/trashRAG (첫 요청만 문서 컬렉션 수집, 이후 로컬 인덱스)
+"""
+import argparse
+import asyncio
+import base64
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench", "results")
+LAAS_HASHES = ("location", "place", "route", "image", "trashbag", "rag")
+SESSION_HEADER = "X-Session-Id"
+
+
+# ========================== 시나리오 ==========================
+class Scenario(NamedTuple):
+    name: str
+    request: Callable[[httpx.AsyncClient, dict], Awaitable[httpx.Response]]
+    setup: Optional[Callable[[httpx.AsyncClient, dict], Awaitable[httpx.Response]]] = None
+
+
+LOCATION_MESSAGES = [
+    "서울 강남구에서 플로깅하고 싶어",
+    "강남구 근처 걷기 좋은 곳 알려줘",
+    "주말에 쓰레기 주우면서 산책할 만한 동네 있을까?",
+    "회사 근처에서 점심시간에 플로깅하고 싶어요",
+]
+
+REGION_SIGUNGU = ["강남구", "서초구", "송파구", "마포구"]
+
+
+def _test_image(side: int) -> str:
+    """전처리가 실제로 일을 하도록 긴 변 side 픽셀의 사진 같은 JPEG 생성 → data URL"""
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    h, w = side * 3 // 4, side
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([(x * 255 // w), (y * 255 // h), ((x + y) * 255 // (w + h))], axis=-1)
+    noisy = np.clip(base + rng.normal(0, 24, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(noisy).save(buffer, format="JPEG", quality=92)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def build_scenarios(image_url: str) -> Dict[str, Scenario]:
+    async def location_extract(client, state):
+        state["n"] += 1
+        message = LOCATION_MESSAGES[state["n"] % len(LOCATION_MESSAGES)]
+        return await client.post("/location/extract", json={"user_message": message}, headers=state["headers"])
+
+    async def recommend_region(client, state):
+        # 같은 세션에서 이미 보여준 지역을 다시 말하면 선택 장소로 처리하므로 요청마다 구를 바꿈
+        state["n"] += 1
+        sigungu = REGION_SIGUNGU[state["n"] % len(REGION_SIGUNGU)]
+        response = await client.post("/recommend/place", headers=state["headers"], json={
+            "user_message": f"서울 {sigungu}에서 플로깅 장소 추천해줘", "area_name": "서울", "sigungu_name": sigungu
+        })
+        if response.status_code == 200:
+            state["places"] = [p["title"] for p in response.json().get("recommended_places", [])]
+        return response
+
+    async def recommend_pick(client, state):
+        # 후보는 세션마다 무작위로 뽑히므로 이 세션이 받은 후보 중 하나를 고름
+        places = state.get("places") or ["봉은사"]
+        title = places[state["requests"] % len(places)]
+        return await client.post("/recommend/place", headers=state["headers"], json={
+            "user_message": f"{title}에서 시작할게", "area_name": "서울", "sigungu_name": "강남구"
+        })
+
+    async def chat_image(client, state):
+        return await client.post("/chat/image", headers=state["headers"], json={
+            "user_message": "이 장소 플로깅하기 어때?", "image_url": image_url
+        })
+
+    async def evaluate_trashbag(client, state):
+        return await client.post("/evaluate/trashbag", headers=state["headers"], json={
+            "prompt": "이 쓰레기 봉투가 플로깅 인증 기준에 맞는지 판단해줘", "image_base64": image_url
+        })
+
+    async def trash_rag(client, state):
+        return await client.post("/location/trashRAG", headers=state["headers"], json={
+            "area_name": "서울", "sigungu_name": "강남구"
+        })
+
+    return {s.name: s for s in [
+        Scenario("location_extract", location_extract),
+        Scenario("recommend_region", recommend_region),
+        Scenario("recommend_pick", recommend_pick, setup=recommend_region),
+        Scenario("chat_image", chat_image),
+        Scenario("evaluate_trashbag", evaluate_trashbag),
+        Scenario("trash_rag", trash_rag),
+    ]}
+
+
+def is_success(response: httpx.Response) -> bool:
+    """HTTP 200 이고 본문에 오류 표시가 없으면 성공 (이 API는 오류도 200 으로 돌려주는 경우가 많음)"""
+    if response.status_code != 200:
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and "error" not in body and body.get("success", True) is not False
+
+
+# ========================== 부하 생성 ==========================
+async def _new_session(client: httpx.AsyncClient, scenario: Scenario) -> dict:
+    state = {"headers": {SESSION_HEADER: uuid.uuid4().hex}, "n": 0, "requests": 0}
+    if scenario.setup:
+        await scenario.setup(client, state)
+    return state
+
+
+async def run_level(base_url: str, scenario: Scenario, concurrency: int, duration: float,
+                    warmup: float, session_requests: int, timeout: float) -> dict:
+    """
+    동시 사용자 concurrency 명이 쉬지 않고 요청 (closed loop)
+    - warmup 초 동안의 응답은 버리고, 이후 duration 초 동안 시작한 요청만 집계
+    - 사용자마다 세션을 따로 쓰고 session_requests 번마다 새 세션으로 교체 (대화 기록이 끝없이 늘지 않도록)
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    loop = asyncio.get_running_loop()
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        measure_from = loop.time() + warmup
+        measure_until = measure_from + duration
+        last_done = measure_from
+
+        async def user():
+            nonlocal last_done
+            state = None
+            while loop.time() < measure_until:
+                if state is None or state["requests"] >= session_requests:
+                    try:
+                        state = await _new_session(client, scenario)
+                    except httpx.HTTPError:
+                        state = None
+                        continue
+                started_at = loop.time()
+                started = time.perf_counter()
+                try:
+                    response = await scenario.request(client, state)
+                    error = None
+                    if response.status_code != 200:
+                        error = f"http_{response.status_code}"
+                    elif not is_success(response):
+                        error = "error_body"
+                except httpx.HTTPError as e:
+                    error = type(e).__name__
+                elapsed = time.perf_counter() - started
+                state["requests"] += 1
+                if started_at < measure_from:
+                    continue
+                last_done = max(last_done, loop.time())
+                latencies.append(elapsed)
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    window = max(last_done - measure_from, 1e-9)
+    count = len(latencies)
+    failed = sum(errors.values())
+    result = {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": failed,
+        "error_kinds": errors,
+        "error_rate": round(failed / count, 4) if count else 0.0,
+        "rps": round(count / window, 2),
+    }
+    if count:
+        ms = np.asarray(latencies) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        result["latency_ms"] = {
+            "p50": round(float(p50), 1), "p95": round(float(p95), 1), "p99": round(float(p99), 1),
+            "mean": round(float(ms.mean()), 1), "max": round(float(ms.max()), 1)
+        }
+    return result
+
+
+# ========================== 프로세스 관리 ==========================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"서버가 시작하지 못했습니다: {url} (exit {process.returncode})")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"서버 준비 시간 초과: {url}")
+
+
+def _uvicorn(target: str, port: int, env: dict, workers: int = 1) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def app_env(fake_url: str, data_dir: str, overrides: Dict[str, str]) -> dict:
+    """API 서버 환경변수: 외부 API 주소를 대역 서버로, 데이터/세션 파일은 임시 디렉터리로"""
+    env = dict(os.environ)
+    env.update({
+        "LAAS_URL": f"{fake_url}/api/preset/v2/chat/completions",
+        "LAAS_DOCUMENT_URL": f"{fake_url}/api/document",
+        "TOUR_API_BASE_URL": f"{fake_url}/B551011/KorService2",
+        "TMAP_BASE_URL": fake_url,
+        "LAAS_API_KEY": "bench", "PROJECT_CODE": "bench", "TMAP_API_KEY": "bench", "Tour_API_KEY": "bench",
+        "DATA_DIR": data_dir,
+        "SESSION_DB_PATH": os.path.join(data_dir, "sessions.sqlite3"),
+        "BLOB_DB_PATH": os.path.join(data_dir, "blobs.sqlite3"),
+        "LOG_LEVEL": "WARNING",
+        "UVICORN_WORKERS": "1",
+    })
+    env.update({f"HASH_{name.upper()}": f"bench-{name}" for name in LAAS_HASHES})
+    env.update(overrides)
+    return env
+
+
+def _git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown",
+            "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+# ========================== 결과 저장 / 비교 ==========================
+def _key(result: dict) -> tuple:
+    return result["scenario"], result["concurrency"]
+
+
+def latest_result(exclude: Optional[str] = None) -> Optional[str]:
+    paths = sorted(p for p in glob.glob(os.path.join(RESULTS_DIR, "*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def _delta(now: float, before: float) -> str:
+    if not before:
+        return ""
+    return f"{(now - before) / before * 100:+.0f}%"
+
+
+def report(results: List[dict], baseline: Optional[dict], threshold: float) -> List[str]:
+    """결과 표 출력 → 회귀 항목 목록 (p95 가 threshold 이상 늘었거나 RPS 가 threshold 이상 줄어든 경우)"""
+    before = {_key(r): r for r in (baseline or {}).get("results", [])}
+    regressions = []
+    header = f"{'scenario':<20}{'c':>4}{'req':>7}{'err%':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'Δp95':>8}{'Δrps':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        lat = r.get("latency_ms", {})
+        line = (f"{r['scenario']:<20}{r['concurrency']:>4}{r['requests']:>7}{r['error_rate'] * 100:>6.1f}%"
+                f"{r['rps']:>9.1f}{lat.get('p50', 0):>9.1f}{lat.get('p95', 0):>9.1f}{lat.get('p99', 0):>9.1f}")
+        old = before.get(_key(r))
+        if old and lat:
+            old_p95 = old.get("latency_ms", {}).get("p95", 0)
+            line += f"{_delta(lat['p95'], old_p95):>8}{_delta(r['rps'], old['rps']):>8}"
+            if (old_p95 and lat["p95"] > old_p95 * (1 + threshold)) or \
+                    (old["rps"] and r["rps"] < old["rps"] * (1 - threshold)):
+                regressions.append(f"{r['scenario']} c={r['concurrency']}")
+                line += "  ⚠️"
+        print(line)
+    return regressions
+
+
+# ========================== 실행 ==========================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="플로깅 API 부하 테스트 (외부 API 대역 서버 사용)")
+    parser.add_argument("-s", "--scenarios", default="all", help="쉼표로 구분한 시나리오 이름 (기본: 전체)")
+    parser.add_argument("-c", "--concurrency", default="1,8,32", help="동시 사용자 수 목록 (기본: 1,8,32)")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="단계별 측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="단계별 워밍업 시간 (초, 집계 제외)")
+    parser.add_argument("--session-requests", type=int, default=10, help="세션 하나로 보낼 요청 수")
+    parser.add_argument("--timeout", type=float, default=60.0, help="요청 타임아웃 (초)")
+    parser.add_argument("--latency", default="laas=600,document=150,tour=80,tmap=120",
+                        help="대역 서버 지연 (ms, 예: laas=800,tour=80)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="지연 흔들림 비율")
+    parser.add_argument("--error-rate", default="", help="대역 서버 오류 비율 (예: laas=0.01,tour=0.05)")
+    parser.add_argument("--tour-total", type=int, default=1200, help="대역 Tour API 지역 목록 건수")
+    parser.add_argument("--image-side", type=int, default=2400, help="테스트 사진 긴 변 픽셀")
+    parser.add_argument("--workers", type=int, default=1, help="API 서버 uvicorn 워커 수")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="API 서버 환경변수 추가/덮어쓰기")
+    parser.add_argument("--target", help="이미 떠 있는 API 서버 주소 (지정하면 서버/대역 서버를 띄우지 않음)")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: bench/results/<시각>-<커밋>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON (기본: bench/results/ 의 가장 최근 결과)")
+    parser.add_argument("--threshold", type=float, default=0.15, help="회귀로 볼 p95 증가 / RPS 감소 비율")
+    parser.add_argument("--fail-on-regression", action="store_true", help="회귀가 있으면 종료 코드 1")
+    return parser.parse_args(argv)
+
+
+async def run_all(args, base_url: str, scenarios: List[Scenario], fake_url: Optional[str]) -> List[dict]:
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    results = []
+    async with httpx.AsyncClient(timeout=10.0) as probe:
+        for scenario in scenarios:
+            for concurrency in levels:
+                before = (await probe.get(f"{fake_url}/fake/stats")).json()["calls"] if fake_url else None
+                result = await run_level(base_url, scenario, concurrency, args.duration, args.warmup,
+                                         args.session_requests, args.timeout)
+                if fake_url:
+                    after = (await probe.get(f"{fake_url}/fake/stats")).json()["calls"]
+                    # 워밍업 포함 구간 동안 실제로 나간 upstream 호출 수 (캐시/합치기 효과 확인용)
+                    result["upstream_calls"] = {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+                results.append(result)
+                lat = result.get("latency_ms", {})
+                print(f"  {scenario.name} c={concurrency}: {result['rps']} rps, "
+                      f"p50 {lat.get('p50')}ms, p95 {lat.get('p95')}ms, 오류 {result['errors']}건")
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    overrides = dict(item.split("=", 1) for item in args.env)
+    scenarios_by_name = build_scenarios(_test_image(args.image_side))
+    names = list(scenarios_by_name) if args.scenarios == "all" else [n.strip() for n in args.scenarios.split(",")]
+    unknown = [n for n in names if n not in scenarios_by_name]
+    if unknown:
+        print(f"⚠️ 알 수 없는 시나리오: {', '.join(unknown)} (가능: {', '.join(scenarios_by_name)})")
+        return 2
+
+    processes = []
+    data_dir = tempfile.mkdtemp(prefix="plogging-bench-")
+    try:
+        fake_url = None
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            fake_port, app_port = _free_port(), _free_port()
+            fake_url = f"http://127.0.0.1:{fake_port}"
+            fake_env = {**os.environ, "FAKE_LATENCY_MS": args.latency, "FAKE_JITTER": str(args.jitter),
+                        "FAKE_ERROR_RATE": args.error_rate, "FAKE_TOUR_TOTAL": str(args.tour_total)}
+            processes.append(_uvicorn("bench.fake_upstream:app", fake_port, fake_env))
+            _wait_ready(f"{fake_url}/fake/stats", processes[-1])
+
+            env = app_env(fake_url, data_dir, overrides)
+            # 지역 코드 인덱스는 서버 시작 전에 대역 서버에서 미리 생성 (워커마다 따로 만들지 않도록)
+            subprocess.run([sys.executable, "area_index.py", "build"], cwd=BACKEND_DIR, env=env, check=True)
+            base_url = f"http://127.0.0.1:{app_port}"
+            processes.append(_uvicorn("main:app", app_port, env, workers=args.workers))
+            _wait_ready(f"{base_url}/stats", processes[-1])
+
+        print(f"🚀 벤치마크 시작: {base_url} (시나리오 {len(names)}개, 동시 사용자 {args.concurrency})")
+        results = asyncio.run(run_all(args, base_url, [scenarios_by_name[n] for n in names], fake_url))
+        try:
+            app_stats = httpx.get(f"{base_url}/stats", timeout=10.0).json()
+        except (httpx.HTTPError, ValueError):
+            app_stats = None
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    revision = _git_revision()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision['commit']}.json")
+    baseline_path = args.compare or latest_result(exclude=output)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    document = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": revision,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "fail_on_regression")},
+        "results": results,
+        "app_stats": app_stats,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=1)
+
+    print()
+    if baseline:
+        print(f"📊 비교 기준: {os.path.relpath(baseline_path)} ({baseline.get('revision', {}).get('commit')})")
+    regressions = report(results, baseline, args.threshold)
+    print(f"\n💾 결과 저장: {os.path.relpath(output)}")
+    if regressions:
+        print(f"⚠️ 회귀 {len(regressions)}건: {', '.join(regressions)}")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+이미지 블롭 저장소 (내용 해시 기반)
+
+대화 기록에는 이미지(data URL) 대신 "blob:<sha256>" 참조만 남기고,
+LaaS 로 보낼 때 현재 턴(마지막 메시지)의 참조만 실제 이미지로 펼칩니다.
+이전 턴의 이미지는 "[이전 이미지]" 텍스트로 대체되어 매 호출마다 다시 올라가지 않습니다.
+
+- memory: 프로세스 내부 LRU (TTL + 바이트 상한)
+- sqlite: 멀티 워커 공유 (세션 저장소가 sqlite 일 때)
+"""
+import copy
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from ttl_cache import TTLCache
+from config import SESSION_BACKEND, BLOB_DB_PATH, BLOB_TTL, BLOB_MAX_BYTES
+
+BLOB_PREFIX = "blob:"
+BLOB_PLACEHOLDER = "[이전 이미지]"
+
+
+def blob_id(data: str) -> str:
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def is_ref(url: Any) -> bool:
+    return isinstance(url, str) and url.startswith(BLOB_PREFIX)
+
+
+class BlobStore(ABC):
+    """참조 ID -> 이미지 data URL 저장소 인터페이스"""
+
+    @abstractmethod
+    def put(self, data: str) -> str:
+        """저장 후 참조 문자열 반환 (같은 내용은 한 번만 저장)"""
+
+    @abstractmethod
+    def get(self, ref: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class MemoryBlobStore(BlobStore):
+    def __init__(self, ttl: float = BLOB_TTL, max_bytes: int = BLOB_MAX_BYTES):
+        self._cache = TTLCache(maxsize=1_000_000, ttl=ttl, max_bytes=max_bytes, sizeof=len)
+
+    def put(self, data: str) -> str:
+        key = blob_id(data)
+        self._cache.set(key, data)  # 이미 있으면 TTL/LRU 순서만 갱신
+        return BLOB_PREFIX + key
+
+    def get(self, ref: str) -> Optional[str]:
+        return self._cache.get(ref[len(BLOB_PREFIX):])
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SqliteBlobStore(BlobStore):
+    """
+    SQLite 기반 블롭 저장소 (uvicorn 멀티 워커 간 공유)
+    - 저장 시 TTL 만료분과 바이트 상한 초과분(오래 안 쓴 순)을 주기적으로 정리
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str = BLOB_DB_PATH, ttl: float = BLOB_TTL, max_bytes: int = BLOB_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_accessed ON blobs(accessed_at)")
+
+    def put(self, data: str) -> str:
+        key = blob_id(data)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO blobs (id, data, size, accessed_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET accessed_at = excluded.accessed_at",
+                (key, data, len(data), now)
+            )
+            if now - self._last_prune >= self.PRUNE_INTERVAL:
+                self._prune(now)
+        return BLOB_PREFIX + key
+
+    def get(self, ref: str) -> Optional[str]:
+        key = ref[len(BLOB_PREFIX):]
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT data, accessed_at FROM blobs WHERE id = ?", (key,)).fetchone()
+            if row is None or row[1] + self.ttl <= now:
+                return None
+            self._conn.execute("UPDATE blobs SET accessed_at = ? WHERE id = ?", (now, key))
+        return row[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"backend": "sqlite", "size": count, "bytes": size}
+
+    def _prune(self, now: float):
+        self._last_prune = now
+        self._conn.execute("DELETE FROM blobs WHERE accessed_at < ?", (now - self.ttl,))
+        # 최근 사용 순으로 누적 크기가 상한을 넘는 블롭 제거
+        self._conn.execute(
+            "DELETE FROM blobs WHERE id IN ("
+            " SELECT id FROM (SELECT id, SUM(size) OVER (ORDER BY accessed_at DESC) AS total FROM blobs)"
+            " WHERE total > ?)",
+            (self.max_bytes,)
+        )
+
+
+def create_blob_store(backend: Optional[str] = None) -> BlobStore:
+    """세션 저장소와 같은 백엔드 사용 (멀티 워커면 sqlite)"""
+    backend = (backend or SESSION_BACKEND).lower()
+    if backend == "sqlite":
+        return SqliteBlobStore()
+    return MemoryBlobStore()
+
+
+blob_store = create_blob_store()
+
+
+def store_image(url: str) -> str:
+    """data URL 은 블롭으로 저장하고 참조 반환 (http URL 등 짧은 값은 그대로)"""
+    if url.startswith("data:"):
+        return blob_store.put(url)
+    return url
+
+
+def expand_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    LaaS 전송용 메시지 구성
+    - 마지막 메시지(현재 턴)의 이미지 참조만 실제 data URL 로 펼침
+    - 그 외 이미지 참조와 만료된 참조는 텍스트 자리표시자로 대체
+    원본 기록은 수정하지 않습니다.
+    """
+    result = []
+    last = len(messages) - 1
+    for i, message in enumerate(messages):
+        content = message.get("content")
+        if not isinstance(content, list) or not any(_ref_of(part) for part in content):
+            result.append(message)
+            continue
+        parts = []
+        for part in content:
+            ref = _ref_of(part)
+            if ref is None:
+                parts.append(part)
+                continue
+            data = blob_store.get(ref) if i == last else None
+            if data is None:
+                parts.append({"type": "text", "text": BLOB_PLACEHOLDER})
+            else:
+                expanded = copy.deepcopy(part)
+                expanded["image_url"]["url"] = data
+                parts.append(expanded)
+        result.append({**message, "content": parts})
+    return result
+
+
+def _ref_of(part: Any) -> Optional[str]:
+    if isinstance(part, dict) and part.get("type") == "image_url":
+        url = (part.get("image_url") or {}).get("url")
+        if is_ref(url):
+            return url
+    return None
@@ -0,0 +1,152 @@
+"""
+추천 후보 목록 열(column) 저장소
+
+Tour API 후보는 문자열 딕셔너리 목록으로 오지만, 세션에는 열 단위로 보관합니다.
+- 좌표: float64 배열 (받을 때 한 번만 파싱, 없거나 잘못된 값은 NaN)
+- contentid: int64 배열 (숫자가 아니면 -1)
+- 제목/주소/개요: sys.intern 으로 같은 문자열은 한 번만 보관 (같은 지역 후보를 받은 세션끼리 공유)
+- 행 접근: store[i] → __slots__ 레코드 Candidate
+응답용 JSON 목록(to_list)과 LLM 프롬프트용 목록(places_text)을 같은 저장소에서 만듭니다.
+"""
+import math
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+from geo import PointIndex
+
+FIELDS = ("title", "address", "contentid", "overview", "mapx", "mapy")
+
+
+def _float(value: Any) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def _id(value: Any) -> int:
+    text = str(value or "")
+    return int(text) if text.isdigit() else -1
+
+
+def _text(value: Any) -> str:
+    return sys.intern(str(value)) if value else ""
+
+
+class Candidate:
+    """후보 한 건 (행 접근용, 저장소에서 필요할 때 만듦)"""
+    __slots__ = FIELDS
+
+    def __init__(self, title: str, address: str, contentid: int, overview: str, mapx: float, mapy: float):
+        self.title = title
+        self.address = address
+        self.contentid = contentid
+        self.overview = overview
+        self.mapx = mapx
+        self.mapy = mapy
+
+    def to_dict(self, fields: Sequence[str] = FIELDS) -> Dict[str, Any]:
+        """응답 JSON 형태 (좌표는 숫자, 없으면 None / contentid 는 문자열)"""
+        row = {}
+        for field in fields:
+            value = getattr(self, field)
+            if field == "contentid":
+                value = str(value) if value >= 0 else ""
+            elif field in ("mapx", "mapy"):
+                value = None if math.isnan(value) else value
+            row[field] = value
+        return row
+
+
+class CandidateStore:
+    __slots__ = ("titles", "addresses", "overviews", "contentids", "lons", "lats", "_index")
+
+    def __init__(self, titles: List[str], addresses: List[str], overviews: List[str],
+                 contentids: np.ndarray, lons: np.ndarray, lats: np.ndarray):
+        self.titles = titles
+        self.addresses = addresses
+        self.overviews = overviews
+        self.contentids = contentids
+        self.lons = lons
+        self.lats = lats
+        self._index: Optional[PointIndex] = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> "CandidateStore":
+        """normalize_item 형태의 딕셔너리 목록 → 저장소"""
+        items = list(items)
+        return cls(
+            [_text(item.get("title")) for item in items],
+            [_text(item.get("address")) for item in items],
+            [_text(item.get("overview")) for item in items],
+            np.array([_id(item.get("contentid")) for item in items], dtype=np.int64),
+            np.array([_float(item.get("mapx")) for item in items], dtype=float),
+            np.array([_float(item.get("mapy")) for item in items], dtype=float)
+        )
+
+    # ---------- 세션 저장 ----------
+    def to_columns(self) -> Dict[str, list]:
+        """세션 저장소용 직렬화 (열 단위, JSON 에 NaN 을 쓰지 않도록 None)"""
+        return {
+            "title": self.titles,
+            "address": self.addresses,
+            "overview": self.overviews,
+            "contentid": self.contentids.tolist(),
+            "mapx": [None if math.isnan(x) else x for x in self.lons.tolist()],
+            "mapy": [None if math.isnan(y) else y for y in self.lats.tolist()]
+        }
+
+    @classmethod
+    def from_columns(cls, data: Dict[str, list]) -> "CandidateStore":
+        return cls(
+            [_text(t) for t in data.get("title", [])],
+            [_text(a) for a in data.get("address", [])],
+            [_text(o) for o in data.get("overview", [])],
+            np.array(data.get("contentid", []), dtype=np.int64),
+            np.array([_float(x) for x in data.get("mapx", [])], dtype=float),
+            np.array([_float(y) for y in data.get("mapy", [])], dtype=float)
+        )
+
+    @classmethod
+    def load(cls, data: Any) -> "CandidateStore":
+        """세션 데이터 복원 (열 형식, 이전 버전의 딕셔너리 목록 모두 허용)"""
+        if isinstance(data, dict):
+            return cls.from_columns(data)
+        return cls.from_items(data or [])
+
+    # ---------- 조회 ----------
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __getitem__(self, i: int) -> Candidate:
+        return Candidate(self.titles[i], self.addresses[i], int(self.contentids[i]), self.overviews[i],
+                         float(self.lons[i]), float(self.lats[i]))
+
+    def __iter__(self) -> Iterator[Candidate]:
+        return (self[i] for i in range(len(self)))
+
+    def find_title(self, title: str) -> Optional[int]:
+        return next((i for i, t in enumerate(self.titles) if t == title), None)
+
+    def point_index(self) -> PointIndex:
+        """좌표가 있는 후보만으로 KD-tree (결과 인덱스는 저장소 인덱스, 처음 한 번만 생성)"""
+        if self._index is None:
+            valid = np.isfinite(self.lons) & np.isfinite(self.lats)
+            self._index = PointIndex(self.lons[valid], self.lats[valid], np.flatnonzero(valid))
+        return self._index
+
+    # ---------- 출력 ----------
+    def to_list(self, indices: Optional[Iterable[int]] = None, fields: Sequence[str] = FIELDS) -> List[Dict[str, Any]]:
+        """응답 JSON 목록 (indices 순서대로, 기본은 전체)"""
+        indices = range(len(self)) if indices is None else indices
+        return [self[i].to_dict(fields) for i in indices]
+
+    def places_text(self) -> str:
+        """LLM 프롬프트용 후보 목록 ("- 제목: 주소" 줄)"""
+        return "\n".join(f"- {title}: {address}" for title, address in zip(self.titles, self.addresses))
+
+    def nbytes(self) -> int:
+        """대략적인 메모리 크기 (배열 + 문자열 길이, 공유되는 문자열도 세션마다 셈)"""
+        strings = sum(len(s) for column in (self.titles, self.addresses, self.overviews) for s in column)
+        return self.contentids.nbytes + self.lons.nbytes + self.lats.nbytes + strings
@@ -0,0 +1,153 @@
+import json
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+from config import HASH_LOCATION, HASH_PLACE, HASH_ROUTE, HASH_IMAGE, HASH_TRASHBAG, HASH_RAG, CONTEXT_SUMMARY_BYTES
+
+
+class ContextBudget(NamedTuple):
+    max_messages: int  # 최근 메시지 최대 개수 (마지막 사용자 메시지 포함)
+    max_bytes: int     # 최근 메시지 JSON 바이트 합계 상한
+    summarize: bool    # 잘려 나간 이전 대화를 요약 메시지로 포함할지 여부
+
+
+# 해시(프롬프트)별로 실제로 필요한 만큼만 대화 기록을 보냄
+# - LOCATION: 직전 문맥 약간 (지역 재질문 대응, 단 응답 캐시/동시 호출 합치기 대상이면 현재 메시지만 - laas_api.STATELESS_HASHES)
+# - PLACE: 직전 추천 답변 + 사용자 선택 (후보 목록은 params로 전달됨)
+# - ROUTE / RAG: 경로·지역 정보가 params/메시지에 모두 담겨 있어 현재 메시지만 필요
+# - TRASHBAG: 이미지 메시지 + 판단 요청
+DEFAULT_BUDGET = ContextBudget(max_messages=6, max_bytes=16_000, summarize=True)
+CONTEXT_BUDGETS: Dict[str, ContextBudget] = {
+    hash: budget for hash, budget in [
+        (HASH_LOCATION, ContextBudget(max_messages=4, max_bytes=4_000, summarize=True)),
+        (HASH_PLACE, ContextBudget(max_messages=4, max_bytes=12_000, summarize=True)),
+        (HASH_ROUTE, ContextBudget(max_messages=1, max_bytes=8_000, summarize=False)),
+        (HASH_IMAGE, ContextBudget(max_messages=4, max_bytes=16_000, summarize=True)),
+        (HASH_TRASHBAG, ContextBudget(max_messages=2, max_bytes=16_000, summarize=False)),
+        (HASH_RAG, ContextBudget(max_messages=1, max_bytes=4_000, summarize=False)),
+    ] if hash  # 환경변수가 없는 해시는 기본 예산 사용
+}
+
+SUMMARY_SNIPPET_CHARS = 80
+
+# 지표 라벨용 해시 이름 (해시 값 대신 사람이 읽을 수 있는 이름)
+HASH_NAMES: Dict[str, str] = {
+    hash: name for hash, name in [
+        (HASH_LOCATION, "location"), (HASH_PLACE, "place"), (HASH_ROUTE, "route"),
+        (HASH_IMAGE, "image"), (HASH_TRASHBAG, "trashbag"), (HASH_RAG, "rag"),
+    ] if hash
+}
+
+
+def hash_name(hash: str) -> str:
+    return HASH_NAMES.get(hash, "other")
+
+
+def get_budget(hash: str) -> ContextBudget:
+    return CONTEXT_BUDGETS.get(hash, DEFAULT_BUDGET)
+
+
+def message_size(message: Dict[str, Any]) -> int:
+    """메시지가 페이로드에서 차지하는 바이트 수"""
+    return len(json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+def _snippet(content: Any) -> str:
+    """요약용으로 메시지 내용을 짧게 자름 (이미지는 자리표시자로 대체)"""
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if part.get("type") == "text":
+                parts.append(part.get("text", ""))
+            else:
+                parts.append("[이미지]")
+        content = " ".join(parts)
+    text = " ".join(str(content).split())
+    if len(text) > SUMMARY_SNIPPET_CHARS:
+        text = text[:SUMMARY_SNIPPET_CHARS] + "…"
+    return text
+
+
+def summarize(messages: List[Dict[str, Any]], max_bytes: int = CONTEXT_SUMMARY_BYTES) -> str:
+    """이전 대화를 한 줄씩 요약 (최근 대화 우선, max_bytes 이내)"""
+    lines = []
+    used = 0
+    for message in reversed(messages):
+        line = f"{message.get('role')}: {_snippet(message.get('content'))}"
+        size = len(line.encode("utf-8")) + 1
+        if used + size > max_bytes:
+            break
+        lines.append(line)
+        used += size
+    lines.reverse()
+    return "\n".join(lines)
+
+
+def build_context(history: List[Dict[str, Any]], hash: str) -> List[Dict[str, Any]]:
+    """
+    해시별 예산에 맞춰 LaaS로 보낼 메시지 목록을 구성합니다.
+    - 최근 메시지를 뒤에서부터 개수/바이트 예산 안에서 채움 (마지막 메시지는 항상 포함)
+    - 예산 밖의 이전 대화는 요약 메시지 하나로 접음
+    """
+    if not history:
+        return []
+    budget = get_budget(hash)
+    recent = []
+    used = 0
+    for message in reversed(history):
+        size = message_size(message)
+        if recent and (len(recent) >= budget.max_messages or used + size > budget.max_bytes):
+            break
+        recent.append(message)
+        used += size
+    recent.reverse()
+
+    older = history[:len(history) - len(recent)]
+    if older and budget.summarize:
+        summary = summarize(older)
+        if summary:
+            return [{"role": "system", "content": f"이전 대화 요약:\n{summary}"}] + recent
+    return recent
+
+
+class ContextStats:
+    """해시 이름별 페이로드 크기(전체 기록 대비 실제 전송)와 지연 시간 누적 (/stats 에 해시 값은 노출하지 않음)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, hash: str, full_bytes: int, sent_bytes: int, latency: float,
+               first_content: Optional[float] = None):
+        """first_content: 스트리밍 호출에서 첫 내용이 도착하기까지 걸린 시간"""
+        with self._lock:
+            s = self._stats.setdefault(hash_name(hash), {
+                "calls": 0, "full_bytes": 0, "sent_bytes": 0, "latency_total": 0.0, "latency_max": 0.0,
+                "streams": 0, "first_content_total": 0.0
+            })
+            if first_content is not None:
+                s["streams"] += 1
+                s["first_content_total"] += first_content
+            s["calls"] += 1
+            s["full_bytes"] += full_bytes
+            s["sent_bytes"] += sent_bytes
+            s["latency_total"] += latency
+            s["latency_max"] = max(s["latency_max"], latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for name, s in self._stats.items():
+                calls = s["calls"] or 1
+                result[name] = {
+                    "calls": s["calls"],
+                    "avg_full_bytes": round(s["full_bytes"] / calls),
+                    "avg_sent_bytes": round(s["sent_bytes"] / calls),
+                    "saved_ratio": round(1 - s["sent_bytes"] / s["full_bytes"], 3) if s["full_bytes"] else 0.0,
+                    "avg_latency_ms": round(s["latency_total"] / calls * 1000, 1),
+                    "max_latency_ms": round(s["latency_max"] * 1000, 1),
+                    "avg_first_content_ms": round(s["first_content_total"] / s["streams"] * 1000, 1) if s["streams"] else None
+                }
+            return result
+
+
+context_stats = ContextStats()
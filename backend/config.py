@@ -16,6 +16,109 @@ TMAP_API_KEY = os.getenv("TMAP_API_KEY")
 HASH_TRASHBAG = os.getenv("HASH_TRASHBAG")
 HASH_RAG = os.getenv("HASH_RAG")
 TOUR_API_KEY = os.getenv("Tour_API_KEY")
+
+# 외부 API 기본 주소 (벤치마크에서 bench/fake_upstream.py 대역 서버로 바꿀 때 지정)
+TOUR_API_BASE_URL = os.getenv("TOUR_API_BASE_URL", "http://apis.data.go.kr/B551011/KorService2").rstrip("/")
+TMAP_BASE_URL = os.getenv("TMAP_BASE_URL", "https://apis.openapi.sk.com").rstrip("/")
+LAAS_DOCUMENT_URL = os.getenv("LAAS_DOCUMENT_URL", "https://api-laas.wanted.co.kr/api/document").rstrip("/")
+
+# Tmap 보행자 경로 캐시 (좌표는 소수점 TMAP_COORD_PRECISION 자리로 묶음, 4자리 ≈ 10m)
+TMAP_TIMEOUT = float(os.getenv("TMAP_TIMEOUT", "10"))
+TMAP_CACHE_TTL = float(os.getenv("TMAP_CACHE_TTL", str(24 * 3600)))
+TMAP_CACHE_SIZE = int(os.getenv("TMAP_CACHE_SIZE", "2000"))
+TMAP_COORD_PRECISION = int(os.getenv("TMAP_COORD_PRECISION", "4"))
+
+# 로컬 데이터 경로 (지역 코드 인덱스 등)
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+AREA_INDEX_PATH = os.getenv("AREA_INDEX_PATH", os.path.join(DATA_DIR, "area_codes.json"))
+AREA_INDEX_MAX_AGE = float(os.getenv("AREA_INDEX_MAX_AGE", str(7 * 24 * 3600)))
+
+# Tour API 지역 관광지 목록 캐시 (SQLite, 초 단위)
+TOUR_CACHE_PATH = os.getenv("TOUR_CACHE_PATH", os.path.join(DATA_DIR, "tour_cache.sqlite3"))
+TOUR_CACHE_TTL = float(os.getenv("TOUR_CACHE_TTL", str(6 * 3600)))
+TOUR_CACHE_STALE_TTL = float(os.getenv("TOUR_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+TOUR_CACHE_MAX_ENTRIES = int(os.getenv("TOUR_CACHE_MAX_ENTRIES", "1000"))
+TOUR_CACHE_MAX_BYTES = int(os.getenv("TOUR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# 경유지 검색용 지역 전체 관광지 KD-tree 캐시 (지역 수, 초 단위 - 캐시 갱신 결과를 반영하는 주기)
+REGION_PLACES_MAX = int(os.getenv("REGION_PLACES_MAX", "64"))
+REGION_PLACES_TTL = float(os.getenv("REGION_PLACES_TTL", "600"))
+
+# Tour API 페이지 단위 동시 조회 (페이지 크기, 동시 요청 수)
+TOUR_PAGE_SIZE = int(os.getenv("TOUR_PAGE_SIZE", "500"))
+TOUR_FETCH_CONCURRENCY = int(os.getenv("TOUR_FETCH_CONCURRENCY", "4"))
+
+# 전국 관광지 오프라인 스냅샷 (SQLite, python tour_snapshot.py ingest 로 생성)
+TOUR_SNAPSHOT_PATH = os.getenv("TOUR_SNAPSHOT_PATH", os.path.join(DATA_DIR, "tour_snapshot.sqlite3"))
+
+# 쓰레기통 위치 로컬 인덱스 (LaaS 문서 컬렉션 또는 공공데이터 CSV에서 수집)
+TRASH_INDEX_PATH = os.getenv("TRASH_INDEX_PATH", os.path.join(DATA_DIR, "trash_bins.json"))
+TRASH_RAG_COLLECTION = os.getenv("TRASH_RAG_COLLECTION", "RAG")
+
+# HTTP 클라이언트 설정 (초 단위 타임아웃, 커넥션 풀 크기)
+LAAS_TIMEOUT = float(os.getenv("LAAS_TIMEOUT", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "500"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "100"))
+
+# 외부 API 호출 정책 (upstream.py)
+# - *_TIMEOUT: 시도 한 번의 제한 시간, *_DEADLINE: 재시도까지 포함한 전체 기한 (초)
+# - 재시도는 연결 오류/타임아웃/429·5xx 만, 대기 시간은 UPSTREAM_BACKOFF 부터 지수 증가 + 지터
+# - 연속 BREAKER_FAILURES 번 실패하면 BREAKER_COOLDOWN 초 동안 호출하지 않고 바로 실패 (캐시/대체 응답 사용)
+LAAS_DEADLINE = float(os.getenv("LAAS_DEADLINE", "90"))
+LAAS_DOCUMENT_TIMEOUT = float(os.getenv("LAAS_DOCUMENT_TIMEOUT", "15"))
+LAAS_DOCUMENT_DEADLINE = float(os.getenv("LAAS_DOCUMENT_DEADLINE", "30"))
+TOUR_TIMEOUT = float(os.getenv("TOUR_TIMEOUT", "10"))
+TOUR_DEADLINE = float(os.getenv("TOUR_DEADLINE", "20"))
+TMAP_DEADLINE = float(os.getenv("TMAP_DEADLINE", "20"))
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", "0.2"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "2"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+# 지연에 민감한 LaaS 해시 (이름, 쉼표 구분): 최근 p95 만큼 기다려도 응답이 없으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+LAAS_HEDGE_HASHES = [name.strip().upper() for name in os.getenv("LAAS_HEDGE_HASHES", "").split(",") if name.strip()]
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+# 업로드 이미지 전처리 (긴 변 최대 픽셀, 재인코딩 형식/품질, 프로세스 풀 크기)
+IMAGE_PREPROCESS = os.getenv("IMAGE_PREPROCESS", "1") == "1"
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1024"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_MAX_INPUT_BYTES = int(os.getenv("IMAGE_MAX_INPUT_BYTES", str(20 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# 쓰봉판단 일괄 처리 (동시 LaaS 호출 수, 요청당 최대 이미지 수, 같은 사진으로 볼 dhash 해밍 거리)
+TRASHBAG_BATCH_CONCURRENCY = int(os.getenv("TRASHBAG_BATCH_CONCURRENCY", "4"))
+TRASHBAG_BATCH_MAX_IMAGES = int(os.getenv("TRASHBAG_BATCH_MAX_IMAGES", "100"))
+TRASHBAG_DEDUP_DISTANCE = int(os.getenv("TRASHBAG_DEDUP_DISTANCE", "6"))
+
+# LaaS 응답 캐시 (입력이 같으면 결과도 같은 프롬프트만, 해시 이름을 쉼표로 지정)
+# LLM_CACHE_PATH 를 지정하면 SQLite 파일에도 저장해 재시작/워커 간 공유
+LLM_CACHE_HASHES = [name.strip().upper() for name in os.getenv("LLM_CACHE_HASHES", "LOCATION,ROUTE").split(",") if name.strip()]
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+# 로그 레벨 (DEBUG 면 요청/응답 전문까지), INFO 이하 로그 샘플링 비율 (0~1)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+# 대화 컨텍스트 요약 최대 크기 (바이트)
+CONTEXT_SUMMARY_BYTES = int(os.getenv("CONTEXT_SUMMARY_BYTES", "1200"))
+
+# 세션 저장소 설정 (memory: 프로세스 내부, sqlite: 멀티 워커 공유)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(DATA_DIR, "sessions.sqlite3"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# 이미지 블롭 저장소 (대화 기록에는 참조만 저장, 백엔드는 세션 저장소 설정을 따름)
+BLOB_DB_PATH = os.getenv("BLOB_DB_PATH", os.path.join(DATA_DIR, "blobs.sqlite3"))
+BLOB_TTL = float(os.getenv("BLOB_TTL", str(SESSION_TTL)))
+BLOB_MAX_BYTES = int(os.getenv("BLOB_MAX_BYTES", str(256 * 1024 * 1024)))
+UVICORN_WORKERS = int(os.getenv("UVICORN_WORKERS", "1"))
 # (선택) 경로 체크
 if not all([HASH_LOCATION, HASH_PLACE, HASH_ROUTE,HASH_IMAGE,HASH_TRASHBAG,HASH_RAG, LAAS_API_KEY, PROJECT_CODE, LAAS_URL, TMAP_API_KEY, TOUR_API_KEY]):
     print("⚠️ 일부 환경변수가 설정되지 않았습니다.")
@@ -0,0 +1,215 @@
+"""
+지역명 사전(gazetteer) 매칭
+
+광역시/도 이름·약칭과 지역 코드 인덱스의 모든 시군구 이름(정식/접미사 제거)을
+Aho-Corasick 오토마톤 하나로 묶어, 사용자 문장에서 지역을 한 번의 순회로 찾습니다.
+결과가 하나로 정해질 때만 (광역시/도, 시군구) 를 반환하고, 애매하면 None → LLM 으로 넘깁니다.
+
+- 겹치는 매칭은 가장 왼쪽·가장 긴 것만 사용 ("강남구" 안의 "남구" 무시)
+- 광역시/도 이름과 같은 시군구("광주" ↔ 경기 광주시)는 다른 위치에 해당 광역시/도가 있을 때만 시군구로 해석
+- 행정 단위 접미사(시/군/구/도)가 없는 약칭("강남", "영동", "경남")은 뒤에 공백·문장 끝·조사가 올 때만 인정
+  ("영동대로", "강남역" 같은 도로·역 이름이 다른 지역으로 잡히지 않도록)
+- 광역시/도 이름은 tour_api.AREA_CODE_DICT 의 키로 반환 (Tour API 조회에 그대로 사용)
+"""
+import threading
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from area_index import area_index, normalize_name
+
+# AREA_CODE_DICT 키 → 함께 쓰이는 정식 이름/약칭
+AREA_NAMES = {
+    "서울": ("서울특별시", "서울시", "서울"),
+    "인천": ("인천광역시", "인천시", "인천"),
+    "대전": ("대전광역시", "대전시", "대전"),
+    "대구": ("대구광역시", "대구시", "대구"),
+    "광주": ("광주광역시", "광주시", "광주"),
+    "부산": ("부산광역시", "부산시", "부산"),
+    "울산": ("울산광역시", "울산시", "울산"),
+    "세종특별자치시": ("세종특별자치시", "세종시", "세종"),
+    "경기도": ("경기도", "경기"),
+    "강원특별자치도": ("강원특별자치도", "강원도", "강원"),
+    "충청북도": ("충청북도", "충북"),
+    "충청남도": ("충청남도", "충남"),
+    "경상북도": ("경상북도", "경북"),
+    "경상남도": ("경상남도", "경남"),
+    "전북특별자치도": ("전북특별자치도", "전라북도", "전북"),
+    "전라남도": ("전라남도", "전남"),
+    "제주도": ("제주특별자치도", "제주도", "제주"),
+}
+
+
+# 약칭 뒤에 붙어도 지역명으로 보는 조사/표현
+PARTICLES = ("에서", "으로", "근처", "부근", "일대", "까지", "하고", "에", "의", "은", "는", "이", "가",
+             "을", "를", "로", "도", "랑", "와", "과", "쪽")
+ADMIN_SUFFIXES = "시군구도"
+
+
+def _is_hangul(ch: str) -> bool:
+    return "가" <= ch <= "힣"
+
+
+def _bounded(text: str, end: int) -> bool:
+    """약칭 매칭 뒤가 단어 경계인지 (공백/문장 끝/한글이 아닌 문자/조사)"""
+    if end >= len(text) or not _is_hangul(text[end]):
+        return True
+    return text.startswith(PARTICLES, end)
+
+
+class Region(NamedTuple):
+    area_name: str     # AREA_CODE_DICT 키
+    sigungu_name: str  # 지역 코드 인덱스의 시군구 이름
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    areas: Set[str]                    # 이 위치가 가리킬 수 있는 광역시/도 코드
+    sigungu: Set[Tuple[str, str]]      # 이 위치가 가리킬 수 있는 (광역시/도 코드, 시군구 코드)
+
+
+class AhoCorasick:
+    """다중 패턴 문자열 검색 (패턴마다 임의의 값 집합을 붙임)"""
+
+    def __init__(self, patterns: Dict[str, set]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for pattern in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(pattern)
+        # BFS 로 실패 링크 연결
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """[(시작, 끝, 패턴)] (겹치는 매칭 포함)"""
+        node = 0
+        found = []
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern in self._out[node]:
+                found.append((i + 1 - len(pattern), i + 1, pattern))
+        return found
+
+
+class Gazetteer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = -1
+        self._automaton: Optional[AhoCorasick] = None
+        self._areas: Dict[str, Set[str]] = {}
+        self._sigungu: Dict[str, Set[Tuple[str, str]]] = {}
+        self._area_key: Dict[str, str] = {}   # 광역시/도 코드 → AREA_CODE_DICT 키
+        self.resolved = 0
+        self.unresolved = 0
+
+    # ---------- 구성 ----------
+    def _ensure(self):
+        """지역 코드 인덱스가 바뀌었으면 오토마톤 재생성"""
+        if self._automaton is not None and self._version == area_index.version:
+            return
+        from tour_api import AREA_CODE_DICT
+
+        with self._lock:
+            version = area_index.version
+            areas: Dict[str, Set[str]] = {}
+            sigungu: Dict[str, Set[Tuple[str, str]]] = {}
+            for key, code in AREA_CODE_DICT.items():
+                self._area_key[code] = key
+                for name in AREA_NAMES.get(key, (key,)):
+                    areas.setdefault(name, set()).add(code)
+            for area_code, area in list(area_index.areas.items()):
+                for code, name in area["sigungu"].items():
+                    for pattern in {name, normalize_name(name)}:
+                        if len(pattern) >= 2:
+                            sigungu.setdefault(pattern, set()).add((area_code, code))
+            self._areas, self._sigungu = areas, sigungu
+            self._automaton = AhoCorasick({**{p: None for p in areas}, **{p: None for p in sigungu}})
+            self._version = version
+
+    def matches(self, text: str) -> List[Match]:
+        """겹치지 않는 가장 왼쪽·가장 긴 지역명 매칭 목록"""
+        self._ensure()
+        text = text or ""
+        found = sorted(self._automaton.find(text), key=lambda m: (m[0], -(m[1] - m[0])))
+        result, last_end = [], 0
+        for start, end, pattern in found:
+            if start < last_end:
+                continue
+            if pattern[-1] not in ADMIN_SUFFIXES and not _bounded(text, end):
+                continue
+            result.append(Match(start, end, self._areas.get(pattern, set()), self._sigungu.get(pattern, set())))
+            last_end = end
+        return result
+
+    def mentions(self, text: str) -> bool:
+        return bool(self.matches(text))
+
+    # ---------- 해석 ----------
+    def resolve(self, text: str) -> Optional[Region]:
+        """문장에서 지역이 하나로 정해지면 Region, 아니면 None"""
+        region = self._resolve(self.matches(text))
+        if region:
+            self.resolved += 1
+        else:
+            self.unresolved += 1
+        return region
+
+    def _resolve(self, matches: List[Match]) -> Optional[Region]:
+        if not matches:
+            return None
+        mentioned = set().union(*(m.areas for m in matches))
+        candidates = set()
+        for m in matches:
+            other_areas = set().union(*(o.areas for o in matches if o is not m))
+            for area_code, code in m.sigungu:
+                if other_areas:
+                    # 다른 위치에 광역시/도가 있으면 그 광역시/도의 시군구만
+                    if area_code in other_areas:
+                        candidates.add((area_code, code))
+                elif not m.areas:
+                    # 광역시/도 이름과 겹치는 위치("광주")는 광역시/도로 해석
+                    candidates.add((area_code, code))
+        if not candidates and len(mentioned) == 1:
+            # 광역시/도만 있고 시군구가 하나뿐인 지역 (예: 세종)
+            area_code = next(iter(mentioned))
+            sigungu = area_index.areas.get(area_code, {}).get("sigungu", {})
+            if len(sigungu) == 1:
+                candidates.add((area_code, next(iter(sigungu))))
+        if len(candidates) != 1:
+            return None
+        area_code, code = candidates.pop()
+        if area_code not in self._area_key:
+            return None
+        return Region(self._area_key[area_code], area_index.areas[area_code]["sigungu"][code])
+
+    def stats(self) -> dict:
+        total = self.resolved + self.unresolved
+        return {
+            "resolved": self.resolved,
+            "unresolved": self.unresolved,
+            "hit_rate": round(self.resolved / total, 3) if total else 0.0
+        }
+
+
+# 프로세스 전역 사전 (지역 코드 인덱스가 갱신되면 자동 재생성)
+gazetteer = Gazetteer()
@@ -0,0 +1,255 @@
+"""
+좌표 계산 공용 모듈
+
+- haversine: 위경도(WGS84) 두 점 사이 대원 거리 (미터, NumPy 배열 지원)
+- PointIndex: 후보 좌표 KD-tree (k-최근접 / 반경 검색)
+  시군구 범위에서는 기준 위도 중심 등장방형 투영(미터)으로 트리를 만들고,
+  결과 거리는 haversine으로 다시 계산합니다.
+- corridor: 폴리라인에서 일정 거리 안에 있는 점 (경로 따라간 거리 순)
+"""
+import heapq
+import math
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+LEAF_SIZE = 16
+CORRIDOR_BLOCK = 8  # corridor 2차 bbox 필터 단위 (선분 수)
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """대원 거리 (미터). 스칼라 또는 NumPy 배열 (브로드캐스팅 지원)"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def project(lons, lats, lat0: float) -> Tuple[np.ndarray, np.ndarray]:
+    """기준 위도 lat0 중심 등장방형 투영 → (x, y) 미터"""
+    scale = math.radians(1) * EARTH_RADIUS_M
+    x = np.asarray(lons, dtype=float) * scale * math.cos(math.radians(lat0))
+    y = np.asarray(lats, dtype=float) * scale
+    return x, y
+
+
+def parse_coords(items: Iterable[dict], x_key: str = "mapx", y_key: str = "mapy") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    후보 목록에서 (경도, 위도, 원래 인덱스) 배열 추출
+    좌표가 없거나 숫자가 아닌 항목은 제외합니다.
+    """
+    lons, lats, ids = [], [], []
+    for i, item in enumerate(items):
+        try:
+            lon, lat = float(item[x_key]), float(item[y_key])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if math.isfinite(lon) and math.isfinite(lat):
+            lons.append(lon)
+            lats.append(lat)
+            ids.append(i)
+    return np.array(lons, dtype=float), np.array(lats, dtype=float), np.array(ids, dtype=np.int64)
+
+
+class PointIndex:
+    """
+    좌표 KD-tree
+    - nearest(lon, lat, k): 가까운 순 k개 [(원래 인덱스, 거리 m)]
+    - within(lon, lat, radius_m): 반경 내 전부, 가까운 순
+    """
+
+    def __init__(self, lons: Sequence[float], lats: Sequence[float], ids: Optional[Sequence[int]] = None):
+        self.lons = np.asarray(lons, dtype=float)
+        self.lats = np.asarray(lats, dtype=float)
+        self.ids = np.arange(len(self.lons)) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.lat0 = float(self.lats.mean()) if len(self.lats) else 0.0
+        self.x, self.y = project(self.lons, self.lats, self.lat0)
+        self._order = np.arange(len(self.lons))
+        # 노드: (start, end, axis, split, left, right) - 리프는 axis = -1
+        self._nodes: List[tuple] = []
+        if len(self.lons):
+            self._build(0, len(self.lons), 0)
+
+    @classmethod
+    def from_items(cls, items: Sequence[dict], x_key: str = "mapx", y_key: str = "mapy") -> "PointIndex":
+        lons, lats, ids = parse_coords(items, x_key, y_key)
+        return cls(lons, lats, ids)
+
+    def __len__(self) -> int:
+        return len(self.lons)
+
+    # ---------- 트리 생성 ----------
+    def _build(self, start: int, end: int, depth: int) -> int:
+        node_id = len(self._nodes)
+        self._nodes.append(None)
+        if end - start <= LEAF_SIZE:
+            self._nodes[node_id] = (start, end, -1, 0.0, -1, -1)
+            return node_id
+        idx = self._order[start:end]
+        coords = self.x[idx] if depth % 2 == 0 else self.y[idx]
+        mid = (end - start) // 2
+        part = np.argpartition(coords, mid)
+        self._order[start:end] = idx[part]
+        split = float(coords[part[mid]])
+        left = self._build(start, start + mid, depth + 1)
+        right = self._build(start + mid, end, depth + 1)
+        self._nodes[node_id] = (start, end, depth % 2, split, left, right)
+        return node_id
+
+    # ---------- 검색 ----------
+    def nearest(self, lon: float, lat: float, k: int = 1,
+                exclude: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """가까운 순 k개 (exclude(원래 인덱스)가 True인 점은 제외)"""
+        if not len(self) or k <= 0:
+            return []
+        qx, qy = project([lon], [lat], self.lat0)
+        qx, qy = float(qx[0]), float(qy[0])
+        heap: List[Tuple[float, int]] = []  # (-거리², 순번) 최대 힙
+
+        def visit(node_id: int):
+            start, end, axis, split, left, right = self._nodes[node_id]
+            if axis < 0:
+                idx = self._order[start:end]
+                d2 = (self.x[idx] - qx) ** 2 + (self.y[idx] - qy) ** 2
+                for i, d in zip(idx.tolist(), d2.tolist()):
+                    if exclude is not None and exclude(int(self.ids[i])):
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, i))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, i))
+                return
+            diff = (qx if axis == 0 else qy) - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(0)
+        found = sorted((-d, i) for d, i in heap)
+        return self._with_distance(lon, lat, [i for _, i in found])
+
+    def within(self, lon: float, lat: float, radius_m: float) -> List[Tuple[int, float]]:
+        """반경 radius_m 이내 점 전부, 가까운 순"""
+        if not len(self):
+            return []
+        qx, qy = project([lon], [lat], self.lat0)
+        qx, qy = float(qx[0]), float(qy[0])
+        r2 = radius_m * radius_m
+        hits: List[int] = []
+        stack = [0]
+        while stack:
+            start, end, axis, split, left, right = self._nodes[stack.pop()]
+            if axis < 0:
+                idx = self._order[start:end]
+                d2 = (self.x[idx] - qx) ** 2 + (self.y[idx] - qy) ** 2
+                hits.extend(idx[d2 <= r2].tolist())
+                continue
+            diff = (qx if axis == 0 else qy) - split
+            if diff < 0 or diff * diff <= r2:
+                stack.append(left)
+            if diff >= 0 or diff * diff <= r2:
+                stack.append(right)
+        result = self._with_distance(lon, lat, hits)
+        result.sort(key=lambda r: r[1])
+        return [r for r in result if r[1] <= radius_m]
+
+    def _with_distance(self, lon: float, lat: float, positions: List[int]) -> List[Tuple[int, float]]:
+        if not positions:
+            return []
+        pos = np.asarray(positions, dtype=np.int64)
+        dist = haversine(lon, lat, self.lons[pos], self.lats[pos])
+        return [(int(self.ids[p]), float(d)) for p, d in zip(pos.tolist(), dist.tolist())]
+
+
+def corridor(lons: Sequence[float], lats: Sequence[float], path: Sequence[Sequence[float]],
+             width_m: float) -> List[Tuple[int, float, float]]:
+    """
+    폴리라인([[경도, 위도], ...])에서 width_m 안에 있는 점
+    → [(인덱스, 경로까지 거리 m, 출발점부터 경로를 따라간 거리 m)], 따라간 거리 순
+
+    경로 bbox(+width) 와 선분 묶음별 bbox 로 거른 뒤, 남은 점 × 선분 거리를 벡터로 계산합니다.
+    """
+    pts = np.asarray(path, dtype=float).reshape(-1, 2)
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    if len(pts) == 0 or len(lons) == 0:
+        return []
+    lat0 = float(pts[:, 1].mean())
+    px, py = project(pts[:, 0], pts[:, 1], lat0)
+    x, y = project(lons, lats, lat0)
+
+    # 1차: 경로 전체 bbox
+    candidates = np.nonzero((x >= px.min() - width_m) & (x <= px.max() + width_m) &
+                            (y >= py.min() - width_m) & (y <= py.max() + width_m))[0]
+    if len(candidates) == 0:
+        return []
+    if len(pts) == 1:
+        dist = np.hypot(x[candidates] - px[0], y[candidates] - py[0])
+        along = np.zeros_like(dist)
+    else:
+        ax, ay = px[:-1], py[:-1]
+        dx, dy = px[1:] - ax, py[1:] - ay
+        seg_len2 = dx * dx + dy * dy
+        seg_len = np.sqrt(seg_len2)
+        seg_start = np.concatenate(([0.0], np.cumsum(seg_len)[:-1]))
+        dist = np.full(len(candidates), np.inf)
+        along = np.zeros(len(candidates))
+        cx_all, cy_all = x[candidates], y[candidates]
+        # 2차: 선분 CORRIDOR_BLOCK 개씩 묶은 bbox 로 거른 뒤, 후보 × 선분 거리를 한 번에 계산
+        for s in range(0, len(ax), CORRIDOR_BLOCK):
+            e = min(s + CORRIDOR_BLOCK, len(ax))
+            bx, by = px[s:e + 1], py[s:e + 1]
+            rows = np.nonzero((cx_all >= bx.min() - width_m) & (cx_all <= bx.max() + width_m) &
+                              (cy_all >= by.min() - width_m) & (cy_all <= by.max() + width_m))[0]
+            if len(rows) == 0:
+                continue
+            cx, cy = cx_all[rows, None], cy_all[rows, None]
+            t = ((cx - ax[s:e]) * dx[s:e] + (cy - ay[s:e]) * dy[s:e]) / np.where(seg_len2[s:e] > 0, seg_len2[s:e], 1.0)
+            t = np.clip(t, 0.0, 1.0)
+            seg_dist = np.hypot(cx - (ax[s:e] + t * dx[s:e]), cy - (ay[s:e] + t * dy[s:e]))
+            best = np.argmin(seg_dist, axis=1)
+            r = np.arange(len(rows))
+            block_dist = seg_dist[r, best]
+            better = block_dist < dist[rows]
+            dist[rows[better]] = block_dist[better]
+            along[rows[better]] = (seg_start[s:e][best] + t[r, best] * seg_len[s:e][best])[better]
+
+    hit = dist <= width_m
+    order = np.argsort(along[hit], kind="stable")
+    return [(int(i), float(d), float(a)) for i, d, a in
+            zip(candidates[hit][order].tolist(), dist[hit][order].tolist(), along[hit][order].tolist())]
+
+
+def simplify(coords: Sequence[Sequence[float]], tolerance_m: float) -> List[List[float]]:
+    """
+    Douglas–Peucker 폴리라인 단순화 ([[경도, 위도], ...], 허용 오차 미터)
+    양 끝점은 항상 유지합니다.
+    """
+    n = len(coords)
+    if n <= 2 or tolerance_m <= 0:
+        return [list(c) for c in coords]
+    pts = np.asarray(coords, dtype=float)
+    x, y = project(pts[:, 0], pts[:, 1], float(pts[:, 1].mean()))
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        # 구간 양 끝을 잇는 선분까지의 거리 (선분 밖이면 가까운 끝점까지)
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        seg_len2 = dx * dx + dy * dy
+        if seg_len2 == 0:
+            dist = np.hypot(px, py)
+        else:
+            t = np.clip((px * dx + py * dy) / seg_len2, 0.0, 1.0)
+            dist = np.hypot(px - t * dx, py - t * dy)
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return pts[keep].tolist()
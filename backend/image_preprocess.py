@@ -0,0 +1,251 @@
+"""
+업로드 이미지 전처리 (LaaS 멀티모달 호출 전)
+
+- data URL / base64 / http(s) URL 을 받아 디코딩
+  (URL 은 공인 주소로만 내려받고, 리다이렉트마다 다시 확인 → 내부망 주소면 원래 URL 그대로 LaaS 로 전달)
+- 긴 변을 IMAGE_MAX_SIDE 로 축소, IMAGE_FORMAT(JPEG/WEBP) 로 재인코딩, EXIF 제거
+  (회전 정보는 제거 전에 픽셀에 반영)
+- 디코딩/리사이즈/인코딩은 CPU 작업이라 프로세스 풀에서 실행해 이벤트 루프를 막지 않음
+- 이미지가 아니거나 처리에 실패하면 원래 값을 그대로 반환
+- 재인코딩 결과가 원본보다 작지 않으면(이미 작게 압축된 사진 등) 원래 값을 그대로 반환
+- 일괄 판단용 지각 해시(dhash)도 같은 디코딩 결과로 계산
+"""
+import asyncio
+import base64
+import binascii
+import io
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import httpx
+import numpy as np
+from PIL import Image, ImageOps
+from config import IMAGE_PREPROCESS, IMAGE_MAX_SIDE, IMAGE_FORMAT, IMAGE_QUALITY, IMAGE_MAX_INPUT_BYTES, IMAGE_WORKERS
+from http_client import get_async_client
+from metrics import span, observe_bytes
+from log import logger
+
+_MIME = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+MAX_REDIRECTS = 3
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _executor
+
+
+def shutdown_executor():
+    """서버 종료 시 프로세스 풀 정리"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _load(raw: bytes, max_side: int) -> Image.Image:
+    """디코딩 + EXIF 회전 반영 + RGB 변환 + 축소"""
+    with Image.open(io.BytesIO(raw)) as src:
+        img = ImageOps.exif_transpose(src)  # EXIF 회전 반영 (저장 시 EXIF 는 넘기지 않음)
+        if img.mode not in ("RGB", "L"):
+            # 투명 배경은 흰색으로 합성 (JPEG 는 알파 채널 미지원)
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        return img.copy() if img is src else img
+
+
+def _encode(img: Image.Image, fmt: str, quality: int) -> Tuple[bytes, str]:
+    fmt = fmt if fmt in _MIME else "JPEG"
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(out, "WEBP", quality=quality, method=4)
+    return out.getvalue(), _MIME[fmt]
+
+
+def dhash(img: Image.Image) -> int:
+    """64비트 차이 해시 (가로로 이웃한 픽셀 밝기 비교). 해밍 거리가 작으면 거의 같은 사진"""
+    small = np.asarray(img.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def process_image(raw: bytes, max_side: int = IMAGE_MAX_SIDE, fmt: str = IMAGE_FORMAT,
+                  quality: int = IMAGE_QUALITY) -> Tuple[bytes, str]:
+    """원본 바이트 → (재인코딩 바이트, MIME). 프로세스 풀에서 실행되므로 모듈 최상위 함수로 둠"""
+    return _encode(_load(raw, max_side), fmt, quality)
+
+
+def process_image_with_hash(raw: bytes, reencode: bool = True) -> Tuple[Optional[bytes], Optional[str], int]:
+    """process_image + dhash (reencode=False 면 해시만 계산)"""
+    img = _load(raw, IMAGE_MAX_SIDE)
+    data, mime = _encode(img, IMAGE_FORMAT, IMAGE_QUALITY) if reencode else (None, None)
+    return data, mime, dhash(img)
+
+
+def decode_image(value: str) -> Optional[bytes]:
+    """data URL 또는 순수 base64 문자열 → 바이트 (형식이 다르면 None)"""
+    payload = value.split(",", 1)[1] if value.startswith("data:") else value
+    try:
+        return base64.b64decode(payload, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _is_public(address: str) -> bool:
+    """공인 주소인지 (사설/루프백/링크로컬/예약 대역이면 False)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def _is_public_url(url: httpx.URL) -> bool:
+    """호스트가 가리키는 주소가 모두 공인 주소일 때만 True (SSRF 방지)"""
+    if url.scheme not in ("http", "https") or not url.host:
+        return False
+    port = url.port or (443 if url.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(url.host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        return False
+    return bool(infos) and all(_is_public(info[4][0]) for info in infos)
+
+
+async def _download(url: str) -> Optional[bytes]:
+    """공인 주소에서만 내려받음 (리다이렉트는 직접 따라가며 매번 주소 확인)"""
+    client = get_async_client()
+    target = httpx.URL(url)
+    for _ in range(MAX_REDIRECTS + 1):
+        if not await _is_public_url(target):
+            logger.warning("⚠️ 내부망/잘못된 이미지 주소, 원본 URL 사용: %s", target.host)
+            return None
+        async with client.stream("GET", target, follow_redirects=False) as response:
+            if response.is_redirect and response.headers.get("location"):
+                target = response.url.join(response.headers["location"])
+                continue
+            if response.status_code != 200:
+                logger.warning("⚠️ 이미지 다운로드 실패: %s", response.status_code)
+                return None
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > IMAGE_MAX_INPUT_BYTES:
+                    logger.warning("⚠️ 이미지가 너무 큽니다 (>%s bytes), 원본 URL 사용", IMAGE_MAX_INPUT_BYTES)
+                    return None
+                chunks.append(chunk)
+        return b"".join(chunks)
+    logger.warning("⚠️ 이미지 리다이렉트가 너무 많습니다 (>%s), 원본 URL 사용", MAX_REDIRECTS)
+    return None
+
+
+class ImageStats:
+    """전처리 누적 지표 (/stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.kept_original = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, bytes_in: int, bytes_out: int):
+        with self._lock:
+            self.processed += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def record_original(self, size: int):
+        """재인코딩해도 작아지지 않아 원본을 보낸 경우"""
+        with self._lock:
+            self.processed += 1
+            self.kept_original += 1
+            self.bytes_in += size
+            self.bytes_out += size
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "failed": self.failed,
+                "kept_original": self.kept_original,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "saved_ratio": round(1 - self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0.0
+            }
+
+
+image_stats = ImageStats()
+
+
+async def prepare_image(value: str) -> str:
+    """
+    LaaS 로 보낼 이미지 준비 → 축소/재인코딩된 data URL
+    전처리를 끄거나 실패하면 받은 값을 그대로 반환합니다.
+    """
+    if not IMAGE_PREPROCESS or not value:
+        return value
+    return (await prepare_image_with_hash(value))[0]
+
+
+async def prepare_image_with_hash(value: str) -> Tuple[str, Optional[int]]:
+    """
+    prepare_image + 지각 해시(dhash) → (data URL, 해시)
+    전처리가 꺼져 있으면 해시만 계산하고, 실패하면 (원래 값, None)
+    """
+    if not value:
+        return value, None
+    started = time.perf_counter()
+    try:
+        if value.startswith(("http://", "https://")):
+            raw = await _download(value)
+        else:
+            raw = decode_image(value)
+        if not raw or len(raw) > IMAGE_MAX_INPUT_BYTES:
+            image_stats.record_failure()
+            return value, None
+        loop = asyncio.get_running_loop()
+        with span("image_preprocess"):
+            data, mime, image_hash = await loop.run_in_executor(
+                _get_executor(), process_image_with_hash, raw, IMAGE_PREPROCESS
+            )
+    except Exception as e:
+        logger.warning("⚠️ 이미지 전처리 실패, 원본 사용: %s", e)
+        image_stats.record_failure()
+        return value, None
+    if data is None:
+        return value, image_hash
+
+    observe_bytes("image_in", len(raw))
+    if len(data) >= len(raw):
+        # 재인코딩이 오히려 크면 원본 그대로 전송
+        image_stats.record_original(len(raw))
+        observe_bytes("image_out", len(raw))
+        logger.info("🖼️ 이미지 전처리: 재인코딩(%.0fKB)이 원본(%.0fKB)보다 작지 않아 원본 사용",
+                    len(data) / 1024, len(raw) / 1024)
+        return value, image_hash
+
+    encoded = f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+    image_stats.record(len(raw), len(data))
+    observe_bytes("image_out", len(data))
+    # INFO 로그는 LOG_SAMPLE_RATE 비율만 남음 (log.py)
+    logger.info("🖼️ 이미지 전처리: %.0fKB → %.0fKB (%.0f%% 감소, %.0fms)",
+                len(raw) / 1024, len(data) / 1024, (1 - len(data) / len(raw)) * 100,
+                (time.perf_counter() - started) * 1000)
+    return encoded, image_hash
@@ -1,14 +1,38 @@
 import requests
+import httpx
+import json
+import time
 import config
-from config import LAAS_URL, PROJECT_CODE, LAAS_API_KEY
-from typing import List, Dict, Any
+from config import LAAS_URL, LAAS_DOCUMENT_URL, PROJECT_CODE, LAAS_API_KEY, HASH_LOCATION, LAAS_HEDGE_HASHES
+from http_client import get_async_client
+from candidates import CandidateStore
+from chat_context import build_context, message_size, context_stats, hash_name
+from singleflight import SingleFlight
+from blob_store import store_image, expand_messages
+from llm_cache import llm_cache, cache_key, CACHED_HASHES
+from metrics import span, observe_bytes, count_error, stage_duration
+from upstream import laas_upstream, laas_document_upstream, RETRY_STATUSES, RETRY_ERRORS
+from log import logger
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+# 동시 동일 호출을 합칠 해시 (입력이 같으면 응답도 같은 프롬프트)
+SINGLEFLIGHT_HASHES = {h for h in [HASH_LOCATION] if h}
+# 응답이 p95 보다 늦으면 같은 요청을 한 번 더 보낼 해시 (LAAS_HEDGE_HASHES 이름 → 해시 값)
+HEDGE_HASHES = {getattr(config, f"HASH_{name}", None) for name in LAAS_HEDGE_HASHES} - {None}
+# 세션 대화 없이 현재 메시지만 보내는 해시: 응답을 캐시하거나 동시 호출을 합치는 해시는
+# 다른 세션과 응답을 공유하므로 요청(=캐시 키)에 세션별 대화가 섞이면 안 됨
+STATELESS_HASHES = CACHED_HASHES | SINGLEFLIGHT_HASHES
+_llm_flight = SingleFlight("laas")
+_rag_flight = SingleFlight("laas_document")
 
 class MultiTurnChat:
     def __init__(self, api_key: str = None, project_code: str = None):
         self.api_key = LAAS_API_KEY
         self.project_code = PROJECT_CODE
         self.conversation_history = []  # 대화 히스토리 저장
-        self.candidates = []
+        self.history_bytes = 0  # 대화 기록 전체의 JSON 바이트 수 (추가할 때마다 누적)
+        self.candidates = CandidateStore.from_items([])  # 추천 후보 (열 저장소)
+        self.region = None  # 후보를 가져온 (광역시/도, 시군구)
         self.laas_chat_url = LAAS_URL  # LaaS API URL
         self.headers = {
             "project": self.project_code,
@@ -18,71 +42,50 @@ class MultiTurnChat:
 
     def add_message(self, role: str, content: str):
         if content is None:
-            print(f"⚠️ Skipped adding message because content is None (role: {role})")
+            logger.warning("⚠️ Skipped adding message because content is None (role: %s)", role)
             return
-        self.conversation_history.append({
+        self._append({
             "role": role,
             "content": content
         })
 
-    def send_message(self, user_message: str, hash: str, param: str=None) -> requests.Response:
+    def _append(self, message: Dict[str, Any]):
+        self.conversation_history.append(message)
+        self.history_bytes += message_size(message)
+
+    async def send_message(self, user_message: str, hash: str, param: str=None, timeout: Optional[float]=None) -> httpx.Response:
         """동적으로 해시 값을 받아 메시지 전송"""
         self.add_message("user", user_message)
         
-        data = {
-            "hash": hash,  # 동적 해시
-            "params": param,
-            "messages": self.conversation_history.copy()
-        }
+        data = self._request_data(hash, param)
 
         try:
-            response = requests.post(self.laas_chat_url, headers=self.headers, json=data)
+            response = await self._post(data, timeout)
             if response.status_code == 200:
                 response_data = response.json()
                 if 'choices' in response_data and len(response_data['choices']) > 0:
                     assistant_message = response_data['choices'][0]['message']['content']
                     self.add_message("assistant", assistant_message)
                 else:
-                    print("No assistant message received.")
+                    logger.warning("No assistant message received.")
             else:
-                print(f"Error: {response.status_code}, {response.text}")
+                logger.warning("Error: %s, %s", response.status_code, response.text)
             return response
         except Exception as e:
-            print(f"An error occurred: {e}")
+            logger.warning("An error occurred: %s", e)
             return None
 
     
-    def send_message_with_image(self, hash:str,user_message: str, image_url: str) -> requests.Response:
+    async def send_message_with_image(self, hash:str,user_message: str, image_url: str, timeout: Optional[float]=None) -> httpx.Response:
         """이미지와 함께 메시지 보내기"""
-        # 이미지와 텍스트를 포함한 메시지 구성
-        message_content = [
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": image_url
-                }
-            },
-            {
-                "type": "text",
-                "text": user_message
-            }
-        ]
-        
-        # 사용자 메시지를 히스토리에 추가
-        self.conversation_history.append({
-            "role": "user",
-            "content": message_content
-        })
+        # 사용자 메시지(이미지 + 텍스트)를 히스토리에 추가
+        self.add_image_message(user_message, image_url)
         
         # 요청 데이터 구성
-        data = {
-            "hash": hash,
-            "params": {},
-            "messages": self.conversation_history.copy()
-        }
+        data = self._request_data(hash, {})
         
         try:
-            response = requests.post(self.laas_chat_url, headers=self.headers, json=data)
+            response = await self._post(data, timeout)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -90,22 +93,222 @@ class MultiTurnChat:
                     assistant_message = response_data['choices'][0]['message']['content']
                     self.add_message("assistant", assistant_message)
                 else:
-                    print("No response from assistant")
+                    logger.warning("No response from assistant")
             else:
-                print(f"Error: {response.status_code}, {response.text}")
+                logger.warning("Error: %s, %s", response.status_code, response.text)
                 
             return response
             
         except Exception as e:
-            print(f"An error occurred: {e}")
+            logger.warning("An error occurred: %s", e)
             return None
         
-    def set_candidates(self, items: List[Dict[str, Any]]):
-        self.candidates = items
+    def add_image_message(self, user_message: str, image_url: str):
+        """이미지와 텍스트를 포함한 사용자 메시지를 히스토리에 추가 (이미지는 블롭 저장소 참조로 보관)"""
+        message_content = [
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": store_image(image_url)
+                }
+            },
+            {
+                "type": "text",
+                "text": user_message
+            }
+        ]
+        self._append({
+            "role": "user",
+            "content": message_content
+        })
+
+    def _request_data(self, hash: str, param: Any) -> Dict[str, Any]:
+        """LaaS 요청 본문: 해시별 예산만큼의 대화 + 현재 턴 이미지만 펼침 (STATELESS_HASHES 는 현재 메시지만)"""
+        history = self.conversation_history[-1:] if hash in STATELESS_HASHES else self.conversation_history
+        return {
+            "hash": hash,
+            "params": param,
+            "messages": expand_messages(build_context(history, hash))
+        }
+
+    async def stream_message(self, user_message: str, hash: str, param: str=None, timeout: Optional[float]=None) -> AsyncIterator[str]:
+        """send_message 의 스트리밍 버전: 응답 토큰을 도착하는 대로 반환하고, 끝나면 히스토리에 저장"""
+        self.add_message("user", user_message)
+        data = self._request_data(hash, param)
+        async for delta in self._stream(data, timeout):
+            yield delta
+
+    async def stream_message_with_image(self, hash: str, user_message: str, image_url: str, timeout: Optional[float]=None) -> AsyncIterator[str]:
+        """send_message_with_image 의 스트리밍 버전"""
+        self.add_image_message(user_message, image_url)
+        data = self._request_data(hash, {})
+        async for delta in self._stream(data, timeout):
+            yield delta
 
-    def get_candidates(self) -> List[Dict[str, Any]]:
+    async def _stream(self, data: Dict[str, Any], timeout: Optional[float]=None) -> AsyncIterator[str]:
+        """
+        LaaS 스트리밍 호출 (OpenAI 호환 SSE: data: {"choices": [{"delta": {"content": ...}}]})
+        - 서버가 스트리밍 대신 일반 JSON으로 응답하면 전체 내용을 한 번에 반환
+        - 완료 후 합친 응답을 assistant 메시지로 히스토리에 추가
+        """
+        client = get_async_client()
+        parts = []
+        started = time.perf_counter()
+        first_content = None
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        key = cache_key(data) if llm_cache.enabled(data["hash"]) else None
+        try:
+            cached = llm_cache.get(key) if key else None
+            if cached is not None:
+                choices = cached.get("choices") or []
+                content = choices[0]["message"].get("content") if choices else None
+                if content:
+                    first_content = time.perf_counter()
+                    parts.append(content)
+                    yield content
+                return
+            # 스트리밍은 재시도/헤지 없이 회로 차단과 실패 기록만 적용 (이미 보낸 조각은 되돌릴 수 없음)
+            laas_upstream.admit()
+            try:
+                async with client.stream("POST", self.laas_chat_url, headers=self.headers,
+                                         json={**data, "stream": True}, **kwargs) as response:
+                    if response.status_code in RETRY_STATUSES:
+                        laas_upstream.record_failure(str(response.status_code))
+                    else:
+                        laas_upstream.record_success()
+                    if response.status_code != 200:
+                        count_error("laas", str(response.status_code), hash=hash_name(data["hash"]))
+                        body = await response.aread()
+                        logger.warning("Error: %s, %s", response.status_code, body.decode('utf-8', 'replace'))
+                        return
+                    if "text/event-stream" not in response.headers.get("content-type", ""):
+                        response_data = json.loads(await response.aread())
+                        choices = response_data.get("choices") or []
+                        content = choices[0]["message"].get("content") if choices else None
+                        if content:
+                            first_content = time.perf_counter()
+                            parts.append(content)
+                            yield content
+                        return
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[5:].strip()
+                        if payload == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(payload)
+                        except json.JSONDecodeError:
+                            continue
+                        choices = chunk.get("choices") or []
+                        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                        if delta:
+                            if first_content is None:
+                                first_content = time.perf_counter()
+                            parts.append(delta)
+                            yield delta
+            except RETRY_ERRORS as e:
+                laas_upstream.record_failure(type(e).__name__)
+                raise
+        finally:
+            sent_bytes = sum(message_size(m) for m in data["messages"])
+            context_stats.record(
+                data["hash"],
+                full_bytes=self.history_bytes,
+                sent_bytes=sent_bytes,
+                latency=time.perf_counter() - started,
+                first_content=first_content - started if first_content else None
+            )
+            name = hash_name(data["hash"])
+            observe_bytes("laas_request", sent_bytes, hash=name)
+            stage_duration.observe(time.perf_counter() - started, stage="laas_stream", hash=name)
+            if first_content:
+                stage_duration.observe(first_content - started, stage="laas_first_content", hash=name)
+            if parts:
+                content = "".join(parts)
+                self.add_message("assistant", content)
+                if key and cached is None:
+                    llm_cache.put(key, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    async def _post(self, data: Dict[str, Any], timeout: Optional[float]=None) -> httpx.Response:
+        """공유 커넥션 풀로 LaaS 호출 (timeout 미지정 시 클라이언트 기본값 사용)"""
+        started = time.perf_counter()
+        try:
+            if llm_cache.enabled(data["hash"]):
+                # 같은 입력의 이전 응답이 있으면 모델 호출 없이 바로 반환
+                key = cache_key(data)
+                cached = llm_cache.get(key)
+                if cached is not None:
+                    return httpx.Response(200, json=cached, request=httpx.Request("POST", self.laas_chat_url))
+                response = await self._dispatch(data, timeout)
+                if response.status_code == 200:
+                    response_data = response.json()
+                    if response_data.get("choices"):
+                        llm_cache.put(key, response_data)
+                return response
+            return await self._dispatch(data, timeout)
+        finally:
+            # 전체 기록 대비 실제 전송 크기와 지연 시간 기록
+            sent_bytes = sum(message_size(m) for m in data["messages"])
+            context_stats.record(
+                data["hash"],
+                full_bytes=self.history_bytes,
+                sent_bytes=sent_bytes,
+                latency=time.perf_counter() - started
+            )
+            observe_bytes("laas_request", sent_bytes, hash=hash_name(data["hash"]))
+
+    async def _dispatch(self, data: Dict[str, Any], timeout: Optional[float]=None) -> httpx.Response:
+        if data["hash"] in SINGLEFLIGHT_HASHES:
+            # 페이로드가 같은 동시 호출은 하나로 합침 (예: 여러 사용자의 같은 지역 추출 요청)
+            return await _llm_flight.ado(cache_key(data), self._request, data, timeout)
+        return await self._request(data, timeout)
+
+    async def _request(self, data: Dict[str, Any], timeout: Optional[float]=None) -> httpx.Response:
+        client = get_async_client()
+        name = hash_name(data["hash"])
+        with span("laas", hash=name):
+            # 시도별 타임아웃 + 재시도 + 회로 차단 (실패 시 UpstreamError → send_message 가 None 반환)
+            response = await laas_upstream.acall(client.post, self.laas_chat_url, headers=self.headers, json=data,
+                                                 timeout=timeout, hedge=data["hash"] in HEDGE_HASHES)
+        observe_bytes("laas_response", len(response.content), hash=name)
+        if response.status_code != 200:
+            count_error("laas", str(response.status_code), hash=name)
+        return response
+
+    def set_candidates(self, candidates: CandidateStore, region: Optional[tuple] = None):
+        self.candidates = candidates
+        self.region = tuple(region) if region else None
+
+    def get_candidates(self) -> CandidateStore:
         return self.candidates
     
+    def to_dict(self) -> Dict[str, Any]:
+        """세션 저장소 보관용 직렬화"""
+        return {
+            "conversation_history": self.conversation_history,
+            "history_bytes": self.history_bytes,
+            "candidates": self.candidates.to_columns(),
+            "region": self.region
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MultiTurnChat":
+        """세션 저장소에서 불러온 데이터로 복원"""
+        chat = cls()
+        chat.conversation_history = data.get("conversation_history", [])
+        chat.history_bytes = data.get("history_bytes")
+        if chat.history_bytes is None:  # 바이트 수 없이 저장된 이전 세션은 한 번만 계산
+            chat.history_bytes = sum(message_size(m) for m in chat.conversation_history)
+        # 이전 형식(후보 딕셔너리 목록)으로 저장된 세션도 읽음
+        chat.candidates = CandidateStore.load(data.get("candidates"))
+        chat.region = tuple(data["region"]) if data.get("region") else None
+        return chat
+
+    def estimate_size(self) -> int:
+        """세션이 차지하는 메모리의 대략적인 바이트 수 (누적 대화 바이트 + 후보 목록)"""
+        return self.history_bytes + self.candidates.nbytes()
+
     def get_conversation_history(self) -> List[Dict[str, Any]]:
         """현재 대화 히스토리 반환"""
         return self.conversation_history.copy()
@@ -113,14 +316,15 @@ class MultiTurnChat:
     def clear_history(self):
         """대화 히스토리 초기화"""
         self.conversation_history = []
-        print("Conversation history cleared.")
+        self.history_bytes = 0
+        logger.debug("Conversation history cleared.")
     
     def save_conversation(self, filename: str):
         """대화 히스토리를 파일로 저장"""
         import json
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(self.conversation_history, f, ensure_ascii=False, indent=2)
-        print(f"Conversation saved to {filename}")
+        logger.info("Conversation saved to %s", filename)
     
     def load_conversation(self, filename: str):
         """파일에서 대화 히스토리 불러오기"""
@@ -128,14 +332,21 @@ class MultiTurnChat:
         try:
             with open(filename, 'r', encoding='utf-8') as f:
                 self.conversation_history = json.load(f)
-            print(f"Conversation loaded from {filename}")
+            self.history_bytes = sum(message_size(m) for m in self.conversation_history)
+            logger.info("Conversation loaded from %s", filename)
         except FileNotFoundError:
-            print(f"File {filename} not found.")
+            logger.warning("File %s not found.", filename)
         except json.JSONDecodeError:
-            print(f"Invalid JSON in {filename}")
+            logger.warning("Invalid JSON in %s", filename)
             
 def find_similar_documents_by_text(collection_code: str, api_key: str, project_code: str, text: str, limit: int, offset: int):
-    url = f"https://api-laas.wanted.co.kr/api/document/{collection_code}/similar/text"
+    """유사 문서 검색 (같은 조건의 동시 호출은 하나로 합침)"""
+    key = (collection_code, project_code, text, limit, offset)
+    return _rag_flight.do(key, _find_similar_documents_by_text, collection_code, api_key, project_code, text, limit, offset)
+
+
+def _find_similar_documents_by_text(collection_code: str, api_key: str, project_code: str, text: str, limit: int, offset: int):
+    url = f"{LAAS_DOCUMENT_URL}/{collection_code}/similar/text"
     headers = {
         "Content-Type": "application/json",
         "apiKey": api_key,
@@ -146,7 +357,8 @@ def find_similar_documents_by_text(collection_code: str, api_key: str, project_c
         "limit": limit,
         "offset": offset
     }
-    return requests.post(url, headers=headers, json=data)
+    with span("laas_document", collection=collection_code):
+        return laas_document_upstream.call(requests.post, url, headers=headers, json=data)
 
 # if __name__ == '__main__':
 #     requsets_trash = find_similar_documents_by_text(
@@ -0,0 +1,112 @@
+"""
+LaaS 응답 캐시
+
+입력이 같으면 결과도 같은 프롬프트(지역 추출, 경로 안내 등)의 응답을 재사용합니다.
+- 키: 해시 + 공백 정규화한 전송 메시지 + params 의 sha256
+  (캐시하는 해시는 세션 대화 없이 현재 메시지만 전송하므로 세션이 달라도 같은 입력이면 같은 키 - laas_api.STATELESS_HASHES)
+- 메모리 LRU (TTL + 바이트 상한), LLM_CACHE_PATH 지정 시 SQLite 에도 저장 (재시작/워커 간 공유)
+- LLM_CACHE_HASHES 에 지정한 해시만 사용 (기본: LOCATION, ROUTE)
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+import config
+from ttl_cache import TTLCache
+from config import LLM_CACHE_HASHES, LLM_CACHE_TTL, LLM_CACHE_SIZE, LLM_CACHE_MAX_BYTES, LLM_CACHE_PATH
+
+# 해시 이름(LOCATION) → 실제 해시 값 (환경변수가 없는 해시는 제외)
+CACHED_HASHES = {getattr(config, f"HASH_{name}", None) for name in LLM_CACHE_HASHES} - {None}
+
+
+def _normalize(value: Any) -> Any:
+    """문자열 공백 정규화 (앞뒤 공백, 연속 공백 차이로 캐시가 빗나가지 않도록)"""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def cache_key(data: Dict[str, Any]) -> str:
+    payload = {
+        "hash": data.get("hash"),
+        "params": _normalize(data.get("params")),
+        "messages": _normalize(data.get("messages"))
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, ttl: float = LLM_CACHE_TTL, maxsize: int = LLM_CACHE_SIZE,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES, path: str = LLM_CACHE_PATH):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._last_prune = 0.0
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl, max_bytes=max_bytes, sizeof=len)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.disk_hits = 0
+        if path:
+            self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " body TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at)")
+
+    def enabled(self, hash: str) -> bool:
+        return hash in CACHED_HASHES
+
+    def get(self, key: str) -> Optional[dict]:
+        """저장된 응답 본문(JSON dict) 또는 None"""
+        body = self._memory.get(key)
+        if body is None and self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT body, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and row[1] > time.time():
+                body = row[0]
+                self.disk_hits += 1
+                self._memory.set(key, body, ttl=row[1] - time.time())
+        return json.loads(body) if body is not None else None
+
+    def put(self, key: str, response_data: dict):
+        body = json.dumps(response_data, ensure_ascii=False)
+        self._memory.set(key, body)
+        if self._conn is not None:
+            now = time.time()
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, body, expires_at) VALUES (?, ?, ?)",
+                    (key, body, now + self.ttl)
+                )
+                if now - self._last_prune >= self.PRUNE_INTERVAL:
+                    self._prune(now)
+
+    def _prune(self, now: float):
+        """만료분과 상한 초과분(곧 만료될 순) 정리"""
+        self._last_prune = now
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,)
+        )
+
+    def stats(self) -> dict:
+        return {**self._memory.stats(), "disk_hits": self.disk_hits, "persistent": self._conn is not None}
+
+
+llm_cache = LLMResponseCache()
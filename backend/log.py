@@ -0,0 +1,39 @@
+"""
+서버 로그 (레벨 + 샘플링)
+
+- LOG_LEVEL: DEBUG / INFO / WARNING ... (기본 INFO)
+  요청 본문, LLM 응답 전문, 경로 상세처럼 큰 내용은 DEBUG 로 남기므로 기본 설정에서는 포맷팅 비용도 없음
+- LOG_SAMPLE_RATE: INFO 이하 로그를 남길 비율 (0~1, 기본 1). WARNING 이상은 항상 남김
+
+    from log import logger
+    logger.info("📍 추출된 지역: %s %s", area, sigungu)   # 인자는 실제로 출력될 때만 포맷팅
+"""
+import logging
+import random
+import sys
+from config import LOG_LEVEL, LOG_SAMPLE_RATE
+
+
+class _SampleFilter(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+
+def _build_logger() -> logging.Logger:
+    log = logging.getLogger("plogging")
+    log.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        log.addHandler(handler)
+    if LOG_SAMPLE_RATE < 1.0:
+        log.addFilter(_SampleFilter(LOG_SAMPLE_RATE))
+    log.propagate = False
+    return log
+
+
+logger = _build_logger()
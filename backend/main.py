@@ -1,15 +1,53 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from typing import Optional
-from tour_api import get_filtered_tourist_data, get_detailed_tourist_data
+from typing import List, Optional
+from tour_api import get_filtered_tourist_data, get_detailed_tourist_data, get_region_places, region_places_stats
 from laas_api import MultiTurnChat
+from http_client import close_async_client
+from area_index import area_index
+from trash_index import trash_index
+from image_preprocess import prepare_image, image_stats, shutdown_executor
+from blob_store import blob_store
+from llm_cache import llm_cache
+from gazetteer import gazetteer
+from title_matcher import TitleMatcher, TitleMatch, match_stats
+from trashbag_batch import evaluate_batch, verdict_cache
+from tour_cache import tour_cache
+from session_store import create_session_store
+from candidates import CandidateStore
+from route_optimizer import optimize_route
+from tmap_api import route_stats, get_walking_route
+from singleflight import singleflight_stats
+from upstream import upstream_stats, UpstreamError, RETRY_ERRORS
+from chat_context import context_stats
+from metrics import span, http_duration, render as render_metrics
+from log import logger
 import json
+import logging
+import math
+import time
 import uvicorn
 import re
-from config import HASH_LOCATION, HASH_PLACE, HASH_ROUTE, HASH_IMAGE, HASH_TRASHBAG, HASH_RAG
-
-app = FastAPI()
+import uuid
+from config import HASH_LOCATION, HASH_PLACE, HASH_ROUTE, HASH_IMAGE, HASH_TRASHBAG, UVICORN_WORKERS, TRASHBAG_BATCH_MAX_IMAGES
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 지역 코드 인덱스 로드 (없거나 오래됐으면 백그라운드에서 재생성)
+    area_index.load()
+    area_index.refresh_in_background()
+    # 쓰레기통 위치 인덱스 로드
+    trash_index.load()
+    yield
+    # 종료 시 공유 HTTP 커넥션 풀, 이미지 처리 프로세스 풀 정리
+    await close_async_client()
+    shutdown_executor()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,11 +55,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id"],
 )
 
-# 전역 챗 설정 (멀티턴 형식)
-chat = MultiTurnChat()
- 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """엔드포인트별 처리 시간 (스트리밍 응답은 첫 바이트까지)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_duration.observe(time.perf_counter() - started, method=request.method,
+                              path=getattr(route, "path", "unmatched"), status=status)
+
+# 세션별 챗 저장소 (멀티턴 형식, 사용자마다 독립된 대화 기록)
+session_store = create_session_store()
+SESSION_HEADER = "X-Session-Id"
+SESSION_COOKIE = "session_id"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+# 경로 추천 시 경유지 수 (목표 거리/시간이 있으면 POOL에서 골라 줄임)
+WAYPOINT_COUNT = 4
+WAYPOINT_POOL = 10
+
+def get_session_id(request: Request, response: Response) -> str:
+    """
+    요청의 세션 ID(헤더 또는 쿠키)를 반환합니다.
+    세션 ID가 없거나 형식이 잘못된 경우 새로 발급합니다.
+    """
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    if not session_id or not SESSION_ID_PATTERN.match(session_id):
+        session_id = uuid.uuid4().hex
+    response.headers[SESSION_HEADER] = session_id
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return session_id
+
+async def get_chat(session_id: str = Depends(get_session_id)):
+    """세션 ID로 대화 상태를 불러오고, 처리 후 저장합니다."""
+    chat = session_store.load(session_id)
+    try:
+        yield chat
+    finally:
+        session_store.save(session_id, chat)
+
 # ========================== 모델 정의 ==========================
 
 class extract_loaction_UserRequest(BaseModel):
@@ -31,6 +111,9 @@ class recommend_place_UserRequest(BaseModel):
     user_message: str
     area_name: str
     sigungu_name: str
+    loop: bool = False                        # 출발지로 돌아오는 순환 경로
+    target_distance_m: Optional[float] = None  # 목표 총 거리 (미터)
+    target_time_min: Optional[float] = None    # 목표 소요 시간 (분)
     
 class ChatMessage(BaseModel):
     role: str  # "user" or "assistant"
@@ -43,20 +126,42 @@ class ImageChatRequest(BaseModel):
 class TrashbagEvaluateRequest(BaseModel):
     prompt: str
     image_base64: str
+class TrashbagBatchRequest(BaseModel):
+    prompt: str
+    images: List[str]  # base64 / data URL / 이미지 URL 목록
+
 class TrashRAG(BaseModel):
     area_name: str
     sigungu_name: str
+
+class RoutePoint(BaseModel):
+    title: Optional[str] = None
+    mapx: float
+    mapy: float
+
+class PedestrianRouteRequest(BaseModel):
+    recommended_route: List[RoutePoint]  # /recommend/place 의 recommended_route 그대로
+    search_option: int = 0               # 0: 추천, 10: 최단 등
+    simplify_tolerance_m: float = 5.0    # 경로 단순화 허용 오차 (미터)
+
+class TrashRouteRequest(BaseModel):
+    area_name: str
+    sigungu_name: str
+    path: Optional[List[List[float]]] = None               # /route/pedestrian 의 path ([[경도, 위도], ...])
+    recommended_route: Optional[List[RoutePoint]] = None   # path 가 없으면 추천 지점을 직선으로 연결
+    width_m: float = 50.0                                  # 경로에서 허용할 거리 (미터)
     
 # ========================== 유틸 함수 ==========================
 # 1. 어시스턴트 응답 추출
 def extract_assistant_response(response) -> str:
     try:
         if response and response.status_code == 200:
-            response_data = response.json()
+            with span("json_parse", kind="assistant"):
+                response_data = response.json()
             if 'choices' in response_data and len(response_data['choices']) > 0:
                 return response_data['choices'][0]['message']['content']
     except Exception as e:
-        print(f"⚠️ 응답 파싱 실패: {e}")
+        logger.warning("⚠️ 응답 파싱 실패: %s", e)
     return None
 # 2. 사용자 선택 장소 추출
 def extract_user_pick_place(response) -> str:
@@ -66,16 +171,18 @@ def extract_user_pick_place(response) -> str:
     """
     try:
         if response and response.status_code == 200:
-            response_data = response.json()
+            with span("json_parse", kind="user_pick_place"):
+                response_data = response.json()
             choices = response_data.get("choices", [])
             if choices:
                 tool_calls = choices[0]["message"].get("tool_calls", [])
                 if tool_calls:
                     arguments_str = tool_calls[0]["function"]["arguments"]
-                    arguments = json.loads(arguments_str)
+                    with span("json_parse", kind="tool_arguments"):
+                        arguments = json.loads(arguments_str)
                     return arguments.get("user_pick_place")
     except Exception as e:
-        print(f"⚠️ user_pick_place 파싱 실패: {e}")
+        logger.warning("⚠️ user_pick_place 파싱 실패: %s", e)
     return None
 
 
@@ -93,7 +200,7 @@ def extract_route_location(response) -> Optional[dict]:
                     "time": route.get("time")
                 }
     except Exception as e:
-        print(f"⚠️ 경로 정보 추출 실패: {e}")
+        logger.warning("⚠️ 경로 정보 추출 실패: %s", e)
     return None
 
 # 4. 이미지 대화 응답 추출
@@ -103,14 +210,27 @@ def extract_image_chat_response(response) -> str:
     """
     try:
         if response and response.status_code == 200:
-            response_data = response.json()
+            with span("json_parse", kind="image_chat"):
+                response_data = response.json()
             if 'choices' in response_data and len(response_data['choices']) > 0:
                 return response_data['choices'][0]['message']['content']
     except Exception as e:
-        print(f"⚠️ 이미지 대화 응답 파싱 실패: {e}")
+        logger.warning("⚠️ 이미지 대화 응답 파싱 실패: %s", e)
     return None
 
-# 5. 이미지 URL 유효성 검사
+# 5. SSE 이벤트 / 응답 구성
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_response(events, session_id: str) -> StreamingResponse:
+    # StreamingResponse 를 직접 반환하면 의존성에서 설정한 헤더가 빠지므로 세션 헤더를 직접 넣음
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", SESSION_HEADER: session_id}
+    )
+
+# 6. 이미지 URL 유효성 검사
 def validate_image_url(url: str) -> bool:
     """
     이미지 URL의 유효성을 간단히 검증합니다.
@@ -128,198 +248,346 @@ def validate_image_url(url: str) -> bool:
     
     # 일반 URL인 경우 확장자 확인
     return any(url.lower().endswith(ext) for ext in valid_extensions)
+# 7. LaaS 장애 시 대체 답변 (프롬프트에 넣으려던 후보/경로 목록을 그대로 안내)
+def degraded_reply(prompt) -> str:
+    _, _, params = prompt
+    return "⚠️ 지금은 추천 문구를 만들 수 없어 목록만 보여드려요.\n" + "\n".join(params.values())
+# 8. 직전 어시스턴트 답변 (추천 목록 서수 해석용)
+def last_assistant_reply(chat: MultiTurnChat) -> Optional[str]:
+    for message in reversed(chat.conversation_history):
+        if message.get("role") == "assistant" and isinstance(message.get("content"), str):
+            return message["content"]
+    return None
 # ========================== ① 지역 추출 ==========================
 
 @app.post("/location/extract")
-def extract_location(data: extract_loaction_UserRequest):
-    print(f"👤 사용자 메시지: {data.user_message}")
-    print(f"📊 현재 대화 기록: {chat.get_conversation_history()}")
+async def extract_location(data: extract_loaction_UserRequest, chat: MultiTurnChat = Depends(get_chat)):
+    logger.debug("👤 사용자 메시지: %s", data.user_message)
+    logger.debug("📊 현재 대화 기록: %s개", len(chat.get_conversation_history()))
+
+    # 지역명 사전으로 하나로 정해지면 LLM 호출 없이 응답
+    region = gazetteer.resolve(data.user_message)
+    if region:
+        content = json.dumps({"광역시/도": region.area_name, "시/군/구": region.sigungu_name}, ensure_ascii=False)
+        chat.add_message("user", data.user_message)
+        chat.add_message("assistant", content)
+        logger.info("📍 추출된 지역 (사전): %s %s", region.area_name, region.sigungu_name)
+        return {
+            "area": region.area_name,
+            "sigungu": region.sigungu_name,
+            "raw_response": content,
+            "source": "gazetteer",
+            "conversation_length": len(chat.get_conversation_history()),
+            "success": True
+        }
 
-    response = chat.send_message(
+    response = await chat.send_message(
         data.user_message,
         HASH_LOCATION
     )
 
     try:
         content = extract_assistant_response(response)
-        print(f"🤖 어시스턴트 응답: {content[:100]}...")
+        if content is None:
+            # LaaS 장애/회로 차단: 지역명 사전으로도 정하지 못했으므로 다시 입력받음
+            return {
+                "warning": "⚠️ 지금은 지역을 분석할 수 없습니다. 지역명(예: 서울 강남구)으로 다시 입력해 주세요.",
+                "source": "llm",
+                "degraded": True,
+                "conversation_length": len(chat.get_conversation_history()),
+                "success": False
+            }
+        logger.debug("🤖 어시스턴트 응답: %s...", content[:100])
         try:
-            parsed = json.loads(content)
+            with span("json_parse", kind="location"):
+                parsed = json.loads(content)
             area = parsed.get("광역시/도")
             sigungu = parsed.get("시/군/구")
-            print(f"📍 추출된 지역: {area} {sigungu}")
+            logger.info("📍 추출된 지역: %s %s", area, sigungu)
             return {
                 "area": area,
                 "sigungu": sigungu,
                 "raw_response": content,
+                "source": "llm",
                 "conversation_length": len(chat.get_conversation_history()),
                 "success": True
             }
         except json.JSONDecodeError:
-            print("⚠️ JSON 파싱 실패")
+            logger.warning("⚠️ JSON 파싱 실패")
             return {
                 "message": content,
                 "warning": "⚠️ JSON 파싱 실패. 텍스트 응답입니다.",
+                "source": "llm",
                 "conversation_length": len(chat.get_conversation_history()),
                 "success": False
             }
     except Exception as e:
-        print(f"⚠️ 예외 발생: {e}")
+        logger.warning("⚠️ 예외 발생: %s", e)
         return {"error": f"⚠️ 예외 발생: {e}"}
 
 # ========================== ② 장소 추천 ==========================
-@app.post("/recommend/place")
-def recommend_place(data: recommend_place_UserRequest):
-    print(f"🏃 장소 추천 요청")
-    print(f"👤 사용자 메시지: {data.user_message}")
-    print(f"📊 현재 대화 기록: {chat.get_conversation_history()}")
-    
+async def plan_place_recommendation(data: recommend_place_UserRequest, chat: MultiTurnChat):
+    """
+    장소 추천 요청을 마지막 LLM 호출 직전까지 처리합니다.
+    반환: (응답에 포함할 구조화 데이터, 프롬프트 (메시지, 해시, 파라미터))
+    프롬프트가 None이면 구조화 데이터가 곧 최종 응답입니다 (후보 없음, 오류 등).
+    """
     user_input = data.user_message.strip()
-
-    # ✅ 입력이 명확한 지역명일 경우 바로 처리 (예: "서울특별시 강남구")
-    if " " in user_input and any(s in user_input for s in ["시", "도", "군", "구"]):
+    matcher = TitleMatcher(chat.get_candidates(), last_assistant_reply(chat))
+
+    # ✅ 입력이 지역명일 경우 바로 처리 (예: "서울특별시 강남구")
+    # - 문장에서 정해진 지역은 요청 필드(area_name/sigungu_name)가 비었거나 같을 때만 사용
+    #   (클라이언트가 고른 지역을 사전 추측으로 덮어쓰지 않음)
+    # - 보여준 후보가 없으면: 항상 지역 요청 (LLM 으로 장소를 고를 후보가 없음)
+    # - 후보가 있으면: 지역이 이미 보여준 지역과 다르고 후보를 고른 입력도 아닐 때만
+    requested = (data.area_name, data.sigungu_name) if data.area_name and data.sigungu_name else None
+    region = gazetteer.resolve(user_input) if gazetteer.mentions(user_input) else None
+    if region and requested and tuple(region) != requested:
+        logger.info("🗺️ 문장의 지역(%s %s)이 요청 지역과 달라 요청 지역 사용", *region)
+        region = None
+    target = tuple(region) if region else requested
+    pick = None
+    if not chat.get_candidates():
+        is_region_request = True
+    else:
+        pick = matcher.resolve(user_input)
+        is_region_request = target is not None and target != chat.region and not pick
+    if is_region_request:
+        if target is None:
+            return {
+                "message": "⚠️ 플로깅할 지역(시/도, 시군구)을 알려주세요.",
+                "conversation_length": len(chat.get_conversation_history())
+            }, None
+        data.area_name, data.sigungu_name = target
         # 관광지 검색 및 추천
-        try:
-            # 지역명에 따라서 Tour API에서 관광지 데이터 추출 (현재 50개)
-            candidates = get_filtered_tourist_data(data.area_name, data.sigungu_name)
-            chat.set_candidates(candidates)  # 후보 리스트 저장
-            print(f"🔍 찾은 관광지 수: {len(candidates)}")
-
-            if not candidates:
-                return {
-                    "message": f"⚠️ {data.area_name} {data.sigungu_name}에서 추천할 수 있는 플로깅 장소를 찾지 못했습니다.",
-                    "conversation_length": len(chat.get_conversation_history())
-                }
-            places_text = "\n".join([f"- {item['title']}: {item['address']}" for item in candidates])
-
-            recommendation_response = chat.send_message(
-                f"{data.area_name} {data.sigungu_name}의 플로깅 장소 추천 요청",
-                HASH_PLACE,
-                {"recommended_place": places_text}
-            )
-
-            recommendation_content = extract_assistant_response(recommendation_response)
-
-            print(f"✅ 장소 추천 완료: {len(candidates)}개 장소")
-
+        # 지역명에 따라서 Tour API에서 관광지 데이터 추출 (현재 50개)
+        # Tour API 호출은 블로킹이므로 스레드풀에서 실행 (이벤트 루프 보호)
+        items = await run_in_threadpool(get_filtered_tourist_data, data.area_name, data.sigungu_name)
+        candidates = CandidateStore.from_items(items)
+        chat.set_candidates(candidates, (data.area_name, data.sigungu_name))  # 후보 리스트 저장
+        logger.info("🔍 찾은 관광지 수: %s", len(candidates))
+
+        if not candidates:
             return {
-                "recommended_places": candidates,
-                "chat_reply": recommendation_content,
-                "area": data.area_name,
-                "sigungu": data.sigungu_name,
-                "conversation_length": len(chat.get_conversation_history()),
-                "success": True
-            }
-        
-        except Exception as e:
-            print(f"⚠️ 예외 발생: {e}")
-            return {"error": f"⚠️ 예외 발생: {e}"}
+                "message": f"⚠️ {data.area_name} {data.sigungu_name}에서 추천할 수 있는 플로깅 장소를 찾지 못했습니다.",
+                "conversation_length": len(chat.get_conversation_history())
+            }, None
+        return {
+            "recommended_places": candidates.to_list(),
+            "area": data.area_name,
+            "sigungu": data.sigungu_name
+        }, (
+            f"{data.area_name} {data.sigungu_name}의 플로깅 장소 추천 요청",
+            HASH_PLACE,
+            {"recommended_place": candidates.places_text()}
+        )
+
+    # ✅ 사용자가 고른 시작 장소: 서수/제목/자모 n-gram 으로 확실하면 LLM 호출 없이 결정
+    candidates = chat.get_candidates()
+    if pick:
+        chat.add_message("user", user_input)
+        match_stats.record(pick.method)
+        logger.info("🎯 사용자가 선택한 장소 (%s, %s): %s", pick.method, pick.score, candidates.titles[pick.index])
     else:
-        # ✅ 복잡한 요청은 LaaS에 지역 추출 요청
-        user_pick_response = chat.send_message(
+        # 애매하면 LaaS에 선택 장소 추출 요청
+        user_pick_response = await chat.send_message(
             user_input,
             HASH_PLACE,
             {}
         )
-        print("📦 LaaS 응답 내용:")
         user_pick_place = extract_user_pick_place(user_pick_response)
-        print(user_pick_response.json())
-        
+        logger.debug("📦 LaaS 응답 내용: %s", user_pick_response.text if user_pick_response else None)
+        match_stats.record("llm")
+
         # ✅ 사용자가 선택한 장소가 존재할 경우 경로 계산
-        if user_pick_place:
-            print(f"🎯 사용자가 선택한 장소: {user_pick_place}")
-            
-            candidates = chat.get_candidates()
-            # 시작점 정보 추출
-            start_point = next((item for item in candidates if item["title"] == user_pick_place), None)
-            if not start_point:
-                return {"error": f"⚠️ 선택한 장소 '{user_pick_place}'를 후보 목록에서 찾을 수 없습니다."}
-
-            start_x = float(start_point["mapx"])
-            start_y = float(start_point["mapy"])
-
-            def euclidean_distance(item):
-                try:
-                    dx = float(item["mapx"]) - start_x
-                    dy = float(item["mapy"]) - start_y
-                    return (dx**2 + dy**2) ** 0.5
-                except Exception:
-                    return float("inf")  # 좌표 오류시 큰 거리 부여
-
-            # 시작점을 제외한 후보 중 거리 가까운 순 4개 선택
-            nearby_candidates = sorted(
-                [item for item in candidates if item["title"] != user_pick_place],
-                key=euclidean_distance
-            )[:4]
-
-            # 최종 경로 리스트 (시작점 + 웨이포인트)
-            final_route = [start_point] + nearby_candidates
-
-            # 필요한 정보만 추출하여 반환
-            route_summary = [
-                {
-                    "title": item["title"],
-                    "mapx": item["mapx"],
-                    "mapy": item["mapy"],
-                    "address": item["address"]
-                } for item in final_route
-            ]
-            print("📍 최종 추천 경로:")
-            for i, item in enumerate(route_summary):
-                if i == 0:
-                    step = "출발지"
-                elif i == len(route_summary) - 1:
-                    step = "도착지"
-                else:
-                    step = f"경유지 {i}"
-                print(f"{step}: {item['title']} (x: {item['mapx']}, y: {item['mapy']})")
-            
-            plain_text_lines = []
-
-            for i, item in enumerate(route_summary):
-                step = ""
-                if i == 0:
-                    step = " (출발지)"
-                elif i == len(route_summary) - 1:
-                    step = " (도착지)"
-                
-                line = f"{i+1}.{item['title']}: {item['address']}{step}"
-                plain_text_lines.append(line)
-
-            route_text = "\n".join(plain_text_lines)
-            
-            print(f"📜 추천 경로 요약:\n{route_text}")
-            recommendation_response = chat.send_message(
-                "플로깅 루트 추천 요청",
-                HASH_ROUTE,
-                {"recommended_route": route_text}
-            )
-            
-            recommendation_content = extract_assistant_response(recommendation_response)
-            print(f"🤖 어시스턴트 응답: \n {recommendation_response}")
-            
-            return {
-                "chat_reply": recommendation_content,
-                "user_pick_place": user_pick_place,
-                "recommended_route": route_summary,
+        if not user_pick_place:
+            return {"error": "❌ user_pick_place 값을 추출하지 못했습니다."}, None
+        logger.info("🎯 사용자가 선택한 장소: %s", user_pick_place)
+        # LLM 이 돌려준 이름이 후보와 정확히 같지 않아도 띄어쓰기/구두점 차이는 허용
+        exact = candidates.find_title(user_pick_place)
+        pick = TitleMatch(exact, 1.0, "exact") if exact is not None else matcher.resolve(user_pick_place)
+        if not pick:
+            return {"error": f"⚠️ 선택한 장소 '{user_pick_place}'를 후보 목록에서 찾을 수 없습니다."}, None
+
+    # 시작점 정보 추출
+    start_point = candidates[pick.index]
+    user_pick_place = start_point.title
+
+    start_x = start_point.mapx
+    start_y = start_point.mapy
+    if not (math.isfinite(start_x) and math.isfinite(start_y)):
+        return {"error": f"⚠️ 선택한 장소 '{user_pick_place}'의 좌표 정보가 없습니다."}, None
+
+    # 지역 전체 관광지 KD-tree(지역별 캐시)로 시작점에서 대원 거리 기준 가까운 경유지 선택
+    # (전체 목록이 캐시에 없으면 세션 후보로 대신함, 시작점과 같은 이름 제외)
+    # 목표 거리/시간이 있으면 후보를 넉넉히 뽑고 최적화 단계에서 범위에 맞게 줄임
+    region_places = await run_in_threadpool(get_region_places, *chat.region) if chat.region else None
+    pool = region_places if region_places else candidates
+    has_target = data.target_distance_m or data.target_time_min
+    nearest = pool.point_index().nearest(
+        start_x, start_y, k=WAYPOINT_POOL if has_target else WAYPOINT_COUNT,
+        exclude=lambda i: pool.titles[i] == user_pick_place
+    )
+
+    # 방문 순서 최적화 (2-opt + Or-opt), 순환 경로면 출발지로 복귀
+    stops = [start_point] + [pool[int(i)] for i, _ in nearest]
+    optimized = optimize_route(
+        [stop.mapx for stop in stops],
+        [stop.mapy for stop in stops],
+        closed=data.loop,
+        target_distance_m=data.target_distance_m,
+        target_time_min=data.target_time_min
+    )
+
+    # 최종 경로 (시작점 + 웨이포인트), 필요한 정보만 추출하여 반환
+    route_summary = [stops[i].to_dict(("title", "mapx", "mapy", "address")) for i in optimized.order]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📍 최종 추천 경로:")
+        for i, item in enumerate(route_summary):
+            if i == 0:
+                step = "출발지"
+            elif i == len(route_summary) - 1:
+                step = "도착지"
+            else:
+                step = f"경유지 {i}"
+            logger.debug("%s: %s (x: %s, y: %s)", step, item['title'], item['mapx'], item['mapy'])
+
+    plain_text_lines = []
+
+    for i, item in enumerate(route_summary):
+        step = ""
+        if i == 0:
+            step = " (출발지)"
+        elif i == len(route_summary) - 1:
+            step = " (도착지)"
+
+        line = f"{i+1}.{item['title']}: {item['address']}{step}"
+        plain_text_lines.append(line)
+
+    route_text = "\n".join(plain_text_lines)
+
+    logger.debug("📜 추천 경로 요약:\n%s", route_text)
+    return {
+        "user_pick_place": user_pick_place,
+        "recommended_route": route_summary,
+        "total_distance_m": round(optimized.distance_m)
+    }, (
+        "플로깅 루트 추천 요청",
+        HASH_ROUTE,
+        {"recommended_route": route_text}
+    )
+
+
+@app.post("/recommend/place")
+async def recommend_place(data: recommend_place_UserRequest, chat: MultiTurnChat = Depends(get_chat)):
+    logger.info("🏃 장소 추천 요청")
+    logger.debug("👤 사용자 메시지: %s", data.user_message)
+    logger.debug("📊 현재 대화 기록: %s개", len(chat.get_conversation_history()))
+
+    try:
+        result, prompt = await plan_place_recommendation(data, chat)
+        if prompt is None:
+            return result
+
+        recommendation_response = await chat.send_message(*prompt)
+        recommendation_content = extract_assistant_response(recommendation_response)
+        logger.debug("🤖 어시스턴트 응답: \n %s", recommendation_content)
+        degraded = recommendation_content is None
+        if degraded:
+            recommendation_content = degraded_reply(prompt)
+
+        return {
+            **result,
+            "chat_reply": recommendation_content,
+            "degraded": degraded,
+            "conversation_length": len(chat.get_conversation_history()),
+            "success": True
+        }
+    except Exception as e:
+        logger.warning("⚠️ 예외 발생: %s", e)
+        return {"error": f"⚠️ 예외 발생: {e}"}
+
+
+@app.post("/recommend/place/stream")
+async def recommend_place_stream(data: recommend_place_UserRequest, session_id: str = Depends(get_session_id),
+                                 chat: MultiTurnChat = Depends(get_chat)):
+    """
+    /recommend/place 의 SSE 스트리밍 버전
+    - meta: 후보 목록 / 경로 요약 등 구조화 데이터 (LLM 응답 전에 먼저 전송)
+    - delta: 어시스턴트 응답 조각
+    - done: 완료 (대화 기록 길이 포함), error: 오류
+    """
+    logger.info("🏃 장소 추천 스트리밍 요청")
+    logger.debug("👤 사용자 메시지: %s", data.user_message)
+
+    async def events():
+        try:
+            result, prompt = await plan_place_recommendation(data, chat)
+            if prompt is None:
+                yield sse_event("error" if "error" in result else "done", result)
+                return
+            yield sse_event("meta", result)
+            received = False
+            try:
+                async for delta in chat.stream_message(*prompt):
+                    received = True
+                    yield sse_event("delta", {"content": delta})
+            except (UpstreamError, *RETRY_ERRORS) as e:
+                # 응답을 보내기 시작한 뒤의 실패는 오류로, 시작 전이면 목록만 담은 대체 답변으로
+                if received:
+                    raise
+                logger.warning("⚠️ LaaS 스트리밍 실패, 대체 답변 사용: %s", e)
+            if not received:
+                yield sse_event("delta", {"content": degraded_reply(prompt)})
+            yield sse_event("done", {
                 "conversation_length": len(chat.get_conversation_history()),
+                "degraded": not received,
                 "success": True
-            }
-            
-        else:
-            return {"error": "❌ user_pick_place 값을 추출하지 못했습니다."}
+            })
+        except Exception as e:
+            logger.warning("⚠️ 예외 발생: %s", e)
+            yield sse_event("error", {"error": f"⚠️ 예외 발생: {e}"})
+        finally:
+            # 스트림이 끝난 뒤의 대화 기록까지 저장
+            session_store.save(session_id, chat)
+
+    return sse_response(events(), session_id)
+
+# ========================== ③ 도보 경로 ==========================
+@app.post("/route/pedestrian")
+async def pedestrian_route(data: PedestrianRouteRequest):
+    """
+    추천 경로 지점들을 잇는 도보 경로 (Tmap)
+    - 경유지 제한에 맞게 구간을 나눠 동시에 요청하고 하나의 단순화된 경로로 합침
+    """
+    logger.info("🚶 도보 경로 요청: %s개 지점", len(data.recommended_route))
+    if len(data.recommended_route) < 2:
+        return {"error": "⚠️ 경로에는 최소 2개 지점이 필요합니다.", "success": False}
+
+    try:
+        route = await get_walking_route(
+            [(p.mapx, p.mapy) for p in data.recommended_route],
+            search_option=data.search_option,
+            tolerance_m=data.simplify_tolerance_m
+        )
+        logger.info("✅ 도보 경로 완료: %s개 구간, %sm, 좌표 %s → %s",
+                    route['segments'], route['distance_m'], route['raw_points'], len(route['path']))
+        return {**route, "success": True}
+    except Exception as e:
+        logger.warning("⚠️ 도보 경로 처리 중 예외: %s", e)
+        return {"error": f"⚠️ 도보 경로 처리 중 오류가 발생했습니다: {str(e)}", "success": False}
 
 #  ========================== ④ 이미지 대화 ==========================
 
 @app.post("/chat/image")
-def image_chat(data: ImageChatRequest):
+async def image_chat(data: ImageChatRequest, chat: MultiTurnChat = Depends(get_chat)):
     """
     이미지와 함께 대화를 진행하는 엔드포인트
     """
-    print(f"🖼️ 이미지 대화 요청")
-    print(f"👤 사용자 메시지: {data.user_message}")
-    print(f"🔗 이미지 URL: {data.image_url[:50]}...")
-    print(f"📊 현재 대화 기록: {len(chat.get_conversation_history())}개")
+    logger.info("🖼️ 이미지 대화 요청")
+    logger.debug("👤 사용자 메시지: %s", data.user_message)
+    logger.debug("🔗 이미지 URL: %s...", data.image_url[:50])
+    logger.debug("📊 현재 대화 기록: %s개", len(chat.get_conversation_history()))
 
     # 이미지 URL 유효성 검증
     if not validate_image_url(data.image_url):
@@ -329,12 +597,12 @@ def image_chat(data: ImageChatRequest):
         }
 
     try:
-        
-        # 이미지와 함께 메시지 전송
-        response = chat.send_message_with_image(
+        # 업로드 사진 축소/재인코딩 후 이미지와 함께 메시지 전송
+        image_url = await prepare_image(data.image_url)
+        response = await chat.send_message_with_image(
             hash=HASH_IMAGE,
             user_message=data.user_message,
-            image_url=data.image_url
+            image_url=image_url
         )
 
         if response is None:
@@ -347,7 +615,7 @@ def image_chat(data: ImageChatRequest):
         assistant_response = extract_image_chat_response(response)
         
         if assistant_response:
-            print(f"🤖 어시스턴트 응답: {assistant_response[:100]}...")
+            logger.debug("🤖 어시스턴트 응답: %s...", assistant_response[:100])
             
             return {
                 "chat_reply": assistant_response,
@@ -363,130 +631,203 @@ def image_chat(data: ImageChatRequest):
             }
             
     except Exception as e:
-        print(f"⚠️ 이미지 대화 처리 중 예외 발생: {e}")
+        logger.warning("⚠️ 이미지 대화 처리 중 예외 발생: %s", e)
         return {
             "error": f"⚠️ 이미지 대화 처리 중 오류가 발생했습니다: {str(e)}",
             "success": False
         }
 
+@app.post("/chat/image/stream")
+async def image_chat_stream(data: ImageChatRequest, session_id: str = Depends(get_session_id),
+                            chat: MultiTurnChat = Depends(get_chat)):
+    """
+    /chat/image 의 SSE 스트리밍 버전 (meta → delta... → done / error)
+    """
+    logger.info("🖼️ 이미지 대화 스트리밍 요청")
+    logger.debug("👤 사용자 메시지: %s", data.user_message)
+
+    async def events():
+        if not validate_image_url(data.image_url):
+            yield sse_event("error", {
+                "error": "⚠️ 올바르지 않은 이미지 URL 형식입니다. PNG, JPG, JPEG, GIF, BMP, WEBP 형식만 지원됩니다.",
+                "success": False
+            })
+            return
+        try:
+            yield sse_event("meta", {"image_processed": True})
+            image_url = await prepare_image(data.image_url)
+            async for delta in chat.stream_message_with_image(
+                hash=HASH_IMAGE,
+                user_message=data.user_message,
+                image_url=image_url
+            ):
+                yield sse_event("delta", {"content": delta})
+            yield sse_event("done", {
+                "conversation_length": len(chat.get_conversation_history()),
+                "success": True
+            })
+        except Exception as e:
+            logger.warning("⚠️ 이미지 대화 처리 중 예외 발생: %s", e)
+            yield sse_event("error", {
+                "error": f"⚠️ 이미지 대화 처리 중 오류가 발생했습니다: {str(e)}",
+                "success": False
+            })
+        finally:
+            session_store.save(session_id, chat)
+
+    return sse_response(events(), session_id)
+
 # ========================== ⑤ 쓰봉판단 ==========================
 
 @app.post("/evaluate/trashbag")
-def evaluate_trashbag(data: TrashbagEvaluateRequest):
+async def evaluate_trashbag(data: TrashbagEvaluateRequest, chat: MultiTurnChat = Depends(get_chat)):
     """
     플로깅 쓰봉판단 요청
     - prompt: 프롬프트(지시문)
     - image_base64: base64 인코딩 이미지
     """
-    print(f"🗑️ 쓰봉판단 요청: {data.prompt[:30]}... (이미지 {len(data.image_base64)} bytes)")
+    logger.info("🗑️ 쓰봉판단 요청: %s... (이미지 %s bytes)", data.prompt[:30], len(data.image_base64))
     try:
-        # LaaS API로 멀티모달 메시지 전송
-        message_content = [
-            {"type": "image_url", "image_url": {"url": data.image_base64}},
-            {"type": "text", "text": data.prompt}
-        ]
-        chat.conversation_history.append({"role": "user", "content": message_content})
-        req_data = {
-            "hash": HASH_TRASHBAG,
-            "params": {},
-            "messages": chat.conversation_history.copy()
-        }
-        response = chat.send_message(
-            user_message=data.prompt,
+        # LaaS API로 멀티모달 메시지 전송 (사진은 축소/재인코딩)
+        image_url = await prepare_image(data.image_base64)
+        response = await chat.send_message_with_image(
             hash=HASH_TRASHBAG,
-            param=None
+            user_message=data.prompt,
+            image_url=image_url
         )
         result = extract_assistant_response(response)
-        print(f"🤖 쓰봉판단 결과: {result}")
+        logger.debug("🤖 쓰봉판단 결과: %s", result)
         return {
             "result": result,
             "success": True
         }
     except Exception as e:
-        print(f"⚠️ 쓰봉판단 처리 중 예외: {e}")
+        logger.warning("⚠️ 쓰봉판단 처리 중 예외: %s", e)
         return {"error": str(e), "success": False}
 
+@app.post("/evaluate/trashbag/batch")
+async def evaluate_trashbag_batch(data: TrashbagBatchRequest, session_id: str = Depends(get_session_id)):
+    """
+    쓰봉판단 일괄 요청 (SSE: meta → result... → done)
+    - 동시 호출 수 제한, 끝나는 순서대로 result 이벤트 전송
+    - 거의 같은 사진은 이전 판단 재사용
+    """
+    logger.info("🗑️ 쓰봉판단 일괄 요청: %s장", len(data.images))
+
+    async def events():
+        if not data.images or len(data.images) > TRASHBAG_BATCH_MAX_IMAGES:
+            yield sse_event("error", {
+                "error": f"⚠️ 이미지는 1~{TRASHBAG_BATCH_MAX_IMAGES}장까지 보낼 수 있습니다.",
+                "success": False
+            })
+            return
+        yield sse_event("meta", {"count": len(data.images)})
+        sources = {}
+        async for item in evaluate_batch(data.prompt, data.images):
+            source = item.get("source", "error")
+            sources[source] = sources.get(source, 0) + 1
+            yield sse_event("result", item)
+        logger.info("✅ 쓰봉판단 일괄 완료: %s", sources)
+        yield sse_event("done", {"count": len(data.images), "sources": sources, "success": True})
+
+    return sse_response(events(), session_id)
+
 # ========================== ⑥ 플로깅 쓰레기통 RAG ==========================
 @app.post("/location/trashRAG")
-def get_trash_RAG(data: TrashRAG):
+async def get_trash_RAG(data: TrashRAG, chat: MultiTurnChat = Depends(get_chat)):
     """
-    특정 지역의 플로깅 쓰레기통 위치 정보를 요청하고, 위도/경도 추출
+    특정 지역의 플로깅 쓰레기통 위치 정보 (로컬 인덱스에서 바로 응답, 없는 지역만 문서 컬렉션에서 수집)
     """
-    print(f"📍 쓰레기통 RAG 요청: {data.area_name} {data.sigungu_name}")
-    print(f"📊 현재 대화 기록: {chat.get_conversation_history()}")
-    
-    #이전 대화 기록 초기화
-    chat.clear_history()
-    message_content = f"{data.area_name} {data.sigungu_name} 지역의 쓰레기통 위치 정보 요청"
-
-    response = chat.send_message(
-        message_content,
-        HASH_RAG
-    )
+    logger.info("📍 쓰레기통 위치 요청: %s %s", data.area_name, data.sigungu_name)
 
     try:
-        content = extract_assistant_response(response)
-        print(f"🤖 어시스턴트 응답: {content}")
-
-        try:
-            # ✅ 배열 형태로 감싸기 전처리
-            if not content.strip().startswith("["):
-                # 쉼표로 구분된 다수의 JSON 객체 → 배열로 감싸기
-                # (단순히 {} 블록을 찾아 배열 형태로 구성)
-                json_objects = re.findall(r'{.*?}', content, re.DOTALL)
-                content = "[" + ",".join(json_objects) + "]"
-
-            trash_data = json.loads(content)
-            
-            if isinstance(trash_data, list):
-                locations = []
-                for item in trash_data:
-                    try:
-                        lat = float(item.get("위도"))
-                        lng = float(item.get("경도"))
-                        locations.append({
-                            "name": item.get("설치장소명"),
-                            "lat": lat,
-                            "lng": lng,
-                            "address": item.get("소재지도로명주소")
-                        })
-                    except Exception as e:
-                        print(f"⚠️ 위도/경도 파싱 실패: {e}")
-                        continue
-                print(f"📍 추출된 쓰레기통 위치 수: {locations}")
-                return {
-                    "area": data.area_name,
-                    "sigungu": data.sigungu_name,
-                    "trash_locations": locations,
-                    "count": len(locations),
-                    "conversation_length": len(chat.get_conversation_history()),
-                    "success": True
-                }
-            else:
-                return {
-                    "message": content,
-                    "warning": "⚠️ 예상한 JSON 배열 형식이 아닙니다.",
-                    "conversation_length": len(chat.get_conversation_history()),
-                    "success": False
-                }
+        region = trash_index.get(data.area_name, data.sigungu_name)
+        if region is None:
+            await run_in_threadpool(trash_index.ingest_region, data.area_name, data.sigungu_name)
+            region = trash_index.get(data.area_name, data.sigungu_name)
 
-        except json.JSONDecodeError:
-            print("⚠️ JSON 파싱 실패")
-            return {
-                "message": content,
-                "warning": "⚠️ JSON 파싱 실패. 텍스트 응답입니다.",
-                "conversation_length": len(chat.get_conversation_history()),
-                "success": False
-            }
+        locations = region.bins if region else []
+        logger.info("📍 쓰레기통 위치 수: %s", len(locations))
+        return {
+            "area": data.area_name,
+            "sigungu": data.sigungu_name,
+            "trash_locations": locations,
+            "count": len(locations),
+            "conversation_length": len(chat.get_conversation_history()),
+            "success": True
+        }
 
     except Exception as e:
-        print(f"⚠️ 예외 발생: {e}")
+        logger.warning("⚠️ 예외 발생: %s", e)
         return {"error": f"⚠️ 예외 발생: {e}"}
 
+@app.post("/location/trash/route")
+async def get_trash_along_route(data: TrashRouteRequest):
+    """
+    경로 주변(width_m 이내) 쓰레기통만, 경로를 따라가는 순서대로 반환
+    """
+    if data.path:
+        path = data.path
+    elif data.recommended_route:
+        path = [[p.mapx, p.mapy] for p in data.recommended_route]
+    else:
+        return {"error": "⚠️ path 또는 recommended_route 가 필요합니다.", "success": False}
+    logger.info("🗑️ 경로 주변 쓰레기통 요청: %s %s, 좌표 %s개, %sm", data.area_name, data.sigungu_name, len(path), data.width_m)
+
+    try:
+        region = trash_index.get(data.area_name, data.sigungu_name)
+        if region is None:
+            await run_in_threadpool(trash_index.ingest_region, data.area_name, data.sigungu_name)
+            region = trash_index.get(data.area_name, data.sigungu_name)
+
+        locations = region.along_route(path, data.width_m) if region else []
+        logger.info("📍 경로 주변 쓰레기통 수: %s", len(locations))
+        return {
+            "area": data.area_name,
+            "sigungu": data.sigungu_name,
+            "width_m": data.width_m,
+            "trash_locations": locations,
+            "count": len(locations),
+            "success": True
+        }
+    except Exception as e:
+        logger.warning("⚠️ 예외 발생: %s", e)
+        return {"error": f"⚠️ 예외 발생: {e}", "success": False}
+
 #========================== 상태 확인 ==========================
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 지표 (단계별 지연 시간 히스토그램, 페이로드 크기, 오류 수)
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/stats")
+async def stats():
+    """
+    운영 지표 (해시별 페이로드 크기 절감률, LaaS 지연 시간 등)
+    """
+    return {
+        "sessions": session_store.count(),
+        "context": context_stats.snapshot(),
+        "llm_cache": llm_cache.stats(),
+        "gazetteer": gazetteer.stats(),
+        "start_place_match": match_stats.snapshot(),
+        "tour_cache": tour_cache.stats(),
+        "region_places": region_places_stats(),
+        "tmap": route_stats(),
+        "trash_regions": trash_index.region_count(),
+        "images": image_stats.snapshot(),
+        "blobs": blob_store.stats(),
+        "trashbag_verdicts": verdict_cache.stats(),
+        "singleflight": singleflight_stats(),
+        "upstream": upstream_stats()
+    }
+
 @app.get("/")
-def root():
+async def root(chat: MultiTurnChat = Depends(get_chat)):
     return {
         "message": "🚀 플로깅 추천 API 서버가 정상 작동중입니다!",
         "conversation_length": len(chat.get_conversation_history()),
@@ -494,6 +835,10 @@ def root():
             "location_extract": "/location/extract",
             "place_recommend": "/recommend/place", 
             "route_recommend": "/recommend/route",
+            "pedestrian_route": "/route/pedestrian",
+            "trash_along_route": "/location/trash/route",
+            "trashbag_batch": "/evaluate/trashbag/batch",
+            "metrics": "/metrics",
             "general_chat": "/chat/general"
         }
     }
@@ -502,4 +847,5 @@ if __name__ == '__main__':
     print("🚀 플로깅 추천 API 서버 시작!")
     print("📝 멀티턴 대화 지원")
     print("🔗 Swagger UI: http://localhost:8000/docs")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=1, limit_concurrency=1000, reload=True)
+    # 멀티 워커는 SESSION_BACKEND=sqlite 와 함께 사용 (reload는 단일 워커에서만 지원)
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=UVICORN_WORKERS, limit_concurrency=1000, reload=UVICORN_WORKERS == 1)
@@ -0,0 +1,151 @@
+"""
+단계별 지연 시간 / 페이로드 크기 / 오류 지표 (Prometheus 텍스트 형식, GET /metrics)
+
+    with span("tour_api", op="areaBasedList2"):
+        ...
+
+    @timed("sigungu_code")
+    def get_sigungu_code(...): ...
+
+- span: 구간 시간을 stage_duration_seconds 히스토그램에 기록, 예외가 나면 stage_errors_total 증가
+  (with 블록은 async 함수 안에서도 그대로 사용)
+- observe_bytes: payload_bytes 히스토그램 (LaaS 요청/응답, 이미지 등)
+- count_error: 예외 없이 실패한 호출 (예: upstream 4xx/5xx)
+지표는 프로세스(워커)별로 집계됩니다.
+"""
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{v}"'.replace("\n", " ") for k, v in items)
+    return "{" + body + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in sorted(items):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(key)} {series[-1]}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+stage_duration = Histogram("stage_duration_seconds", "단계별 처리 시간", LATENCY_BUCKETS)
+stage_errors = Counter("stage_errors_total", "단계별 오류 수")
+payload_bytes = Histogram("payload_bytes", "upstream 요청/응답 크기", SIZE_BUCKETS)
+http_duration = Histogram("http_request_duration_seconds", "API 요청 처리 시간", LATENCY_BUCKETS)
+upstream_events = Counter("upstream_events_total", "upstream 재시도 / 헤지 요청 / 회로 차단 수")
+
+_REGISTRY = (http_duration, stage_duration, stage_errors, payload_bytes, upstream_events)
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """구간 시간 기록 (예외는 오류로 세고 그대로 다시 던짐)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+            stage_errors.inc(stage=stage, error=type(e).__name__, **labels)
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - started, stage=stage, **labels)
+
+
+def timed(stage: str, **labels):
+    """함수 전체를 span 으로 감싸는 데코레이터 (동기/코루틴 함수 모두 지원)"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_bytes(kind: str, size: int, **labels):
+    payload_bytes.observe(size, kind=kind, **labels)
+
+
+def count_error(stage: str, error: str, **labels):
+    stage_errors.inc(stage=stage, error=error, **labels)
+
+
+def render() -> str:
+    """Prometheus 텍스트 노출 형식"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
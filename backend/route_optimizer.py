@@ -0,0 +1,222 @@
+"""
+플로깅 경로 순서 최적화 (거리 행렬 기반 TSP 휴리스틱)
+
+- 거리 행렬: haversine 브로드캐스팅으로 한 번에 계산
+- 초기해: 최근접 이웃
+- 개선: 2-opt + Or-opt (구간 길이 1~3 이동), 후보 위치 평가는 NumPy로 벡터화
+- 노드가 EXACT_MAX_NODES 개 이하면 휴리스틱 대신 Held-Karp 동적 계획법으로 최적해
+- 열린 경로(출발지 고정, 도착지 자유)는 출발지에만 0, 나머지엔 큰 값으로 연결된
+  가상 노드를 넣은 순환 경로로 풀어서 같은 개선 루틴을 그대로 사용
+- 목표 거리/시간이 주어지면 넘는 동안 빼도 손해가 가장 적은 경유지를 제거
+"""
+from typing import List, NamedTuple, Optional, Sequence
+import numpy as np
+from geo import haversine
+
+WALKING_SPEED_M_PER_MIN = 67.0  # 약 4km/h (플로깅은 일반 보행보다 느림)
+_EPS = 1e-6
+EXACT_MAX_NODES = 8  # 가상 노드 포함 (기본 경로: 출발지 + 경유지 4 + 가상 노드 = 6)
+
+
+class RouteResult(NamedTuple):
+    order: List[int]      # 방문 순서 (입력 인덱스, 0 = 출발지). 순환 경로면 마지막에 출발지로 돌아감
+    distance_m: float     # 총 거리 (순환 경로는 복귀 구간 포함)
+    dropped: List[int]    # 목표 거리 때문에 제외된 입력 인덱스
+
+
+def distance_matrix(lons: Sequence[float], lats: Sequence[float]) -> np.ndarray:
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    return haversine(lons[:, None], lats[:, None], lons[None, :], lats[None, :])
+
+
+def _nearest_neighbour(dist: np.ndarray, start: int) -> List[int]:
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, dist[tour[-1]])
+        nxt = int(np.argmin(row))
+        tour.append(nxt)
+        visited[nxt] = True
+    return tour
+
+
+def _two_opt_move(t: np.ndarray, dist: np.ndarray) -> Optional[np.ndarray]:
+    """모든 (i, j) 간선 쌍의 2-opt 이득을 한 번에 계산해 가장 좋은 뒤집기 적용 (첫 위치 고정)"""
+    m = len(t)
+    nxt = np.concatenate((t[1:], t[:1]))
+    edge = dist[t, nxt]
+    delta = dist[t[:, None], t[None, :]] + dist[nxt[:, None], nxt[None, :]] - edge[:, None] - edge[None, :]
+    i_idx, j_idx = np.indices((m, m))
+    delta[(j_idx < i_idx + 2) | ((i_idx == 0) & (j_idx == m - 1))] = np.inf
+    i, j = np.unravel_index(int(np.argmin(delta)), delta.shape)
+    if delta[i, j] >= -_EPS:
+        return None
+    t = t.copy()
+    t[i + 1:j + 1] = t[i + 1:j + 1][::-1]
+    return t
+
+
+def _or_opt_move(t: np.ndarray, dist: np.ndarray) -> Optional[np.ndarray]:
+    """길이 1~3 구간을 (뒤집기 포함) 다른 간선 사이로 옮기는 이동 중 가장 좋은 것 적용 (첫 위치 고정)"""
+    m = len(t)
+    nxt = np.concatenate((t[1:], t[:1]))
+    edge = dist[t, nxt]
+    k_idx = np.arange(m)
+    best = (-_EPS, None)
+    for seg_len in (1, 2, 3):
+        if m - seg_len < 3:
+            continue
+        starts = np.arange(1, m - seg_len + 1)
+        first, last = t[starts], t[starts + seg_len - 1]
+        prev, after = t[starts - 1], t[(starts + seg_len) % m]
+        removed = dist[prev, first] + dist[last, after] - dist[prev, after]
+        # 구간에 닿아 있는 간선 (i-1 ~ i+seg_len-1) 은 삽입 위치에서 제외
+        offset = (k_idx[None, :] - (starts[:, None] - 1)) % m
+        blocked = offset <= seg_len
+        for reverse in (False, True):
+            a, b = (last, first) if reverse else (first, last)
+            gain = dist[t[None, :], a[:, None]] + dist[b[:, None], nxt[None, :]] - edge[None, :] - removed[:, None]
+            gain[blocked] = np.inf
+            r, k = np.unravel_index(int(np.argmin(gain)), gain.shape)
+            if gain[r, k] < best[0]:
+                best = (gain[r, k], (int(starts[r]), seg_len, int(k), reverse))
+    if best[1] is None:
+        return None
+    i, seg_len, k, reverse = best[1]
+    seg = t[i:i + seg_len][::-1] if reverse else t[i:i + seg_len]
+    rest = np.concatenate([t[:i], t[i + seg_len:]])
+    at = k + 1 if k < i else k + 1 - seg_len  # 구간 제거 후 삽입 위치
+    return np.concatenate([rest[:at], seg, rest[at:]])
+
+
+def _held_karp(dist: np.ndarray) -> List[int]:
+    """0번에서 출발하는 최단 순환 경로 (부분집합 DP, 노드 m개에 O(2^m · m²))"""
+    m = len(dist)
+    full = 1 << (m - 1)  # 1..m-1 번 노드의 방문 집합
+    cost = np.full((full, m), np.inf)
+    parent = np.full((full, m), -1, dtype=np.int64)
+    for j in range(1, m):
+        cost[1 << (j - 1), j] = dist[0, j]
+    for mask in range(1, full):
+        for j in range(1, m):
+            if not mask & (1 << (j - 1)) or not np.isfinite(cost[mask, j]):
+                continue
+            for k in range(1, m):
+                bit = 1 << (k - 1)
+                if mask & bit:
+                    continue
+                c = cost[mask, j] + dist[j, k]
+                if c < cost[mask | bit, k]:
+                    cost[mask | bit, k] = c
+                    parent[mask | bit, k] = j
+    last = int(np.argmin(cost[full - 1, 1:] + dist[1:, 0])) + 1
+    tour, mask = [], full - 1
+    while last > 0:
+        tour.append(last)
+        mask, last = mask & ~(1 << (last - 1)), int(parent[mask, last])
+    return [0] + tour[::-1]
+
+
+def _solve(dist: np.ndarray) -> List[int]:
+    """순환 경로 (작으면 정확해, 크면 최근접 이웃 + 2-opt/Or-opt)"""
+    if len(dist) <= EXACT_MAX_NODES:
+        return _held_karp(dist)
+    return _improve(_nearest_neighbour(dist, 0), dist)
+
+
+def _improve(tour: List[int], dist: np.ndarray) -> List[int]:
+    """2-opt로 더 못 줄일 때 Or-opt 한 번, 둘 다 개선이 없으면 종료"""
+    t = np.asarray(tour)
+    while True:
+        moved = _two_opt_move(t, dist)
+        if moved is None:
+            moved = _or_opt_move(t, dist)
+            if moved is None:
+                return t.tolist()
+        t = moved
+
+
+def optimize_route(lons: Sequence[float], lats: Sequence[float], closed: bool = False,
+                   target_distance_m: Optional[float] = None,
+                   target_time_min: Optional[float] = None) -> RouteResult:
+    """
+    0번 좌표를 출발지로 고정한 방문 순서 최적화
+    - closed: 출발지로 돌아오는 순환 경로
+    - target_distance_m / target_time_min: 총 거리 상한 (둘 다 주어지면 더 짧은 쪽)
+    """
+    n = len(lons)
+    if n <= 2:
+        order = list(range(n)) + ([0] if closed and n > 1 else [])
+        dist = distance_matrix(lons, lats) if n else np.zeros((0, 0))
+        length = float(sum(dist[a, b] for a, b in zip(order, order[1:])))
+        return RouteResult(order, length, [])
+
+    base = distance_matrix(lons, lats)
+    if closed:
+        dist = base
+    else:
+        # 가상 노드 n: 출발지와는 0, 나머지와는 큰 값 → 항상 출발지 옆에 붙어 열린 경로가 됨
+        big = float(base.max()) * n + 1.0
+        dist = np.full((n + 1, n + 1), big)
+        dist[:n, :n] = base
+        dist[n, n] = 0.0
+        dist[n, 0] = dist[0, n] = 0.0
+
+    tour = _solve(dist)
+    order = _to_order(tour, n, closed)
+
+    limit = _limit(target_distance_m, target_time_min)
+    dropped: List[int] = []
+    if limit is not None:
+        while len(order) > (3 if closed else 2) and _path_length(order, base) > limit:
+            # 빼면 가장 많이 줄어드는 경유지 제거 (출발지 제외)
+            inner = order[1:-1] if closed else order[1:]
+            gains = []
+            for pos, node in enumerate(inner, start=1):
+                prev = order[pos - 1]
+                nxt = order[pos + 1] if pos + 1 < len(order) else None
+                gain = base[prev, node] + (base[node, nxt] - base[prev, nxt] if nxt is not None else 0.0)
+                gains.append(gain)
+            pos = int(np.argmax(gains)) + 1
+            dropped.append(order.pop(pos))
+        if dropped:
+            keep = [i for i in range(n) if i not in set(dropped)]
+            sub = _solve(_sub_matrix(dist, keep, closed, n))
+            reordered = [keep[i] for i in _to_order(sub, len(keep), closed)]
+            if _path_length(reordered, base) < _path_length(order, base):
+                order = reordered
+
+    return RouteResult(order, _path_length(order, base), dropped)
+
+
+def _limit(target_distance_m: Optional[float], target_time_min: Optional[float]) -> Optional[float]:
+    limits = [v for v in (target_distance_m,
+                          target_time_min * WALKING_SPEED_M_PER_MIN if target_time_min else None) if v]
+    return min(limits) if limits else None
+
+
+def _sub_matrix(dist: np.ndarray, keep: List[int], closed: bool, n: int) -> np.ndarray:
+    idx = keep if closed else keep + [n]
+    return dist[np.ix_(idx, idx)]
+
+
+def _to_order(tour: List[int], n: int, closed: bool) -> List[int]:
+    """순환 경로 → 출발지(0)부터 시작하는 방문 순서"""
+    start = tour.index(0)
+    tour = tour[start:] + tour[:start]
+    if closed:
+        return tour + [0]
+    # 가상 노드(n)가 출발지 바로 다음이면 방향을 뒤집어 출발지 → ... 순서로 맞춤
+    if tour[1] == n:
+        tour = [0] + tour[1:][::-1]
+    return [i for i in tour if i != n]
+
+
+def _path_length(order: List[int], dist: np.ndarray) -> float:
+    if len(order) < 2:
+        return 0.0
+    o = np.asarray(order)
+    return float(dist[o[:-1], o[1:]].sum())
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+from laas_api import MultiTurnChat
+from ttl_cache import TTLCache
+from config import SESSION_BACKEND, SESSION_DB_PATH, SESSION_TTL, SESSION_MAX_SESSIONS, SESSION_MAX_BYTES
+from log import logger
+
+
+class SessionStore(ABC):
+    """세션 ID -> MultiTurnChat 저장소 인터페이스"""
+
+    @abstractmethod
+    def load(self, session_id: str) -> MultiTurnChat:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, chat: MultiTurnChat):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """
+    프로세스 내부 세션 저장소 (LRU + TTL + 메모리 상한)
+    - 워커 1개일 때 가장 빠름 (직렬화 없음)
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, ttl: float = SESSION_TTL,
+                 max_bytes: int = SESSION_MAX_BYTES):
+        self._cache = TTLCache(
+            maxsize=max_sessions,
+            ttl=ttl,
+            max_bytes=max_bytes,
+            sizeof=lambda chat: chat.estimate_size()
+        )
+
+    def load(self, session_id: str) -> MultiTurnChat:
+        chat = self._cache.get(session_id)
+        if chat is None:
+            chat = MultiTurnChat()
+            self._cache.set(session_id, chat)
+        return chat
+
+    def save(self, session_id: str, chat: MultiTurnChat):
+        # 같은 객체를 다시 넣어 TTL 갱신 + 크기 재계산
+        self._cache.set(session_id, chat)
+
+    def delete(self, session_id: str):
+        self._cache.pop(session_id)
+
+    def count(self) -> int:
+        return len(self._cache)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SQLite 기반 세션 저장소 (uvicorn 멀티 워커 간 공유)
+    - WAL 모드로 여러 프로세스의 동시 읽기/쓰기 허용
+    - 저장 시 TTL 만료 세션과 상한 초과 세션(오래된 순)을 주기적으로 정리
+    """
+
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX_SESSIONS,
+                 ttl: float = SESSION_TTL):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+
+    def load(self, session_id: str) -> MultiTurnChat:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        if row is None or row[1] + self.ttl <= time.time():
+            return MultiTurnChat()
+        try:
+            return MultiTurnChat.from_dict(json.loads(row[0]))
+        except json.JSONDecodeError:
+            logger.warning("⚠️ 세션 데이터 손상: %s", session_id)
+            return MultiTurnChat()
+
+    def save(self, session_id: str, chat: MultiTurnChat):
+        data = json.dumps(chat.to_dict(), ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (session_id, data, now)
+            )
+            if now - self._last_prune >= self.PRUNE_INTERVAL:
+                self._prune(now)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _prune(self, now: float):
+        self._last_prune = now
+        self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM sessions WHERE id IN ("
+            " SELECT id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+
+
+def create_session_store(backend: Optional[str] = None) -> SessionStore:
+    """설정값(SESSION_BACKEND)에 따라 세션 저장소 생성"""
+    backend = (backend or SESSION_BACKEND).lower()
+    if backend == "sqlite":
+        return SqliteSessionStore()
+    if backend != "memory":
+        logger.warning("⚠️ 알 수 없는 세션 백엔드 '%s', memory 사용", backend)
+    return MemorySessionStore()
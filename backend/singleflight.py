@@ -0,0 +1,97 @@
+"""
+동일 요청 합치기 (single-flight)
+
+같은 키로 동시에 들어온 호출은 첫 호출 하나만 실제로 실행하고,
+나머지는 그 결과(또는 예외)를 함께 받습니다. 결과를 저장하지는 않으므로
+캐시와는 별개로, 캐시가 비어 있는 순간의 중복 upstream 호출을 막는 용도입니다.
+
+- do(key, fn, ...): 동기 함수 (스레드풀에서 호출되는 Tour API 등)
+- ado(key, fn, ...): 코루틴 함수 (LaaS, Tmap 등)
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# 이름별 인스턴스 (/stats 에서 한 번에 조회)
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0       # 전체 호출 수
+        self.executions = 0  # 실제 실행 수
+        self.collapsed = 0   # 다른 호출에 합쳐진 수
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        _registry[name] = self
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is None:
+            # 별도 태스크로 실행해 첫 호출자가 취소돼도 기다리는 다른 호출자에게 결과가 전달되도록 함
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # 기다리는 쪽이 모두 취소됐을 때 예외 미확인 경고가 뜨지 않도록 처리
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "inflight": len(self._calls) + len(self._tasks)
+        }
+
+
+def singleflight_stats() -> Dict[str, dict]:
+    return {name: flight.stats() for name, flight in _registry.items()}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# backend 모듈은 "from config import ..." 처럼 평면 import 를 사용하므로 backend 디렉터리를 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+import json
+import pytest
+import tour_api
+from area_index import AreaIndex
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    index = AreaIndex(str(tmp_path / "area_codes.json"))
+    index.set_area("1", "서울", {"1": "강남구"})
+    monkeypatch.setattr(tour_api, "area_index", index)
+    return index
+
+
+@pytest.mark.parametrize("area_code", [None, ""])
+def test_missing_area_code_skips_remote_lookup(index, monkeypatch, area_code):
+    def fetch(*args):
+        raise AssertionError("areaCode2 를 호출하면 안 됨")
+
+    monkeypatch.setattr(tour_api, "fetch_area_codes", fetch)
+    assert tour_api.get_sigungu_code(area_code, "강남구") is None
+    assert list(index.areas) == ["1"]
+
+
+def test_set_area_rejects_missing_area_code(index):
+    with pytest.raises(ValueError):
+        index.set_area(None, "None", {"1": "서울"})
+
+
+def test_load_drops_entries_saved_without_area_code(index):
+    index.save()
+    with open(index.path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["areas"]["None"] = {"name": "None", "sigungu": {"1": "서울"}}
+    with open(index.path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    loaded = AreaIndex(index.path)
+    assert loaded.load()
+    assert list(loaded.areas) == ["1"]
+    assert loaded.lookup("1", "강남") == "1"
@@ -0,0 +1,58 @@
+import json
+import math
+import numpy as np
+from candidates import Candidate, CandidateStore
+
+ITEMS = [
+    {"title": "봉은사", "address": "서울특별시 강남구 봉은사로 531", "contentid": "126508", "overview": "사찰",
+     "mapx": "127.0577", "mapy": "37.5150"},
+    {"title": "코엑스", "address": "서울특별시 강남구 영동대로 513", "contentid": "", "overview": "",
+     "mapx": "", "mapy": None},
+    {"title": "선릉과 정릉", "address": "서울특별시 강남구 선릉로100길 1", "contentid": "126509", "overview": "",
+     "mapx": 127.0489, "mapy": 37.5088},
+]
+
+
+def test_columns_are_parsed_once():
+    store = CandidateStore.from_items(ITEMS)
+    assert len(store) == 3
+    assert store.lons.dtype == np.float64 and store.contentids.dtype == np.int64
+    assert store.contentids.tolist() == [126508, -1, 126509]
+    assert math.isnan(store.lons[1]) and math.isnan(store.lats[1])
+
+
+def test_strings_are_interned():
+    a = CandidateStore.from_items(ITEMS)
+    b = CandidateStore.from_items([dict(item) for item in ITEMS])
+    assert all(x is y for x, y in zip(a.titles, b.titles))
+
+
+def test_row_access_and_json_shape():
+    store = CandidateStore.from_items(ITEMS)
+    row = store[0]
+    assert isinstance(row, Candidate) and not hasattr(row, "__dict__")
+    assert row.to_dict() == {"title": "봉은사", "address": "서울특별시 강남구 봉은사로 531", "contentid": "126508",
+                             "overview": "사찰", "mapx": 127.0577, "mapy": 37.515}
+    assert store.to_list([1], fields=("title", "mapx", "contentid")) == [{"title": "코엑스", "mapx": None, "contentid": ""}]
+
+
+def test_places_text():
+    store = CandidateStore.from_items(ITEMS[:2])
+    assert store.places_text() == "- 봉은사: 서울특별시 강남구 봉은사로 531\n- 코엑스: 서울특별시 강남구 영동대로 513"
+
+
+def test_column_round_trip_through_json():
+    store = CandidateStore.from_items(ITEMS)
+    restored = CandidateStore.load(json.loads(json.dumps(store.to_columns(), allow_nan=False)))
+    assert restored.to_list() == store.to_list()
+
+
+def test_load_accepts_old_list_format():
+    assert CandidateStore.load(ITEMS).titles == ["봉은사", "코엑스", "선릉과 정릉"]
+    assert len(CandidateStore.load(None)) == 0
+
+
+def test_point_index_skips_missing_coordinates():
+    store = CandidateStore.from_items(ITEMS)
+    found = store.point_index().nearest(127.05, 37.51, k=5)
+    assert sorted(i for i, _ in found) == [0, 2]
@@ -0,0 +1,69 @@
+import pytest
+import gazetteer as gazetteer_module
+from area_index import AreaIndex
+from gazetteer import Gazetteer, Region
+
+
+@pytest.fixture
+def gazetteer(monkeypatch, tmp_path):
+    """이름이 겹치는 지역만 모은 작은 지역 코드 인덱스"""
+    index = AreaIndex(str(tmp_path / "area_codes.json"))
+    index.set_area("1", "서울", {"1": "강남구", "24": "중구", "25": "서초구"})
+    index.set_area("4", "대구", {"1": "동구", "2": "중구"})
+    index.set_area("5", "광주", {"1": "동구", "2": "서구"})
+    index.set_area("6", "부산", {"1": "중구", "2": "해운대구"})
+    index.set_area("8", "세종특별자치시", {"1": "세종특별자치시"})
+    index.set_area("31", "경기도", {"5": "광주시", "13": "수원시"})
+    index.set_area("32", "강원특별자치도", {"2": "고성군"})
+    index.set_area("36", "경상남도", {"3": "고성군"})
+    index.set_area("33", "충청북도", {"9": "영동군"})
+    monkeypatch.setattr(gazetteer_module, "area_index", index)
+    return Gazetteer()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("서울 강남구에서 플로깅", Region("서울", "강남구")),
+    ("강남에서 걷고 싶어", Region("서울", "강남구")),
+    ("부산 중구", Region("부산", "중구")),
+    ("서울특별시 중구 명동", Region("서울", "중구")),
+    ("경기도 광주시", Region("경기도", "광주시")),
+    ("광주 동구", Region("광주", "동구")),
+    ("강원도 고성군 바닷가", Region("강원특별자치도", "고성군")),
+    ("경남 고성", Region("경상남도", "고성군")),
+    ("세종에서 플로깅", Region("세종특별자치시", "세종특별자치시")),
+])
+def test_resolves_unique_region(gazetteer, text, expected):
+    assert gazetteer.resolve(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "중구",           # 서울/대구/부산
+    "고성 바다",      # 강원/경남
+    "광주",           # 광주광역시 ↔ 경기 광주시, 광역시 안의 구가 여럿
+    "동구에서 걷기",  # 대구/광주
+    "서울 강남구랑 부산 해운대구",
+])
+def test_ambiguous_returns_none(gazetteer, text):
+    assert gazetteer.mentions(text)
+    assert gazetteer.resolve(text) is None
+
+
+def test_longest_leftmost_match(gazetteer):
+    # "강남구" 안의 "남구" 나 "서초구" 안의 "초구" 처럼 짧은 매칭은 무시
+    matches = gazetteer.matches("서울 강남구")
+    assert [(m.start, m.end) for m in matches] == [(0, 2), (3, 6)]
+
+
+@pytest.mark.parametrize("text", [
+    "영동대로 걷기",      # 도로 이름 (충북 영동군 아님)
+    "강남역에서 출발",    # 역 이름
+    "서울역 근처",
+])
+def test_abbreviation_inside_word_is_not_a_region(gazetteer, text):
+    assert not gazetteer.mentions(text)
+    assert gazetteer.resolve(text) is None
+
+
+def test_no_mention(gazetteer):
+    assert not gazetteer.mentions("주말에 산책할 곳 추천해줘")
+    assert gazetteer.resolve("주말에 산책할 곳 추천해줘") is None
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from geo import PointIndex, corridor, haversine, project
+
+
+def _points(seed: int, n: int):
+    rng = np.random.default_rng(seed)
+    return 126.95 + rng.random(n) * 0.1, 37.45 + rng.random(n) * 0.1
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_nearest_matches_brute_force(seed, k):
+    lons, lats = _points(seed, 300)
+    index = PointIndex(lons, lats)
+    qlon, qlat = 127.0, 37.5
+    expected = np.argsort(haversine(qlon, qlat, lons, lats), kind="stable")[:k]
+    found = index.nearest(qlon, qlat, k=k)
+    assert [i for i, _ in found] == expected.tolist()
+    assert [d for _, d in found] == pytest.approx(haversine(qlon, qlat, lons[expected], lats[expected]).tolist())
+
+
+def test_nearest_exclude_and_ids():
+    lons, lats = _points(7, 100)
+    ids = np.arange(100) + 1000
+    index = PointIndex(lons, lats, ids)
+    excluded = {1000 + i for i in range(0, 100, 2)}
+    found = index.nearest(127.0, 37.5, k=10, exclude=lambda i: i in excluded)
+    dist = haversine(127.0, 37.5, lons, lats)
+    expected = [1000 + i for i in np.argsort(dist) if 1000 + i not in excluded][:10]
+    assert [i for i, _ in found] == expected
+
+
+def test_nearest_empty_index():
+    assert PointIndex([], []).nearest(127.0, 37.5, k=3) == []
+
+
+@pytest.mark.parametrize("radius", [200.0, 1000.0, 3000.0])
+def test_within_matches_brute_force(radius):
+    lons, lats = _points(3, 500)
+    found = PointIndex(lons, lats).within(127.0, 37.5, radius)
+    dist = haversine(127.0, 37.5, lons, lats)
+    assert {i for i, _ in found} == set(np.nonzero(dist <= radius)[0].tolist())
+    assert [d for _, d in found] == sorted(d for _, d in found)
+
+
+def _brute_corridor(lons, lats, path, width):
+    """점마다 모든 선분까지 거리를 직접 계산 (corridor 와 같은 평면 투영 사용)"""
+    pts = np.asarray(path, dtype=float)
+    lat0 = float(pts[:, 1].mean())
+    px, py = project(pts[:, 0], pts[:, 1], lat0)
+    x, y = project(np.asarray(lons), np.asarray(lats), lat0)
+    result = {}
+    walked = 0.0
+    starts = []
+    for s in range(len(pts) - 1):
+        starts.append(walked)
+        walked += float(np.hypot(px[s + 1] - px[s], py[s + 1] - py[s]))
+    for i in range(len(lons)):
+        best = (np.inf, 0.0)
+        for s in range(len(pts) - 1):
+            ax, ay, dx, dy = px[s], py[s], px[s + 1] - px[s], py[s + 1] - py[s]
+            t = np.clip(((x[i] - ax) * dx + (y[i] - ay) * dy) / (dx * dx + dy * dy), 0.0, 1.0)
+            d = float(np.hypot(x[i] - (ax + t * dx), y[i] - (ay + t * dy)))
+            if d < best[0]:
+                best = (d, starts[s] + t * float(np.hypot(dx, dy)))
+        if best[0] <= width:
+            result[i] = best
+    return result
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_corridor_matches_brute_force(seed):
+    lons, lats = _points(seed, 400)
+    rng = np.random.default_rng(100 + seed)
+    # 여러 번 꺾이는 경로 (선분 묶음 bbox 필터가 동작하도록 선분을 충분히 많이)
+    path = np.column_stack((127.0 + np.cumsum(rng.normal(0, 0.002, 80)),
+                            37.5 + np.cumsum(rng.normal(0, 0.002, 80))))
+    found = corridor(lons, lats, path.tolist(), 150.0)
+    expected = _brute_corridor(lons, lats, path, 150.0)
+    assert {i for i, _, _ in found} == set(expected)
+    for i, d, along in found:
+        assert d == pytest.approx(expected[i][0], abs=1e-6)
+        assert along == pytest.approx(expected[i][1], abs=1e-6)
+    assert [a for _, _, a in found] == sorted(a for _, _, a in found)
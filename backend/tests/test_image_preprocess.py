@@ -0,0 +1,40 @@
+import asyncio
+import base64
+import io
+import numpy as np
+import pytest
+from PIL import Image
+import image_preprocess
+from image_preprocess import image_stats, prepare_image_with_hash
+
+
+@pytest.fixture(autouse=True)
+def thread_executor(monkeypatch):
+    # 프로세스 풀 대신 기본 스레드 풀에서 실행
+    monkeypatch.setattr(image_preprocess, "_get_executor", lambda: None)
+
+
+def _data_url(fmt: str, size: int, noise: bool = True) -> str:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (size, size, 3), dtype=np.uint8) if noise else np.zeros((size, size, 3), np.uint8)
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, fmt)
+    return f"data:image/{fmt.lower()};base64,{base64.b64encode(out.getvalue()).decode('ascii')}"
+
+
+def test_large_image_is_reencoded_smaller():
+    value = _data_url("PNG", 1600)
+    encoded, image_hash = asyncio.run(prepare_image_with_hash(value))
+    assert encoded.startswith("data:image/jpeg;base64,")
+    assert len(encoded) < len(value)
+    assert image_hash is not None
+
+
+def test_already_small_image_keeps_original():
+    # 단색 PNG 몇 바이트 → JPEG 로 바꾸면 헤더만으로도 더 큼
+    value = _data_url("PNG", 8, noise=False)
+    kept = image_stats.kept_original
+    encoded, image_hash = asyncio.run(prepare_image_with_hash(value))
+    assert encoded == value
+    assert image_hash is not None
+    assert image_stats.kept_original == kept + 1
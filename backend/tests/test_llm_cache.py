@@ -0,0 +1,29 @@
+import laas_api
+from laas_api import MultiTurnChat
+from llm_cache import cache_key
+
+CACHED = "cached-hash"
+OTHER = "other-hash"
+
+
+def _chat(*history):
+    chat = MultiTurnChat()
+    for role, content in history:
+        chat.add_message(role, content)
+    return chat
+
+
+def test_cached_hash_key_ignores_session_history(monkeypatch):
+    monkeypatch.setattr(laas_api, "STATELESS_HASHES", {CACHED})
+    first = _chat(("user", "부산 가고 싶어"), ("assistant", "부산 해운대구"), ("user", "서울 강남구 플로깅"))
+    second = _chat(("user", "서울 강남구 플로깅"))
+    data = first._request_data(CACHED, {"region": "강남"})
+    assert data["messages"] == [{"role": "user", "content": "서울 강남구 플로깅"}]
+    assert cache_key(data) == cache_key(second._request_data(CACHED, {"region": "강남"}))
+    assert cache_key(data) != cache_key(second._request_data(CACHED, {"region": "서초"}))
+
+
+def test_other_hashes_keep_session_context(monkeypatch):
+    monkeypatch.setattr(laas_api, "STATELESS_HASHES", {CACHED})
+    chat = _chat(("user", "서울 강남구 추천해줘"), ("assistant", "1. 봉은사"), ("user", "첫 번째로 할게"))
+    assert len(chat._request_data(OTHER, {})["messages"]) == 3
@@ -0,0 +1,53 @@
+import itertools
+import numpy as np
+import pytest
+from route_optimizer import distance_matrix, optimize_route
+
+
+def _brute_force(dist: np.ndarray, closed: bool) -> float:
+    n = len(dist)
+    best = np.inf
+    for perm in itertools.permutations(range(1, n)):
+        order = [0, *perm] + ([0] if closed else [])
+        best = min(best, sum(dist[a, b] for a, b in zip(order, order[1:])))
+    return best
+
+
+@pytest.mark.parametrize("closed", [False, True])
+@pytest.mark.parametrize("seed", range(60))
+def test_small_routes_are_optimal(seed, closed):
+    rng = np.random.default_rng(seed)
+    n = 3 + seed % 5  # 3~7개
+    lons, lats = 127.0 + rng.random(n) * 0.05, 37.5 + rng.random(n) * 0.05
+    result = optimize_route(lons, lats, closed=closed)
+    assert result.order[0] == 0
+    assert sorted(set(result.order)) == list(range(n))
+    if closed:
+        assert result.order[-1] == 0 and len(result.order) == n + 1
+    else:
+        assert len(result.order) == n
+    assert result.distance_m == pytest.approx(_brute_force(distance_matrix(lons, lats), closed))
+
+
+def test_large_route_visits_every_stop_once():
+    rng = np.random.default_rng(0)
+    lons, lats = 127.0 + rng.random(15) * 0.05, 37.5 + rng.random(15) * 0.05
+    result = optimize_route(lons, lats)
+    assert result.order[0] == 0
+    assert sorted(result.order) == list(range(15))
+
+
+def test_target_distance_drops_stops():
+    rng = np.random.default_rng(1)
+    lons, lats = 127.0 + rng.random(10) * 0.05, 37.5 + rng.random(10) * 0.05
+    full = optimize_route(lons, lats)
+    limited = optimize_route(lons, lats, target_distance_m=full.distance_m / 2)
+    assert limited.distance_m <= full.distance_m / 2
+    assert limited.dropped
+    assert set(limited.order) | set(limited.dropped) == set(range(10))
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_trivial_routes(n):
+    result = optimize_route([127.0, 127.01][:n], [37.5, 37.51][:n], closed=True)
+    assert result.order == (list(range(n)) + [0] if n > 1 else list(range(n)))
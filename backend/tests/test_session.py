@@ -0,0 +1,97 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import main
+from gazetteer import Region
+from candidates import CandidateStore
+from laas_api import MultiTurnChat
+
+PLACES = [
+    {"title": "봉은사", "address": "서울특별시 강남구 봉은사로 531", "contentid": "1", "overview": "",
+     "mapx": "127.0577", "mapy": "37.5150"},
+    {"title": "선릉과 정릉", "address": "서울특별시 강남구 선릉로100길 1", "contentid": "2", "overview": "",
+     "mapx": "127.0489", "mapy": "37.5088"},
+    {"title": "도산공원", "address": "서울특별시 강남구 도산대로45길 20", "contentid": "3", "overview": "",
+     "mapx": "127.0355", "mapy": "37.5245"},
+]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Tour API 조회 지역과 LLM 에 보낸 메시지 기록"""
+    calls = {"regions": [], "llm": []}
+
+    def get_filtered_tourist_data(area_name, sigungu_name):
+        calls["regions"].append((area_name, sigungu_name))
+        return list(PLACES)
+
+    async def send_message(self, user_message, hash, param=None, timeout=None):
+        calls["llm"].append(user_message)
+        self.add_message("user", user_message)
+        self.add_message("assistant", "추천 답변")
+        return httpx.Response(200, json={"choices": [{"message": {"content": "추천 답변"}}]})
+
+    monkeypatch.setattr(main, "get_filtered_tourist_data", get_filtered_tourist_data)
+    monkeypatch.setattr(main, "get_region_places", lambda area_name, sigungu_name: None)
+    monkeypatch.setattr(MultiTurnChat, "send_message", send_message)
+    return calls
+
+
+@pytest.fixture
+def client(calls):
+    return TestClient(main.app)
+
+
+def _recommend(client, message, session_id=None, area=("서울", "강남구")):
+    headers = {main.SESSION_HEADER: session_id} if session_id else {}
+    return client.post("/recommend/place", headers=headers, json={
+        "user_message": message, "area_name": area[0], "sigungu_name": area[1]
+    })
+
+
+def test_session_header_carries_candidates_to_the_next_turn(client):
+    first = _recommend(client, "서울 강남구에서 플로깅 장소 추천해줘")
+    session_id = first.headers[main.SESSION_HEADER]
+    assert [p["title"] for p in first.json()["recommended_places"]] == ["봉은사", "선릉과 정릉", "도산공원"]
+
+    client.cookies.clear()  # 프런트엔드는 쿠키 대신 헤더로 세션을 돌려보냄
+    second = _recommend(client, "봉은사에서 시작할게", session_id)
+    assert second.headers[main.SESSION_HEADER] == session_id
+    body = second.json()
+    assert body["user_pick_place"] == "봉은사"
+    assert body["recommended_route"][0]["title"] == "봉은사"
+
+
+def test_request_without_session_starts_a_new_one(client):
+    first = _recommend(client, "서울 강남구에서 플로깅 장소 추천해줘")
+    client.cookies.clear()
+    second = _recommend(client, "봉은사에서 시작할게")
+    assert second.headers[main.SESSION_HEADER] != first.headers[main.SESSION_HEADER]
+
+
+def test_request_region_wins_over_a_different_region_in_the_message(client, calls, monkeypatch):
+    monkeypatch.setattr(main.gazetteer, "resolve", lambda text: Region("충청북도", "영동군"))
+    monkeypatch.setattr(main.gazetteer, "mentions", lambda text: True)
+    body = _recommend(client, "영동 쪽 플로깅 장소 추천해줘").json()
+    assert calls["regions"] == [("서울", "강남구")]
+    assert (body["area"], body["sigungu"]) == ("서울", "강남구")
+
+
+def test_first_turn_without_region_asks_for_one_without_llm(client, calls):
+    body = _recommend(client, "주말에 산책할 곳 추천해줘", area=("", "")).json()
+    assert "지역" in body["message"]
+    assert calls["regions"] == [] and calls["llm"] == []
+
+
+def test_waypoints_come_from_the_whole_region(client, monkeypatch):
+    # 세션 후보(샘플)에 없는 장소도 지역 전체 목록에서 경유지로 고름
+    region = CandidateStore.from_items(PLACES + [
+        {"title": "코엑스", "address": "서울특별시 강남구 영동대로 513", "contentid": "4", "overview": "",
+         "mapx": "127.0590", "mapy": "37.5116"},
+    ])
+    monkeypatch.setattr(main, "get_region_places", lambda area_name, sigungu_name: region)
+    session_id = _recommend(client, "서울 강남구에서 플로깅 장소 추천해줘").headers[main.SESSION_HEADER]
+    body = _recommend(client, "봉은사에서 시작할게", session_id).json()
+    titles = [stop["title"] for stop in body["recommended_route"]]
+    assert titles[0] == "봉은사" and "코엑스" in titles
+    assert titles.count("봉은사") == 1
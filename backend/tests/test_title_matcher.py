@@ -0,0 +1,72 @@
+import pytest
+from candidates import CandidateStore
+from title_matcher import TitleMatcher, parse_ordinal
+
+PLACES = [
+    {"title": "서울숲", "address": "서울특별시 성동구 뚝섬로 273", "mapx": "127.04", "mapy": "37.54"},
+    {"title": "서울숲공원", "address": "서울특별시 성동구 성수동1가", "mapx": "127.04", "mapy": "37.55"},
+    {"title": "봉은사", "address": "서울특별시 강남구 봉은사로 531", "mapx": "127.06", "mapy": "37.51"},
+    {"title": "코엑스 아쿠아리움", "address": "서울특별시 강남구 영동대로 513", "mapx": "127.06", "mapy": "37.51"},
+    {"title": "선릉과 정릉", "address": "서울특별시 강남구 선릉로100길 1", "mapx": "127.05", "mapy": "37.51"},
+]
+# 사용자가 본 순서: 봉은사 → 서울숲공원 → 코엑스 아쿠아리움
+REPLY = "1. 봉은사: 도심 속 사찰\n2. 서울숲공원: 넓은 산책로\n3. 코엑스 아쿠아리움: 실내 코스"
+
+
+@pytest.fixture
+def matcher():
+    return TitleMatcher(CandidateStore.from_items(PLACES), REPLY)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("세 번째", 3), ("3번째로 할게", 3), ("첫번째", 1), ("3번", 3), ("3번이요.", 3), ("마지막", -1),
+    ("1번 출구 근처", None), ("3번 말고 4번", None), ("두 번째 빼고", None),
+    ("두 번째랑 세 번째", None), ("한 번 더 볼래", None), ("그냥 아무데나", None),
+])
+def test_parse_ordinal(text, expected):
+    assert parse_ordinal(text) == expected
+
+
+@pytest.mark.parametrize("text, title", [
+    ("두 번째로 할게", "서울숲공원"),
+    ("마지막 거", "코엑스 아쿠아리움"),
+    ("1번", "봉은사"),
+])
+def test_ordinal_follows_reply_order(matcher, text, title):
+    pick = matcher.resolve(text)
+    assert pick.method == "ordinal" and pick.score == 1.0
+    assert matcher.candidates.titles[pick.index] == title
+
+
+@pytest.mark.parametrize("text", ["1번 출구 근처에서 시작", "3번 말고 4번", "다섯 번째"])
+def test_non_ordinal_numbers_fall_through(matcher, text):
+    assert matcher.resolve(text) is None
+
+
+@pytest.mark.parametrize("text, title", [
+    ("봉은사에서 시작할게", "봉은사"),
+    ("서울숲 공원으로 갈래", "서울숲공원"),  # 더 긴 제목 우선, 띄어쓰기 무시
+    ("서울숲!", "서울숲"),
+])
+def test_exact(matcher, text, title):
+    pick = matcher.resolve(text)
+    assert pick.method == "exact"
+    assert matcher.candidates.titles[pick.index] == title
+
+
+@pytest.mark.parametrize("text, title", [
+    ("코엑스 아쿠아리음에서 출발", "코엑스 아쿠아리움"),  # 오타
+    ("코액스 아쿠아리움 갈래", "코엑스 아쿠아리움"),
+])
+def test_fuzzy(matcher, text, title):
+    pick = matcher.resolve(text)
+    assert pick.method == "fuzzy"
+    assert matcher.candidates.titles[pick.index] == title
+
+
+def test_unrelated_input_is_unresolved(matcher):
+    assert matcher.resolve("경복궁에서 시작하고 싶어") is None
+
+
+def test_no_candidates():
+    assert TitleMatcher(CandidateStore.from_items([]), REPLY).resolve("봉은사") is None
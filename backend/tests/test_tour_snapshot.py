@@ -0,0 +1,74 @@
+import sqlite3
+import httpx
+import pytest
+from tour_snapshot import TourSnapshot
+
+
+def _item(contentid, modified):
+    return {"contentid": contentid, "contenttypeid": "12", "title": f"장소 {contentid}", "addr1": "서울",
+            "mapx": "127.0", "mapy": "37.5", "modifiedtime": modified}
+
+
+class FakeSession:
+    """areaBasedList2 응답 흉내 (수정일 역순, 한 페이지)"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def get(self, url, params=None, timeout=None):
+        items = sorted(self.items, key=lambda i: i["modifiedtime"], reverse=True)
+        return httpx.Response(200, json={"response": {"body": {
+            "items": {"item": items}, "totalCount": len(items)
+        }}}, request=httpx.Request("GET", url))
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    return TourSnapshot(str(tmp_path / "snapshot.sqlite3"))
+
+
+def _ids(snapshot):
+    return sorted(p["contentid"] for p in snapshot.get_region("1", "1"))
+
+
+def test_incremental_ingest_only_adds_new_items(snapshot):
+    session = FakeSession([_item("a", "20240101"), _item("b", "20240102")])
+    assert snapshot.ingest_region(session, "1", "1") == 2
+    session.items.append(_item("c", "20240103"))
+    assert snapshot.ingest_region(session, "1", "1") == 1
+    assert _ids(snapshot) == ["a", "b", "c"]
+
+
+def test_incremental_ingest_reloads_region_after_upstream_delete(snapshot):
+    session = FakeSession([_item("a", "20240101"), _item("b", "20240102")])
+    snapshot.ingest_region(session, "1", "1")
+    session.items = [_item("b", "20240102")]
+    assert snapshot.ingest_region(session, "1", "1") == 1
+    assert _ids(snapshot) == ["b"]
+
+
+class FailingInsert:
+    """places INSERT 에서 실패하는 연결 (DELETE 이후라 롤백하지 않으면 지역이 비게 됨)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def executemany(self, sql, rows):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_failed_write_rolls_back(snapshot, monkeypatch):
+    session = FakeSession([_item("a", "20240101")])
+    snapshot.ingest_region(session, "1", "1")
+    conn = snapshot._connect()
+    monkeypatch.setattr(snapshot, "_connect", lambda: FailingInsert(conn))
+    with pytest.raises(sqlite3.OperationalError):
+        snapshot.ingest_region(session, "1", "1", full=True)
+    assert not conn.in_transaction
+    monkeypatch.undo()
+    assert _ids(snapshot) == ["a"]
+    session.items.append(_item("b", "20240102"))
+    assert snapshot.ingest_region(session, "1", "1") == 1
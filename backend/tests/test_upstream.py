@@ -0,0 +1,114 @@
+import asyncio
+import time
+import pytest
+import requests
+import upstream
+from upstream import CircuitBreaker, CircuitOpenError, Upstream, UpstreamError
+
+
+class FakeResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def max_backoff(monkeypatch):
+    # 지터 없이 항상 최대 백오프 (재시도 횟수를 예측할 수 있게)
+    monkeypatch.setattr(upstream.random, "uniform", lambda low, high: high)
+
+
+def test_breaker_open_half_open_close():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+    assert breaker.allow() and breaker.state == "closed"
+    assert breaker.record(False) is False
+    assert breaker.record(False) is True
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.allow() is True          # 시험 호출 하나만
+    assert breaker.state == "half_open"
+    assert breaker.allow() is False
+    breaker.record(True)
+    assert breaker.state == "closed" and breaker.consecutive == 0
+    assert breaker.allow() is True
+
+
+def test_breaker_half_open_failure_reopens():
+    breaker = CircuitBreaker(failures=1, cooldown=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.record(False) is True
+    assert breaker.state == "open" and breaker.opens == 2
+    assert breaker.allow() is False
+
+
+def test_retry_stops_at_deadline():
+    attempts = []
+
+    def fail(timeout):
+        attempts.append(timeout)
+        raise requests.ConnectionError("down")
+
+    up = Upstream("test_deadline", timeout=1.0, deadline=0.5, retries=10, backoff=0.2, backoff_max=0.2,
+                  breaker=CircuitBreaker(failures=100))
+    started = time.monotonic()
+    with pytest.raises(UpstreamError):
+        up.call(fail)
+    # 0s, 0.2s, 0.4s 에 시도 → 다음 대기(0.2s)는 기한(0.5s)을 넘으므로 중단
+    assert len(attempts) == 3
+    assert time.monotonic() - started < 0.5
+    assert attempts[-1] < 0.2  # 시도별 timeout 은 남은 기한으로 줄어듦
+
+
+def test_retry_on_status_then_success():
+    responses = iter([FakeResponse(503), FakeResponse(429), FakeResponse(200)])
+    up = Upstream("test_status", timeout=1.0, deadline=5.0, retries=2, backoff=0.01, backoff_max=0.01)
+    assert up.call(lambda timeout: next(responses)).status_code == 200
+    assert up.retried == 2 and up.failed == 2
+
+
+def test_non_retryable_status_is_returned():
+    calls = []
+    up = Upstream("test_4xx", timeout=1.0, deadline=5.0, retries=2, backoff=0.01, backoff_max=0.01)
+    response = up.call(lambda timeout: calls.append(1) or FakeResponse(404))
+    assert response.status_code == 404 and len(calls) == 1
+
+
+def test_open_circuit_rejects_without_calling():
+    calls = []
+
+    def fail(timeout):
+        calls.append(1)
+        return FakeResponse(500)
+
+    up = Upstream("test_open", timeout=1.0, deadline=5.0, retries=0, breaker=CircuitBreaker(failures=2, cooldown=60))
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            up.call(fail)
+    with pytest.raises(CircuitOpenError):
+        up.call(fail)
+    assert len(calls) == 2 and up.stats()["state"] == "open"
+
+
+def test_hedged_request_wins_over_slow_attempt():
+    delays = iter([2.0, 0.01])
+
+    async def request(timeout):
+        await asyncio.sleep(next(delays))
+        return FakeResponse(200)
+
+    up = Upstream("test_hedge", timeout=5.0, deadline=10.0, retries=0)
+    up._latencies.extend([0.05] * upstream.HEDGE_MIN_SAMPLES)  # 헤지 지연 = max(p95, HEDGE_MIN_DELAY)
+    assert up.hedge_delay() < 2.0
+
+    async def run():
+        started = time.perf_counter()
+        response = await up.acall(request, hedge=True)
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(run())
+    assert response.status_code == 200
+    assert up.hedges == 1 and up.hedge_wins == 1
+    assert elapsed < 2.0
@@ -0,0 +1,198 @@
+"""
+추천 후보 중 사용자가 고른 장소를 로컬에서 찾기
+
+LaaS(HASH_PLACE) 호출 없이 다음 순서로 후보를 정합니다.
+1. 서수 ("세 번째", "2번째", "마지막", 번호만 보낸 "2번") → 직전 추천 답변에 나온 후보 순서 기준
+2. 정규화한 제목(공백/구두점 제거)이 입력에 그대로 들어 있음
+3. 자모 3-gram 역색인: 후보 제목 n-gram 중 입력에 들어 있는 비율 (오타/띄어쓰기 허용)
+   + 주소 토큰("성수동", "한강대로")이 한 후보에만 맞으면 가산점
+점수가 충분히 높고 2위와 차이가 날 때만 결과를 반환하고, 아니면 None → LLM 으로 넘깁니다.
+"""
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set
+from candidates import CandidateStore
+
+NGRAM = 3
+MIN_SCORE = 0.75   # 최소 확신 점수
+MIN_MARGIN = 0.15  # 2위와의 최소 점수 차이
+ADDRESS_BONUS = 0.2
+
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+_STRIP_RE = re.compile(r"[^0-9a-z가-힣]")
+
+_KOREAN_ORDINALS = {
+    "첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10
+}
+# "세 번째", "3번째" ("3번" 만 있으면 "1번 출구" 같은 표현과 구분할 수 없어 서수로 보지 않음)
+_ORDINAL_RE = re.compile(r"(?:(첫|두|세|네|다섯|여섯|일곱|여덟|아홉|열)|(\d+))\s*번\s*째")
+# 메시지 전체가 번호뿐일 때만 "3번" 허용 ("3번", "3번이요.")
+_BARE_NUMBER_RE = re.compile(r"\s*(\d+)\s*번\s*(?:이요|요)?\s*[.!~]*\s*")
+_LAST_RE = re.compile(r"마지막")
+# "3번 말고 4번" 처럼 부정/제외가 섞이면 LLM 으로 넘김
+_NEGATION_RE = re.compile(r"말고|빼고|제외|아니")
+_ADDRESS_TOKEN_RE = re.compile(r"[가-힣0-9]+(?:동|로|길|리|읍|면)(?:\d+가)?")
+_PAREN_RE = re.compile(r"\(.*?\)|\[.*?\]")
+
+
+def core_title(title: str) -> str:
+    """괄호 속 부가 설명을 뺀 정규화 제목 ("남산공원(서울)" → "남산공원")"""
+    return normalize(_PAREN_RE.sub("", title or "")) or normalize(title)
+
+
+def normalize(text: str) -> str:
+    """소문자 + 한글/영문/숫자만 남김 ("서울숲 공원" == "서울숲공원")"""
+    return _STRIP_RE.sub("", (text or "").lower())
+
+
+def to_jamo(text: str) -> str:
+    """한글 음절을 초/중/종성 자모로 분해 (오타 한 글자가 n-gram 여러 개를 깨지 않도록)"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHO[code // 588])
+            out.append(_JUNG[(code % 588) // 28])
+            if code % 28:
+                out.append(_JONG[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def ngrams(text: str, n: int = NGRAM) -> Set[str]:
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def parse_ordinal(text: str) -> Optional[int]:
+    """서수 → 1부터 시작하는 순번, 마지막이면 -1, 없거나 서수가 둘 이상/부정이 섞이면 None"""
+    text = text or ""
+    if _NEGATION_RE.search(text):
+        return None
+    found = [_KOREAN_ORDINALS[m.group(1)] if m.group(1) else int(m.group(2)) for m in _ORDINAL_RE.finditer(text)]
+    bare = _BARE_NUMBER_RE.fullmatch(text)
+    if bare:
+        found.append(int(bare.group(1)))
+    found += [-1] * len(_LAST_RE.findall(text))
+    return found[0] if len(found) == 1 else None
+
+
+class TitleMatch(NamedTuple):
+    index: int      # 후보 목록 인덱스
+    score: float    # 확신 점수 (1.0 = 서수/정확 일치)
+    method: str     # "ordinal" | "exact" | "fuzzy"
+
+
+class TitleMatcher:
+    def __init__(self, candidates: CandidateStore, reply: Optional[str] = None):
+        """
+        candidates: 추천 후보 저장소 (titles, addresses 열 사용)
+        reply: 직전 추천 답변 (서수 해석용, 답변에 나온 순서가 사용자가 본 순서)
+        """
+        self.candidates = candidates
+        self.reply = reply or ""
+        self._titles = [core_title(title) for title in candidates.titles]
+        self._grams = [ngrams(to_jamo(t)) for t in self._titles]
+        self._index: Dict[str, List[int]] = {}
+        for i, grams in enumerate(self._grams):
+            for g in grams:
+                self._index.setdefault(g, []).append(i)
+        # 주소 토큰 → 후보 (한 후보에만 있는 토큰만 의미 있음)
+        self._address: Dict[str, Set[int]] = {}
+        for i, address in enumerate(candidates.addresses):
+            for token in _ADDRESS_TOKEN_RE.findall(address):
+                self._address.setdefault(token, set()).add(i)
+
+    def resolve(self, text: str) -> Optional[TitleMatch]:
+        """확신할 수 있을 때만 TitleMatch, 아니면 None"""
+        if not self.candidates or not text:
+            return None
+        return self._by_ordinal(text) or self._by_exact(text) or self._by_ngram(text)
+
+    # ---------- 1. 서수 ----------
+    def reply_order(self) -> List[int]:
+        """답변에 후보가 나온 순서 (다른 제목 안에 포함된 짧은 제목은 제외)"""
+        reply = normalize(self.reply)
+        spans = []
+        for i, title in enumerate(self._titles):
+            pos = reply.find(title) if title else -1
+            if pos >= 0:
+                spans.append((pos, pos + len(title), i))
+        spans.sort(key=lambda s: (s[0], -(s[1] - s[0])))
+        order, last_end, seen = [], 0, set()
+        for start, end, i in spans:
+            if start < last_end or self._titles[i] in seen:
+                continue
+            order.append(i)
+            seen.add(self._titles[i])
+            last_end = end
+        return order
+
+    def _by_ordinal(self, text: str) -> Optional[TitleMatch]:
+        nth = parse_ordinal(text)
+        if nth is None:
+            return None
+        order = self.reply_order()
+        if nth == -1 and order:
+            return TitleMatch(order[-1], 1.0, "ordinal")
+        if 1 <= nth <= len(order):
+            return TitleMatch(order[nth - 1], 1.0, "ordinal")
+        return None
+
+    # ---------- 2. 정확 일치 ----------
+    def _by_exact(self, text: str) -> Optional[TitleMatch]:
+        query = normalize(text)
+        hits = [i for i, title in enumerate(self._titles) if title and title in query]
+        if not hits:
+            return None
+        # 가장 긴 제목 우선 ("서울숲" 보다 "서울숲공원"), 같은 제목이 여러 개면 애매
+        longest = max(len(self._titles[i]) for i in hits)
+        best = {self._titles[i] for i in hits if len(self._titles[i]) == longest}
+        if len(best) != 1:
+            return None
+        return TitleMatch(next(i for i in hits if len(self._titles[i]) == longest), 1.0, "exact")
+
+    # ---------- 3. 자모 n-gram ----------
+    def _by_ngram(self, text: str) -> Optional[TitleMatch]:
+        query_grams = ngrams(to_jamo(normalize(text)))
+        overlap = Counter()
+        for g in query_grams:
+            for i in self._index.get(g, ()):
+                overlap[i] += 1
+        if not overlap:
+            return None
+        scores = {i: n / len(self._grams[i]) for i, n in overlap.items()}
+        for token, owners in self._address.items():
+            if len(owners) == 1 and token in text:
+                i = next(iter(owners))
+                scores[i] = scores.get(i, 0.0) + ADDRESS_BONUS
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        best_i, best = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best < MIN_SCORE or best - second < MIN_MARGIN:
+            return None
+        return TitleMatch(best_i, round(min(best, 1.0), 3), "fuzzy")
+
+
+class MatchStats:
+    """시작 장소 해석 경로별 횟수 (/stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def record(self, source: str):
+        with self._lock:
+            self.counts[source] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+match_stats = MatchStats()
@@ -1,9 +1,39 @@
 # tmap_pedestrian.py
-import requests
+import asyncio
 from urllib.parse import quote
-from config import TMAP_API_KEY
+from config import TMAP_API_KEY, TMAP_BASE_URL, TMAP_CACHE_TTL, TMAP_CACHE_SIZE, TMAP_COORD_PRECISION
+from http_client import get_async_client
+from geo import simplify, haversine
+from ttl_cache import TTLCache
+from singleflight import SingleFlight
+from metrics import span, observe_bytes, count_error
+from upstream import tmap_upstream, UpstreamError
+from route_optimizer import WALKING_SPEED_M_PER_MIN
+from log import logger
 
-def get_pedestrian_route(
+TMAP_PEDESTRIAN_URL = f"{TMAP_BASE_URL}/tmap/routes/pedestrian?version=1"
+
+# 경로 응답 캐시 (좌표 양자화 키, TTL + LRU) 와 진행 중인 동일 요청 합치기
+_route_cache = TTLCache(maxsize=TMAP_CACHE_SIZE, ttl=TMAP_CACHE_TTL)
+_route_flight = SingleFlight("tmap_route")
+
+
+def _quantize(coords: tuple) -> tuple:
+    return (round(float(coords[0]), TMAP_COORD_PRECISION), round(float(coords[1]), TMAP_COORD_PRECISION))
+
+
+def route_cache_key(start_coords: tuple, end_coords: tuple, pass_list: list, coord_type: str, search_option: int) -> tuple:
+    """양자화한 출발/도착/경유지 좌표 + 옵션으로 캐시 키 생성"""
+    return (
+        _quantize(start_coords),
+        _quantize(end_coords),
+        tuple(_quantize(p) for p in pass_list or []),
+        coord_type,
+        int(search_option)
+    )
+
+
+async def get_pedestrian_route(
     start_coords: tuple,
     end_coords: tuple,
     pass_list: list = [],
@@ -13,10 +43,9 @@ def get_pedestrian_route(
     search_option: int = 0
 ) -> dict:
     """
-    Tmap 도보 경로 요청 함수
+    Tmap 도보 경로 요청 함수 (캐시 + 동일 요청 합치기)
 
     Parameters:
-        app_key (str): Tmap API AppKey
         start_coords (tuple): (startX, startY)
         end_coords (tuple): (endX, endY)
         pass_list (list): [(x1, y1), (x2, y2), ...] 형태의 경유지 리스트
@@ -28,9 +57,21 @@ def get_pedestrian_route(
     Returns:
         dict: API 응답 JSON
     """
+    key = route_cache_key(start_coords, end_coords, pass_list, coord_type, search_option)
+    cached = _route_cache.get(key)
+    if cached is not None:
+        return cached
 
-    url = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
+    # 같은 경로를 이미 요청 중이면 그 결과를 함께 기다림
+    result = await _route_flight.ado(
+        key, _request_route,
+        start_coords, end_coords, pass_list, start_name, end_name, coord_type, search_option
+    )
+    _route_cache.set(key, result)
+    return result
 
+
+async def _request_route(start_coords, end_coords, pass_list, start_name, end_name, coord_type, search_option) -> dict:
     # 경유지 리스트 문자열 생성
     pass_str = "_".join([f"{x},{y}" for x, y in pass_list]) if pass_list else ""
 
@@ -57,10 +98,96 @@ def get_pedestrian_route(
         "Accept-Language": "ko"
     }
 
-    # API 요청
-    response = requests.post(url, headers=headers, data=data)
+    # API 요청 (공유 커넥션 풀)
+    with span("tmap"):
+        response = await tmap_upstream.acall(get_async_client().post, TMAP_PEDESTRIAN_URL, headers=headers, data=data)
+    observe_bytes("tmap_response", len(response.content))
 
     if response.status_code == 200:
-        return response.json()
+        with span("json_parse", kind="tmap"):
+            return response.json()
     else:
-        raise Exception(f"Tmap API 오류 {response.status_code}: {response.text}")
\ No newline at end of file
+        count_error("tmap", str(response.status_code))
+        raise Exception(f"Tmap API 오류 {response.status_code}: {response.text}")
+
+
+def route_stats() -> dict:
+    return _route_cache.stats()
+
+
+# Tmap 보행자 경로 API의 경유지(passList) 최대 개수
+MAX_PASS_POINTS = 5
+
+
+def split_segments(points: list, max_pass: int = MAX_PASS_POINTS) -> list:
+    """
+    순서가 정해진 좌표 목록을 Tmap 요청 단위로 분할
+    (구간마다 출발 + 경유지 최대 max_pass개 + 도착, 이웃 구간은 끝점을 공유)
+    """
+    step = max_pass + 1
+    return [points[i:i + step + 1] for i in range(0, len(points) - 1, step)]
+
+
+def _line_coords(route: dict) -> tuple:
+    """Tmap GeoJSON 응답 → (선 좌표 목록, 총 거리 m, 총 시간 s)"""
+    coords = []
+    features = route.get("features", [])
+    for feature in features:
+        geometry = feature.get("geometry", {})
+        if geometry.get("type") == "LineString":
+            for point in geometry.get("coordinates", []):
+                if not coords or coords[-1] != point:
+                    coords.append(point)
+    properties = features[0].get("properties", {}) if features else {}
+    return coords, properties.get("totalDistance", 0), properties.get("totalTime", 0)
+
+
+def _straight_line(points: list) -> tuple:
+    """Tmap 없이 지점을 직선으로 이은 근사 경로 → (좌표 목록, 대원 거리 m, 보행 속도 기준 시간 s)"""
+    coords = [[float(x), float(y)] for x, y in points]
+    distance = sum(float(haversine(a[0], a[1], b[0], b[1])) for a, b in zip(coords, coords[1:]))
+    return coords, round(distance), round(distance / WALKING_SPEED_M_PER_MIN * 60)
+
+
+async def get_walking_route(points: list, search_option: int = 0, tolerance_m: float = 5.0) -> dict:
+    """
+    여러 지점을 순서대로 잇는 도보 경로
+    - Tmap 경유지 제한에 맞게 구간을 나눠 동시에 요청 (전체 시간 ≈ 가장 느린 구간 하나)
+    - 구간 선을 이어 붙인 뒤 Douglas–Peucker로 단순화
+    points: [(x, y), ...] (WGS84 경도, 위도)
+    """
+    segments = split_segments(points)
+    routes = await asyncio.gather(*[
+        get_pedestrian_route(seg[0], seg[-1], seg[1:-1], search_option=search_option)
+        for seg in segments
+    ], return_exceptions=True)
+
+    path = []
+    distance = 0
+    duration = 0
+    degraded = 0
+    for seg, route in zip(segments, routes):
+        if isinstance(route, UpstreamError):
+            # Tmap 장애/회로 차단: 이 구간만 직선 근사로 대신함
+            logger.warning("⚠️ 도보 경로 구간 대체 (직선): %s", route)
+            degraded += 1
+            coords, seg_distance, seg_time = _straight_line(seg)
+        elif isinstance(route, BaseException):
+            raise route
+        else:
+            coords, seg_distance, seg_time = _line_coords(route)
+        if path and coords and path[-1] == coords[0]:
+            coords = coords[1:]
+        path.extend(coords)
+        distance += seg_distance
+        duration += seg_time
+
+    simplified = simplify(path, tolerance_m)
+    return {
+        "path": [[round(x, 6), round(y, 6)] for x, y in simplified],
+        "distance_m": distance,
+        "time_s": duration,
+        "segments": len(segments),
+        "degraded_segments": degraded,
+        "raw_points": len(path)
+    }
@@ -1,5 +1,20 @@
+import math
+import random
 import requests
-from config import TOUR_API_KEY
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional
+from config import (
+    TOUR_API_KEY, TOUR_API_BASE_URL, TOUR_PAGE_SIZE, TOUR_FETCH_CONCURRENCY, REGION_PLACES_MAX, REGION_PLACES_TTL
+)
+from area_index import area_index, fetch_area_codes
+from tour_cache import tour_cache
+from tour_snapshot import tour_snapshot
+from singleflight import SingleFlight
+from candidates import CandidateStore
+from ttl_cache import TTLCache
+from metrics import span, timed, observe_bytes
+from upstream import tour_upstream
+from log import logger
 
 AREA_CODE_DICT = {
     "서울": "1", "인천": "2", "대전": "3", "대구": "4", "광주": "5", "부산": "6", "울산": "7",
@@ -10,63 +25,178 @@ AREA_CODE_DICT = {
 
 SERVICE_KEY = TOUR_API_KEY
 
+# 같은 지역에 대한 동시 Tour API 조회 합치기
+_tour_flight = SingleFlight("tour_api")
+
+@timed("sigungu_code")
 def get_sigungu_code(area_code, sigungu_name):
-    url = "http://apis.data.go.kr/B551011/KorService2/areaCode2"
+    """
+    시군구 코드 조회
+    - 로컬 지역 코드 인덱스에서 먼저 찾고 (원격 호출 없음)
+    - 해당 지역이 인덱스에 없을 때만 areaCode2를 호출해 인덱스에 추가
+    - 광역시/도 코드가 없으면 조회하지 않음 (areaCode2 가 광역시/도 목록을 돌려줌)
+    """
+    if not area_code:
+        return None
+    code = area_index.lookup(area_code, sigungu_name)
+    if code or area_index.has_area(area_code):
+        return code
+    sigungu = _tour_flight.do(("areaCode2", area_code), fetch_area_codes, area_code)
+    area_name = next((name for name, code in AREA_CODE_DICT.items() if code == area_code), area_code)
+    area_index.set_area(area_code, area_name, sigungu)
+    try:
+        area_index.save()
+    except OSError as e:
+        logger.warning("⚠️ 지역 코드 인덱스 저장 실패: %s", e)
+    return area_index.lookup(area_code, sigungu_name)
+
+
+AREA_BASED_LIST_URL = f"{TOUR_API_BASE_URL}/areaBasedList2"
+# 플로깅 후보로 쓰는 콘텐츠 타입 (12: 관광지, 14: 문화시설, 28: 레포츠)
+TOURIST_CONTENT_TYPES = ("12", "14", "28")
+# 추천 후보로 넘기는 관광지 수
+SAMPLE_SIZE = 50
+
+
+# 페이지 동시 조회용 커넥션 풀 + 스레드풀 (요청 스레드와 별도)
+_session = requests.Session()
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=TOUR_FETCH_CONCURRENCY * 4))
+_page_executor = ThreadPoolExecutor(max_workers=TOUR_FETCH_CONCURRENCY * 4, thread_name_prefix="tour-page")
+
+
+def _fetch_page(area_code: str, sigungu_code: str, page: int, content_types) -> tuple[int, list[dict]]:
+    """areaBasedList2 한 페이지 조회 → (전체 건수, 콘텐츠 타입으로 거른 정규화 목록)"""
     params = {
-        "numOfRows": "100000",
         "serviceKey": SERVICE_KEY,
         "MobileOS": "WEB",
-        "MobileApp": "AppTest",
+        "MobileApp": "TourWeb",
+        "numOfRows": str(TOUR_PAGE_SIZE),
+        "pageNo": str(page),
         "areaCode": area_code,
+        "sigunguCode": sigungu_code,
         "_type": "json"
     }
-    response = requests.get(url, params=params)
-    data = response.json()
-    items = data["response"]["body"]["items"]["item"]
-    for item in items:
-        if sigungu_name in item.get("name", ""):
-            return item["code"]
-    return None
+    with span("tour_api", op="areaBasedList2"):
+        response = tour_upstream.call(_session.get, AREA_BASED_LIST_URL, params=params)
+    observe_bytes("tour_api_response", len(response.content), op="areaBasedList2")
+    # 페이지 단위(TOUR_PAGE_SIZE 건)로 받으므로 본문 전체를 한 번에 파싱해도 메모리는 페이지 크기로 제한됨
+    with span("json_parse", kind="tour_api"):
+        body = response.json()["response"]["body"]
+    items = body["items"].get("item", []) if isinstance(body["items"], dict) else []
+    if isinstance(items, dict):
+        items = [items]
+    # 페이지가 도착하는 대로 바로 걸러서 원본 페이지는 버림 (최대 메모리 = 페이지 크기)
+    filtered = [normalize_item(item) for item in items if item.get("contenttypeid") in content_types]
+    return int(body.get("totalCount", 0)), filtered
+
 
+def fetch_area_based_list(area_code: str, sigungu_code: str, content_types=TOURIST_CONTENT_TYPES,
+                          want: Optional[int] = None) -> list[dict]:
+    """
+    areaBasedList2를 페이지 단위로 동시에 조회 → 콘텐츠 타입으로 거른 정규화 목록
+    - want 미지정: 모든 페이지 수집 (캐시 채우기용)
+    - want 지정: 페이지를 무작위 순서로 받다가 want개 이상 모이면 나머지 페이지는 취소
+    """
+    total_count, items = _fetch_page(area_code, sigungu_code, 1, content_types)
+    pages = list(range(2, math.ceil(total_count / TOUR_PAGE_SIZE) + 1))
+    if not pages or (want is not None and len(items) >= want):
+        return items
+    if want is not None:
+        random.shuffle(pages)  # 조기 종료해도 지역 전체에서 고르게 뽑히도록
 
-import random  # 맨 위에 추가
+    # 동시에 TOUR_FETCH_CONCURRENCY 페이지까지만 요청하고, 하나 끝날 때마다 다음 페이지 요청
+    pending = set()
+    try:
+        while pages or pending:
+            while pages and len(pending) < TOUR_FETCH_CONCURRENCY:
+                pending.add(_page_executor.submit(_fetch_page, area_code, sigungu_code, pages.pop(), content_types))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                items.extend(future.result()[1])
+            if want is not None and len(items) >= want:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+    return items
 
+
+def normalize_item(item: dict) -> dict:
+    """areaBasedList2 원본 항목 → 추천 후보 형태"""
+    return {
+        "title": item.get("title"),
+        "address": item.get("addr1"),
+        "contentid": item.get("contentid"),
+        "overview": item.get("overview", "")[:300],
+        "mapx": item.get("mapx", ""),
+        "mapy": item.get("mapy", "")
+    }
+
+
+@timed("tour_candidates")
 def get_filtered_tourist_data(area_name: str, sigungu_name: str) -> list[dict]:
     area_code = AREA_CODE_DICT.get(area_name)
     sigungu_code = get_sigungu_code(area_code, sigungu_name)
-    url = "http://apis.data.go.kr/B551011/KorService2/areaBasedList2"
-    params = {
-        "serviceKey": SERVICE_KEY,
-        "MobileOS": "WEB",
-        "MobileApp": "TourWeb",
-        "numOfRows": "50000",
-        "areaCode": area_code,
-        "sigunguCode": sigungu_code,
-        "_type": "json"
-    }
-    response = requests.get(url, params=params)
-    data = response.json()
-    items = data["response"]["body"]["items"]["item"]
-    items = [
-        {
-            "title": item.get("title"),
-            "address": item.get("addr1"),
-            "contentid": item.get("contentid"),
-            "overview": item.get("overview", "")[:300],
-            "mapx": item.get("mapx", ""),
-            "mapy": item.get("mapy", "")
-        }
-        for item in items
-        if item.get("contenttypeid") in {"12", "14", "28"}
-    ]
+    # 오프라인 스냅샷에 수집된 지역이면 원격 호출 없이 처리
+    items = tour_snapshot.get_region(area_code, sigungu_code)
+    if items is not None:
+        return random.sample(items, SAMPLE_SIZE) if len(items) >= SAMPLE_SIZE else items
+    # 지역 목록은 거의 바뀌지 않으므로 로컬 캐시에서 먼저 조회 (만료 시 백그라운드 갱신)
+    cache_key = _cache_key(area_code, sigungu_code)
+    # 캐시가 비어 있으면 필요한 만큼만 먼저 받아 응답하고, 전체 목록은 백그라운드에서 채움
+    # 같은 지역 동시 요청은 조회 하나로 합침
+    items = _tour_flight.do(
+        cache_key,
+        tour_cache.get_or_fetch,
+        cache_key,
+        lambda: fetch_area_based_list(area_code, sigungu_code),
+        quick_fetcher=lambda: fetch_area_based_list(area_code, sigungu_code, want=SAMPLE_SIZE * 2)
+    )
     
     # 아이템이 50개 이상이면 랜덤으로 50개 선택, 아니면 전부 반환
-    return random.sample(items, 50) if len(items) >= 50 else items
+    return random.sample(items, SAMPLE_SIZE) if len(items) >= SAMPLE_SIZE else items
+
+
+def _cache_key(area_code, sigungu_code) -> str:
+    return f"{area_code}:{sigungu_code}:{'.'.join(TOURIST_CONTENT_TYPES)}"
+
+
+# 지역 전체 관광지 저장소 (좌표 KD-tree 포함) - 경유지를 샘플 50개가 아닌 지역 전체에서 찾도록
+_region_places = TTLCache(maxsize=REGION_PLACES_MAX, ttl=REGION_PLACES_TTL)
+
+
+def get_region_places(area_name: str, sigungu_name: str) -> Optional[CandidateStore]:
+    """
+    지역 전체 관광지 저장소 (KD-tree 를 한 번만 만들어 지역별로 캐시)
+    - 스냅샷 또는 관광지 캐시에 이미 있는 목록만 사용 (원격 호출 없음), 없으면 None
+    """
+    area_code = AREA_CODE_DICT.get(area_name)
+    sigungu_code = get_sigungu_code(area_code, sigungu_name)
+    if not sigungu_code:
+        return None
+    key = (area_code, sigungu_code)
+    places = _region_places.get(key)
+    if places is not None:
+        return places
+    items = tour_snapshot.get_region(area_code, sigungu_code)
+    if items is None:
+        entry = tour_cache.get(_cache_key(area_code, sigungu_code))
+        if entry is None:
+            return None
+        items = entry[0]
+    places = CandidateStore.from_items(items)
+    places.point_index()  # 캐시에 넣기 전에 트리 생성
+    _region_places.set(key, places)
+    return places
+
+
+def region_places_stats() -> dict:
+    return _region_places.stats()
 
 
 # 상세 관광지 정보 조회 함수 --> 필요 없을 것 같지만, 나중에 필요할 수도 있으니 남겨둠
 def get_detailed_tourist_data(content_id: str) -> dict:
-    url = "http://apis.data.go.kr/B551011/KorService2/detailCommon2"
+    url = f"{TOUR_API_BASE_URL}/detailCommon2"
     params = {
         "serviceKey": SERVICE_KEY,
         "MobileOS": "WEB",
@@ -75,7 +205,8 @@ def get_detailed_tourist_data(content_id: str) -> dict:
         "_type": "json"
     }
     try:
-        response = requests.get(url, params=params)
+        with span("tour_api", op="detailCommon2"):
+            response = tour_upstream.call(requests.get, url, params=params)
         response.raise_for_status()
         data = response.json()
         item = data["response"]["body"]["items"]["item"][0]
@@ -83,6 +214,6 @@ def get_detailed_tourist_data(content_id: str) -> dict:
             "overview": item.get("overview", "")
         }
     except Exception as e:
-        print("❌ 상세 관광지 정보 조회 오류:", e)
+        logger.warning("❌ 상세 관광지 정보 조회 오류: %s", e)
         return {}
 
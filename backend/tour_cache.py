@@ -0,0 +1,179 @@
+"""
+Tour API 지역 관광지 목록 영구 캐시 (SQLite)
+
+- (areaCode, sigunguCode, 콘텐츠 타입) 키로 정규화된 관광지 목록을 저장
+- TTL 이내: 바로 반환 (hit)
+- TTL 경과 ~ STALE_TTL 이내: 오래된 값을 바로 반환하고 백그라운드에서 갱신 (stale-while-revalidate)
+- 그 외: 원격 호출 후 저장 (miss)
+- 항목 수 / 전체 바이트 상한 초과 시 가장 오래 사용되지 않은 항목부터 삭제
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+from config import (
+    TOUR_CACHE_PATH, TOUR_CACHE_TTL, TOUR_CACHE_STALE_TTL,
+    TOUR_CACHE_MAX_ENTRIES, TOUR_CACHE_MAX_BYTES
+)
+from log import logger
+
+
+class TourCache:
+    def __init__(self, path: str = TOUR_CACHE_PATH, ttl: float = TOUR_CACHE_TTL,
+                 stale_ttl: float = TOUR_CACHE_STALE_TTL, max_entries: int = TOUR_CACHE_MAX_ENTRIES,
+                 max_bytes: int = TOUR_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.fallback_hits = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tour-cache-refresh")
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # 첫 사용 시 연결 (import 시점에 파일을 만들지 않도록)
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tour_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tour_cache_accessed ON tour_cache(accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(값, 경과 시간) 반환, 없으면 None"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, fetched_at FROM tour_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE tour_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0]), now - row[1]
+
+    def put(self, key: str, value: Any):
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO tour_cache (key, value, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at",
+                (key, data, len(data), now, now)
+            )
+            self._evict(conn)
+
+    def get_or_fetch(self, key: str, fetcher: Callable[[], Any],
+                     quick_fetcher: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        quick_fetcher: 캐시에 값이 전혀 없을 때 응답용으로 쓰는 가벼운 조회
+        (이 경우 fetcher 결과는 백그라운드에서 캐시에 저장)
+        """
+        entry = self.get(key)
+        if entry is not None:
+            value, age = entry
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                self.refresh_in_background(key, fetcher)
+                return value
+        self.misses += 1
+        try:
+            if quick_fetcher is not None:
+                value = quick_fetcher()
+                self.refresh_in_background(key, fetcher)
+                return value
+            value = fetcher()
+        except Exception as e:
+            # 원격 조회 실패 (장애/회로 차단): 보관 기한이 지난 값이라도 남아 있으면 그대로 사용
+            if entry is None:
+                raise
+            self.fallback_hits += 1
+            logger.warning("⚠️ 관광지 조회 실패, 만료된 캐시 사용 (%s): %s", key, e)
+            return entry[0]
+        self.put(key, value)
+        return value
+
+    def refresh_in_background(self, key: str, fetcher: Callable[[], Any]):
+        """같은 키의 갱신은 하나만 진행"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.put(key, fetcher())
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning("⚠️ 관광지 캐시 갱신 실패 (%s): %s", key, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(run)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total_bytes = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tour_cache"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "fallback_hits": self.fallback_hits
+        }
+
+    def _evict(self, conn: sqlite3.Connection):
+        conn.execute(
+            "DELETE FROM tour_cache WHERE fetched_at < ?", (time.time() - self.stale_ttl,)
+        )
+        conn.execute(
+            "DELETE FROM tour_cache WHERE key IN ("
+            " SELECT key FROM tour_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tour_cache").fetchone()[0]
+        if total > self.max_bytes:
+            # 최근 사용 순으로 누적 크기가 상한을 넘는 항목 삭제 (가장 최근 항목 1개는 유지)
+            rows = conn.execute("SELECT key, size FROM tour_cache ORDER BY accessed_at DESC").fetchall()
+            used = 0
+            evicted = []
+            for i, (key, size) in enumerate(rows):
+                used += size
+                if i > 0 and used > self.max_bytes:
+                    evicted.append((key,))
+            conn.executemany("DELETE FROM tour_cache WHERE key = ?", evicted)
+
+
+# 프로세스 전역 캐시
+tour_cache = TourCache()
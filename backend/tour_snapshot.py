@@ -0,0 +1,227 @@
+"""
+전국 관광지 오프라인 스냅샷 (SQLite)
+
+모든 지역/시군구의 areaBasedList2 결과를 미리 수집해 두고
+/recommend/place 에서 원격 호출 없이 후보를 뽑을 수 있게 합니다.
+
+    python tour_snapshot.py ingest            # 증분 수집 (마지막 수집 이후 수정된 항목만)
+    python tour_snapshot.py ingest --full     # 전체 재수집
+    python tour_snapshot.py ingest --area 1   # 특정 지역만
+
+증분 수집은 수정일 기준이라 원본에서 삭제된 항목을 볼 수 없습니다.
+지역 전체 건수(totalCount)가 지난 수집보다 줄었으면 그 지역만 전체 재수집하지만,
+삭제와 추가가 같이 일어나 건수가 그대로인 경우는 남으므로 --full 을 주기적으로(예: 주 1회) 실행하세요.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+import requests
+from config import TOUR_SNAPSHOT_PATH
+from upstream import tour_upstream
+
+PAGE_SIZE = 1000
+REGION_RELOAD_INTERVAL = 60.0  # 다른 프로세스의 재수집 결과를 반영하는 주기 (초)
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TourSnapshot:
+    def __init__(self, path: str = TOUR_SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._regions = None  # 수집 완료된 (area_code, sigungu_code) 집합
+        self._regions_loaded_at = 0.0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS places ("
+                " contentid TEXT PRIMARY KEY,"
+                " area_code TEXT NOT NULL,"
+                " sigungu_code TEXT NOT NULL,"
+                " content_type TEXT NOT NULL,"
+                " title TEXT,"
+                " address TEXT,"
+                " overview TEXT,"
+                " x REAL,"
+                " y REAL,"
+                " modified_time TEXT);"
+                "CREATE INDEX IF NOT EXISTS idx_places_region ON places(area_code, sigungu_code);"
+                "CREATE TABLE IF NOT EXISTS regions ("
+                " area_code TEXT NOT NULL,"
+                " sigungu_code TEXT NOT NULL,"
+                " ingested_at REAL NOT NULL,"
+                " last_modified TEXT,"
+                " total_count INTEGER,"
+                " PRIMARY KEY (area_code, sigungu_code));"
+            )
+            # total_count 열이 없는 이전 스냅샷 파일
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(regions)")}
+            if "total_count" not in columns:
+                conn.execute("ALTER TABLE regions ADD COLUMN total_count INTEGER")
+            self._conn = conn
+        return self._conn
+
+    # ---------- 조회 ----------
+    def has_region(self, area_code: str, sigungu_code: str) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        if self._regions is None or time.time() - self._regions_loaded_at > REGION_RELOAD_INTERVAL:
+            with self._lock:
+                rows = self._connect().execute("SELECT area_code, sigungu_code FROM regions").fetchall()
+            self._regions = set(rows)
+            self._regions_loaded_at = time.time()
+        return (str(area_code), str(sigungu_code)) in self._regions
+
+    def get_region(self, area_code: str, sigungu_code: str) -> Optional[List[dict]]:
+        """수집된 지역이면 후보 목록 (get_filtered_tourist_data 와 같은 형태, 좌표는 수집 때 변환한 float), 아니면 None"""
+        if not self.has_region(area_code, sigungu_code):
+            return None
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT title, address, contentid, overview, x, y FROM places "
+                "WHERE area_code = ? AND sigungu_code = ?",
+                (str(area_code), str(sigungu_code))
+            ).fetchall()
+        return [
+            {"title": t, "address": a, "contentid": c, "overview": o, "mapx": x, "mapy": y}
+            for t, a, c, o, x, y in rows
+        ]
+
+    # ---------- 수집 ----------
+    def ingest_region(self, session: requests.Session, area_code: str, sigungu_code: str,
+                      full: bool = False) -> int:
+        """
+        한 시군구 수집. 증분 모드에서는 수정일 역순(arrange=C)으로 페이지를 받다가
+        마지막 수집 시점 이전 항목이 나오면 중단합니다.
+        전체 건수가 지난 수집보다 줄었으면(원본 삭제) 전체 재수집으로 전환합니다.
+        """
+        from tour_api import AREA_BASED_LIST_URL, SERVICE_KEY, TOURIST_CONTENT_TYPES, normalize_item
+
+        area_code, sigungu_code = str(area_code), str(sigungu_code)
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT last_modified, total_count FROM regions WHERE area_code = ? AND sigungu_code = ?",
+                (area_code, sigungu_code)
+            ).fetchone()
+        watermark = None if full or row is None else row[0]
+        previous_total = None if row is None else row[1]
+
+        rows = []
+        newest = watermark
+        page = 1
+        total = 0
+        done = False
+        while not done:
+            params = {
+                "serviceKey": SERVICE_KEY,
+                "MobileOS": "WEB",
+                "MobileApp": "TourWeb",
+                "numOfRows": str(PAGE_SIZE),
+                "pageNo": str(page),
+                "areaCode": area_code,
+                "sigunguCode": sigungu_code,
+                "arrange": "C",
+                "_type": "json"
+            }
+            response = tour_upstream.call(session.get, AREA_BASED_LIST_URL, params=params)
+            response.raise_for_status()
+            body = response.json()["response"]["body"]
+            total = int(body.get("totalCount", 0))
+            if watermark and previous_total is not None and total < previous_total:
+                print(f"🗑️ 삭제된 항목 감지 ({area_code}-{sigungu_code}: {previous_total} → {total}), 전체 재수집")
+                full, watermark, newest, rows, page = True, None, None, [], 1
+                continue
+            items = body["items"].get("item", []) if isinstance(body["items"], dict) else []
+            if isinstance(items, dict):
+                items = [items]
+            for item in items:
+                modified = item.get("modifiedtime", "")
+                if watermark and modified and modified <= watermark:
+                    done = True
+                    break
+                if newest is None or modified > newest:
+                    newest = modified
+                if item.get("contenttypeid") not in TOURIST_CONTENT_TYPES:
+                    continue
+                place = normalize_item(item)
+                rows.append((
+                    place["contentid"], area_code, sigungu_code, item.get("contenttypeid"),
+                    place["title"], place["address"], place["overview"],
+                    _to_float(place["mapx"]), _to_float(place["mapy"]), modified
+                ))
+            if page * PAGE_SIZE >= total or not items:
+                done = True
+            page += 1
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                if full:
+                    conn.execute(
+                        "DELETE FROM places WHERE area_code = ? AND sigungu_code = ?", (area_code, sigungu_code)
+                    )
+                # 열 이름을 명시 (mapx/mapy 문자열 열이 남아 있는 이전 스냅샷 파일에도 그대로 기록)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO places (contentid, area_code, sigungu_code, content_type,"
+                    " title, address, overview, x, y, modified_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO regions (area_code, sigungu_code, ingested_at, last_modified, total_count)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (area_code, sigungu_code, time.time(), newest, total)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                # 실패하면 되돌림 (열린 트랜잭션이 남으면 이후 BEGIN 이 모두 실패)
+                conn.execute("ROLLBACK")
+                raise
+        self._regions = None
+        return len(rows)
+
+    def ingest(self, full: bool = False, area_codes: Optional[List[str]] = None):
+        """전체 지역(또는 지정 지역)의 모든 시군구 수집"""
+        from area_index import area_index
+
+        if not area_index.areas and not area_index.load():
+            area_index.build()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        session = requests.Session()
+        started = time.time()
+        total = 0
+        for area_code, area in area_index.areas.items():
+            if area_codes and area_code not in area_codes:
+                continue
+            for sigungu_code, sigungu_name in area["sigungu"].items():
+                try:
+                    count = self.ingest_region(session, area_code, sigungu_code, full=full)
+                    total += count
+                    print(f"📥 {area['name']} {sigungu_name}: {count}건")
+                except Exception as e:
+                    print(f"⚠️ 수집 실패 ({area['name']} {sigungu_name}): {e}")
+        print(f"✅ 스냅샷 수집 완료: {total}건, {time.time() - started:.1f}초")
+
+
+# 프로세스 전역 스냅샷
+tour_snapshot = TourSnapshot()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="전국 관광지 스냅샷 수집")
+    parser.add_argument("command", choices=["ingest"])
+    parser.add_argument("--full", action="store_true", help="증분이 아닌 전체 재수집")
+    parser.add_argument("--area", action="append", help="수집할 지역 코드 (여러 번 지정 가능)")
+    args = parser.parse_args()
+    tour_snapshot.ingest(full=args.full, area_codes=args.area)
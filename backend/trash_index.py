@@ -0,0 +1,295 @@
+"""
+쓰레기통 위치 로컬 공간 인덱스
+
+지역(광역시/도 + 시군구)별 쓰레기통 목록을 디스크(JSON)에 보관하고,
+/location/trashRAG 를 LLM 호출 없이 바로 응답합니다.
+
+수집 경로
+- LaaS 문서 컬렉션: find_similar_documents_by_text 를 limit/offset 으로 넘기며 수집
+- 공공데이터 CSV (설치장소명, 소재지도로명주소, 위도, 경도 ...)
+
+    python trash_index.py ingest 서울 구로구   # 문서 컬렉션에서 한 지역 수집
+    python trash_index.py import bins.csv      # CSV 일괄 등록
+"""
+import csv
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Set
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: 워커 간 파일 잠금 없이 저장
+    fcntl = None
+from area_index import normalize_area_name, normalize_name
+from config import TRASH_INDEX_PATH, TRASH_RAG_COLLECTION, LAAS_API_KEY, PROJECT_CODE
+from geo import PointIndex, corridor
+from singleflight import SingleFlight
+from log import logger
+
+RAG_PAGE_SIZE = 50
+RAG_MAX_PAGES = 20
+_KV_RE = re.compile(r'"?(설치장소명|위도|경도|소재지도로명주소|소재지지번주소)"?\s*[:=]\s*"?([^",\n}]+)"?')
+
+
+def region_key(area_name: str, sigungu_name: str) -> str:
+    return f"{normalize_area_name(area_name)} {normalize_name(sigungu_name)}"
+
+
+def in_region(address: str, area_name: str, sigungu_name: str) -> bool:
+    """
+    주소가 해당 지역인지 (시군구는 토큰 단위로 비교하고, 앞에 광역시/도가 있으면 그것도 같아야 함)
+    "부산광역시 중구 ..." 는 서울 중구가 아니고, 광역시/도 없이 "중구 ..." 로 시작하면 시군구만 봄
+    """
+    tokens = (address or "").split()[:3]
+    names = [normalize_name(t) for t in tokens]
+    sigungu = normalize_name(sigungu_name)
+    if sigungu not in names:
+        return False
+    before = tokens[:names.index(sigungu)]
+    return not before or normalize_area_name(area_name) in {normalize_area_name(t) for t in before}
+
+
+def _to_bin(item: dict) -> Optional[dict]:
+    """원본 항목 → {"name", "lat", "lng", "address"} (좌표가 없으면 None)"""
+    try:
+        lat = float(item.get("위도"))
+        lng = float(item.get("경도"))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return {
+        "name": item.get("설치장소명"),
+        "lat": lat,
+        "lng": lng,
+        "address": item.get("소재지도로명주소") or item.get("소재지지번주소")
+    }
+
+
+def parse_bins(content) -> List[dict]:
+    """
+    문서 내용에서 쓰레기통 항목 추출
+    JSON 배열/객체, 쉼표로 이어진 {...} 블록, "키: 값" 형태 텍스트를 모두 허용합니다.
+    """
+    if isinstance(content, dict):
+        items = [content]
+    elif isinstance(content, list):
+        items = content
+    else:
+        text = str(content or "").strip()
+        try:
+            loaded = json.loads(text)
+            items = loaded if isinstance(loaded, list) else [loaded]
+        except json.JSONDecodeError:
+            items = []
+            for block in re.findall(r"{.*?}", text, re.DOTALL) or [text]:
+                try:
+                    items.append(json.loads(block))
+                except json.JSONDecodeError:
+                    items.append({k: v.strip() for k, v in _KV_RE.findall(block)})
+    bins = []
+    for item in items:
+        if isinstance(item, dict):
+            parsed = _to_bin(item)
+            if parsed:
+                bins.append(parsed)
+    return bins
+
+
+def _documents(response_data) -> list:
+    """문서 검색 응답에서 문서 목록 추출 (응답 형태 차이 허용)"""
+    if isinstance(response_data, list):
+        return response_data
+    if isinstance(response_data, dict):
+        for key in ("data", "documents", "items", "results", "result"):
+            value = response_data.get(key)
+            if isinstance(value, list):
+                return value
+            if isinstance(value, dict):
+                return _documents(value)
+    return []
+
+
+class TrashRegion:
+    """한 지역의 쓰레기통 목록 + 좌표 배열 + KD-tree"""
+
+    def __init__(self, bins: List[dict]):
+        self.bins = bins
+        self.lats = np.array([b["lat"] for b in bins], dtype=float)
+        self.lngs = np.array([b["lng"] for b in bins], dtype=float)
+        self.index = PointIndex(self.lngs, self.lats)
+
+    def nearest(self, lng: float, lat: float, k: int = 5) -> List[dict]:
+        return [{**self.bins[i], "distance_m": round(d, 1)} for i, d in self.index.nearest(lng, lat, k)]
+
+    def within(self, lng: float, lat: float, radius_m: float) -> List[dict]:
+        return [{**self.bins[i], "distance_m": round(d, 1)} for i, d in self.index.within(lng, lat, radius_m)]
+
+    def along_route(self, path: List[List[float]], width_m: float) -> List[dict]:
+        """경로([[경도, 위도], ...]) 주변 width_m 안의 쓰레기통, 경로를 따라가는 순서대로"""
+        return [{**self.bins[i], "distance_m": round(d, 1), "along_route_m": round(a, 1)}
+                for i, d, a in corridor(self.lngs, self.lats, path, width_m)]
+
+
+class TrashIndex:
+    def __init__(self, path: str = TRASH_INDEX_PATH):
+        self.path = path
+        self._bins: Dict[str, List[dict]] = {}
+        self._regions: Dict[str, TrashRegion] = {}
+        self._dirty: Set[str] = set()  # 이 프로세스가 바꿔서 아직 저장하지 않은 지역
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("trash_ingest")
+
+    # ---------- 조회 ----------
+    def get(self, area_name: str, sigungu_name: str) -> Optional[TrashRegion]:
+        return self._regions.get(region_key(area_name, sigungu_name))
+
+    def region_count(self) -> int:
+        return len(self._regions)
+
+    # ---------- 등록 ----------
+    def set_region(self, area_name: str, sigungu_name: str, bins: List[dict], persist: bool = True):
+        key = region_key(area_name, sigungu_name)
+        # 같은 위치/이름 중복 제거
+        unique = {}
+        for b in bins:
+            unique.setdefault((b["name"], round(b["lat"], 6), round(b["lng"], 6)), b)
+        bins = list(unique.values())
+        with self._lock:
+            self._regions[key] = TrashRegion(bins)
+            if persist:
+                self._bins[key] = bins
+                self._dirty.add(key)
+        if persist:
+            self.save()
+
+    def ingest_region(self, area_name: str, sigungu_name: str) -> int:
+        """문서 컬렉션에서 한 지역 수집 (같은 지역 동시 요청은 하나로 합침)"""
+        return self._flight.do(region_key(area_name, sigungu_name), self._ingest_region, area_name, sigungu_name)
+
+    def _ingest_region(self, area_name: str, sigungu_name: str) -> int:
+        from laas_api import find_similar_documents_by_text
+
+        text = f"{area_name} {sigungu_name} 쓰레기통 위치"
+        bins = []
+        for page in range(RAG_MAX_PAGES):
+            response = find_similar_documents_by_text(
+                collection_code=TRASH_RAG_COLLECTION,
+                api_key=LAAS_API_KEY,
+                project_code=PROJECT_CODE,
+                text=text,
+                limit=RAG_PAGE_SIZE,
+                offset=page * RAG_PAGE_SIZE
+            )
+            response.raise_for_status()
+            documents = _documents(response.json())
+            found = 0
+            for doc in documents:
+                content = doc
+                if isinstance(doc, dict):
+                    content = doc.get("content") or doc.get("text") or doc.get("metadata") or doc
+                for b in parse_bins(content):
+                    # 유사도 검색이라 다른 지역 문서가 섞일 수 있으므로 주소로 한 번 더 거름
+                    if b["address"] and not in_region(b["address"], area_name, sigungu_name):
+                        continue
+                    bins.append(b)
+                    found += 1
+            # 마지막 페이지이거나 더 이상 해당 지역 결과가 없으면 중단
+            if len(documents) < RAG_PAGE_SIZE or found == 0:
+                break
+        # 비어 있는 결과는 재시작 전까지만 기억 (디스크에는 저장하지 않음)
+        self.set_region(area_name, sigungu_name, bins, persist=bool(bins))
+        logger.info("🗑️ 쓰레기통 수집: %s %s %s개", area_name, sigungu_name, len(bins))
+        return len(bins)
+
+    def import_csv(self, path: str) -> int:
+        """공공데이터 CSV 일괄 등록 (지역은 시도명/시군구명 열 또는 도로명 주소 앞부분으로 판단)"""
+        grouped: Dict[tuple, List[dict]] = {}
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                b = _to_bin(row)
+                if b is None:
+                    continue
+                tokens = (b["address"] or "").split()
+                area = row.get("시도명") or (tokens[0] if tokens else "")
+                sigungu = row.get("시군구명") or (tokens[1] if len(tokens) > 1 else "")
+                if area and sigungu:
+                    grouped.setdefault((area, sigungu), []).append(b)
+        for (area, sigungu), bins in grouped.items():
+            key = region_key(area, sigungu)
+            bins = self._bins.get(key, []) + bins
+            self.set_region(area, sigungu, bins, persist=False)
+            with self._lock:
+                self._bins[key] = self._regions[key].bins
+                self._dirty.add(key)
+        self.save()
+        return sum(len(b) for b in grouped.values())
+
+    # ---------- 저장/불러오기 ----------
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except json.JSONDecodeError:
+            logger.warning("⚠️ 쓰레기통 인덱스 파일 손상: %s", self.path)
+            return False
+        with self._lock:
+            self._bins = data
+            self._regions = {key: TrashRegion(bins) for key, bins in data.items()}
+        logger.info("🗑️ 쓰레기통 인덱스 로드: %s개 지역", len(data))
+        return True
+
+    def _read(self) -> Dict[str, List[dict]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """
+        디스크 파일을 다시 읽어 이 프로세스가 바꾼 지역만 덮어쓴 뒤 저장
+        (다른 워커가 그 사이 저장한 지역을 지우지 않도록 파일 잠금 안에서 병합)
+        """
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            data = self._read()
+            data.update({key: self._bins[key] for key in self._dirty})
+            fd, tmp_path = tempfile.mkstemp(prefix=".trash_bins-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            # 다른 워커가 수집한 지역도 받아 둠
+            for key, bins in data.items():
+                if key not in self._bins:
+                    self._bins[key] = bins
+                    self._regions[key] = TrashRegion(bins)
+            self._dirty.clear()
+
+
+# 프로세스 전역 인덱스 (서버 시작 시 load)
+trash_index = TrashIndex()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "ingest":
+        trash_index.load()
+        trash_index.ingest_region(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 3 and sys.argv[1] == "import":
+        trash_index.load()
+        print(f"✅ {trash_index.import_csv(sys.argv[2])}개 등록")
+    else:
+        print("사용법: python trash_index.py ingest <광역시/도> <시군구> | import <CSV 경로>")
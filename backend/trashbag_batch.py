@@ -0,0 +1,125 @@
+"""
+쓰봉판단 일괄 처리
+
+- 이미지마다 전처리 + dhash 계산 후 HASH_TRASHBAG 로 판단 (동시 호출 수 제한)
+- 끝나는 순서대로 결과를 돌려줌
+- 거의 같은 사진(dhash 해밍 거리 ≤ TRASHBAG_DEDUP_DISTANCE)은
+  같은 배치 안에서는 먼저 들어온 사진의 판단을, 배치 밖에서는 최근 판단 기록을 재사용
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import numpy as np
+from config import HASH_TRASHBAG, TRASHBAG_BATCH_CONCURRENCY, TRASHBAG_DEDUP_DISTANCE
+from image_preprocess import prepare_image_with_hash
+from laas_api import MultiTurnChat
+from log import logger
+
+RECENT_VERDICTS = 2000
+
+
+def hamming(a: np.ndarray, b: int) -> np.ndarray:
+    return np.bitwise_count(a ^ np.uint64(b))
+
+
+class VerdictCache:
+    """(프롬프트, dhash) → 최근 판단 결과 (프롬프트별 최근 RECENT_VERDICTS 개)"""
+
+    def __init__(self, maxlen: int = RECENT_VERDICTS, max_distance: int = TRASHBAG_DEDUP_DISTANCE):
+        self.maxlen = maxlen
+        self.max_distance = max_distance
+        self._entries: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, prompt: str, image_hash: int) -> Optional[str]:
+        with self._lock:
+            entries = list(self._entries.get(prompt, ()))
+        if entries:
+            hashes = np.fromiter((h for h, _ in entries), dtype=np.uint64, count=len(entries))
+            dist = hamming(hashes, image_hash)
+            best = int(np.argmin(dist))
+            if dist[best] <= self.max_distance:
+                self.hits += 1
+                return entries[best][1]
+        self.misses += 1
+        return None
+
+    def put(self, prompt: str, image_hash: int, verdict: str):
+        with self._lock:
+            self._entries.setdefault(prompt, deque(maxlen=self.maxlen)).append((image_hash, verdict))
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = sum(len(v) for v in self._entries.values())
+        return {"size": size, "hits": self.hits, "misses": self.misses}
+
+
+verdict_cache = VerdictCache()
+
+
+async def _evaluate(prompt: str, image_url: str) -> Optional[str]:
+    """이미지 한 장 판단 (배치 항목끼리 기록이 섞이지 않도록 매번 새 대화 사용)"""
+    chat = MultiTurnChat()
+    await chat.send_message_with_image(hash=HASH_TRASHBAG, user_message=prompt, image_url=image_url)
+    last = chat.conversation_history[-1] if chat.conversation_history else {}
+    return last.get("content") if last.get("role") == "assistant" else None
+
+
+async def evaluate_batch(prompt: str, images: List[str],
+                         concurrency: int = TRASHBAG_BATCH_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    이미지 목록 일괄 판단 → 끝나는 순서대로 {"index", "result", "success", "source"}
+    source: "model" (LaaS 호출), "duplicate" (같은 배치의 비슷한 사진), "cache" (최근 판단 재사용)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # 같은 배치 안에서 먼저 판단 중인 사진: (dhash, 인덱스, 결과 future)
+    pending: List[Tuple[int, int, asyncio.Future]] = []
+
+    async def run(index: int, image: str) -> dict:
+        try:
+            return await evaluate_one(index, image)
+        except Exception as e:
+            logger.warning("⚠️ 쓰봉판단 일괄 처리 중 예외 (%s번): %s", index, e)
+            return {"index": index, "error": str(e), "success": False}
+
+    async def evaluate_one(index: int, image: str) -> dict:
+        async with semaphore:
+            image_url, image_hash = await prepare_image_with_hash(image)
+
+        if image_hash is not None:
+            cached = verdict_cache.get(prompt, image_hash)
+            if cached is not None:
+                return {"index": index, "result": cached, "success": True, "source": "cache"}
+            # 확인과 등록 사이에 await 가 없으므로 동시에 들어온 같은 사진도 하나만 호출됨
+            for other_hash, other_index, future in pending:
+                if (other_hash ^ image_hash).bit_count() <= verdict_cache.max_distance:
+                    result = await asyncio.shield(future)
+                    return {"index": index, "result": result, "success": result is not None,
+                            "source": "duplicate", "duplicate_of": other_index}
+            future = asyncio.get_running_loop().create_future()
+            pending.append((image_hash, index, future))
+        else:
+            future = None
+
+        result = None
+        try:
+            async with semaphore:
+                result = await _evaluate(prompt, image_url)
+        finally:
+            if future is not None and not future.done():
+                future.set_result(result)
+        if result is not None and image_hash is not None:
+            verdict_cache.put(prompt, image_hash, result)
+        return {"index": index, "result": result, "success": result is not None, "source": "model"}
+
+    tasks = [asyncio.ensure_future(run(i, image)) for i, image in enumerate(images)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # 클라이언트가 중간에 끊으면 남은 호출 취소
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,278 @@
+"""
+외부 API 호출 정책 (타임아웃 · 재시도 · 회로 차단 · 헤지 요청)
+
+서비스(laas, laas_document, tour, tmap)마다 Upstream 인스턴스를 하나 두고 원격 호출을 감쌉니다.
+
+    response = tour_upstream.call(_session.get, url, params=params)          # 동기 (requests)
+    response = await laas_upstream.acall(client.post, url, json=data)         # 코루틴 (httpx)
+
+- 시도마다 timeout 인자를 넘겨 호출 (전체 기한에서 남은 시간보다 길지 않게)
+- 연결 오류 / 타임아웃 / 429·5xx 만 지수 백오프 + 지터로 재시도하고, 기한을 넘기면 중단
+- 연속 실패가 쌓이면 회로를 열어 cooldown 동안 호출 없이 바로 CircuitOpenError
+  (호출부는 캐시나 대체 응답을 사용), cooldown 이 지나면 시험 호출 하나만 보내 성공 시 다시 닫음
+- hedge=True 인 코루틴 호출은 최근 성공 지연의 p95 만큼 기다려도 응답이 없으면
+  같은 요청을 한 번 더 보내 먼저 끝난 응답을 사용 (나머지는 취소)
+재시도까지 실패하면 UpstreamError, 4xx 처럼 재시도하지 않는 응답은 그대로 반환합니다.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+import numpy as np
+import requests
+from config import (
+    LAAS_TIMEOUT, LAAS_DEADLINE, LAAS_DOCUMENT_TIMEOUT, LAAS_DOCUMENT_DEADLINE,
+    TOUR_TIMEOUT, TOUR_DEADLINE, TMAP_TIMEOUT, TMAP_DEADLINE,
+    UPSTREAM_RETRIES, UPSTREAM_BACKOFF, UPSTREAM_BACKOFF_MAX,
+    BREAKER_FAILURES, BREAKER_COOLDOWN, HEDGE_MIN_DELAY
+)
+from metrics import count_error, upstream_events
+from log import logger
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError, asyncio.TimeoutError)
+HEDGE_MIN_SAMPLES = 20  # p95 를 믿을 만한 최소 표본 수 (그 전에는 헤지하지 않음)
+
+# 이름별 인스턴스 (/stats 에서 한 번에 조회)
+_registry: Dict[str, "Upstream"] = {}
+
+
+class UpstreamError(Exception):
+    """재시도까지 실패한 호출 (response: 마지막 응답, 응답 없이 실패했으면 None)"""
+
+    def __init__(self, message: str, response: Any = None):
+        super().__init__(message)
+        self.response = response
+
+
+class CircuitOpenError(UpstreamError):
+    """회로가 열려 있어 호출하지 않음"""
+
+
+class CircuitBreaker:
+    """연속 실패 수 기반 회로 차단기 (closed → open → half_open → closed)"""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive = 0
+        self.opens = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_started = None
+            # 시험 호출은 하나만 (결과가 기록되지 않은 채 cooldown 이 지나면 다시 허용)
+            if self.state == "half_open" and (self._probe_started is None or now - self._probe_started >= self.cooldown):
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success: bool) -> bool:
+        """결과 기록 → 이번 실패로 회로가 열렸으면 True"""
+        with self._lock:
+            if success:
+                self.state = "closed"
+                self.consecutive = 0
+                return False
+            self.consecutive += 1
+            if self.state == "half_open" or (self.state == "closed" and self.consecutive >= self.failures):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self.opens += 1
+                return True
+            return False
+
+
+class Upstream:
+    def __init__(self, name: str, timeout: float, deadline: float, retries: int = UPSTREAM_RETRIES,
+                 backoff: float = UPSTREAM_BACKOFF, backoff_max: float = UPSTREAM_BACKOFF_MAX,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=256)  # 최근 성공한 시도의 지연 (초)
+        _registry[name] = self
+
+    # ---------- 회로 / 기록 ----------
+    def admit(self):
+        """회로가 열려 있으면 CircuitOpenError (스트리밍처럼 직접 호출하는 경우에도 사용)"""
+        if not self.breaker.allow():
+            upstream_events.inc(service=self.name, event="rejected")
+            raise CircuitOpenError(f"{self.name} 회로 차단 중")
+
+    def record_success(self, latency: Optional[float] = None):
+        """latency: 전체 응답 시간 (헤지 기준 p95 에 반영, 스트리밍처럼 응답 시작만 본 경우는 생략)"""
+        if latency is not None:
+            self._latencies.append(latency)
+        self.breaker.record(True)
+
+    def record_failure(self, error: str):
+        self.failed += 1
+        count_error(self.name, error)
+        if self.breaker.record(False):
+            upstream_events.inc(service=self.name, event="circuit_open")
+            logger.warning("⚠️ %s 회로 차단: 연속 %s회 실패, %s초 동안 호출 중단",
+                           self.name, self.breaker.consecutive, self.breaker.cooldown)
+
+    def hedge_delay(self) -> Optional[float]:
+        """최근 성공 지연의 p95 (표본이 부족하면 None → 헤지 안 함)"""
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, float(np.percentile(np.fromiter(self._latencies, dtype=float), 95)))
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def _retry_wait(self, attempt: int, deadline: float) -> Optional[float]:
+        """다음 시도 전 대기 시간, 더 시도하지 않으면 None"""
+        if attempt >= self.retries:
+            return None
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            return None
+        self.retried += 1
+        upstream_events.inc(service=self.name, event="retry")
+        return delay
+
+    def _outcome(self, response: Any, started: float) -> bool:
+        """응답 기록 → 재시도가 필요한 응답이면 False"""
+        if response.status_code in RETRY_STATUSES:
+            self.record_failure(str(response.status_code))
+            return False
+        self.record_success(time.perf_counter() - started)
+        return True
+
+    # ---------- 동기 호출 ----------
+    def call(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        response, error = None, None
+        for attempt in range(self.retries + 1):
+            self.admit()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            started = time.perf_counter()
+            try:
+                response, error = fn(*args, timeout=min(timeout or self.timeout, remaining), **kwargs), None
+                if self._outcome(response, started):
+                    return response
+            except RETRY_ERRORS as e:
+                response, error = None, e
+                self.record_failure(type(e).__name__)
+            delay = self._retry_wait(attempt, deadline)
+            if delay is None:
+                break
+            time.sleep(delay)
+        raise self._exhausted(response, error)
+
+    # ---------- 코루틴 호출 ----------
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, timeout: Optional[float] = None,
+                    hedge: bool = False, **kwargs) -> Any:
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        response, error = None, None
+        for attempt in range(self.retries + 1):
+            self.admit()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            started = time.perf_counter()
+            try:
+                response, error = await self._attempt(fn, args, kwargs, min(timeout or self.timeout, remaining), hedge), None
+                if self._outcome(response, started):
+                    return response
+            except RETRY_ERRORS as e:
+                response, error = None, e
+                self.record_failure(type(e).__name__)
+            delay = self._retry_wait(attempt, deadline)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        raise self._exhausted(response, error)
+
+    async def _attempt(self, fn, args, kwargs, timeout: float, hedge: bool) -> Any:
+        def start(limit: float) -> asyncio.Task:
+            return asyncio.ensure_future(asyncio.wait_for(fn(*args, timeout=limit, **kwargs), limit))
+
+        delay = self.hedge_delay() if hedge else None
+        if delay is None or delay >= timeout:
+            return await start(timeout)
+
+        first = start(timeout)
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        # p95 를 넘겨도 응답이 없으면 같은 요청을 하나 더 보내 먼저 성공한 쪽 사용
+        self.hedges += 1
+        upstream_events.inc(service=self.name, event="hedge")
+        second = start(timeout - delay)
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRY_STATUSES:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+            return task.result()  # 둘 다 실패: 나중에 끝난 쪽의 응답/예외
+        finally:
+            for task in (first, second):
+                if not task.done():
+                    task.cancel()
+
+    def _exhausted(self, response: Any, error: Optional[BaseException]) -> UpstreamError:
+        if response is not None:
+            return UpstreamError(f"{self.name} 응답 오류 {response.status_code}", response)
+        if error is not None:
+            return UpstreamError(f"{self.name} 호출 실패: {type(error).__name__} {error}")
+        return UpstreamError(f"{self.name} 호출 기한 초과 ({self.deadline}초)")
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "retries": self.retried,
+            "failures": self.failed,
+            "rejected": self.breaker.rejected,
+            "circuit_opens": self.breaker.opens,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(delay * 1000) if delay is not None else None
+        }
+
+
+def upstream_stats() -> dict:
+    return {name: upstream.stats() for name, upstream in _registry.items()}
+
+
+# 서비스별 정책 (프로세스 전역)
+laas_upstream = Upstream("laas", LAAS_TIMEOUT, LAAS_DEADLINE)
+laas_document_upstream = Upstream("laas_document", LAAS_DOCUMENT_TIMEOUT, LAAS_DOCUMENT_DEADLINE)
+tour_upstream = Upstream("tour", TOUR_TIMEOUT, TOUR_DEADLINE)
+tmap_upstream = Upstream("tmap", TMAP_TIMEOUT, TMAP_DEADLINE)
@@ -1,6 +1,36 @@
+// 백엔드 대화 세션: 응답의 X-Session-Id 를 받아 두었다가 이후 모든 요청에 다시 보냄
+// (보내지 않으면 요청마다 새 세션이 되어 장소 추천 → 시작 장소 선택 흐름이 이어지지 않음)
+const SESSION_HEADER = 'X-Session-Id'
+const SESSION_STORAGE_KEY = 'plogging-session-id'
+let currentSessionId: string | null = null
+
+export const getSessionId = (): string | null => {
+  if (currentSessionId === null && typeof window !== 'undefined') {
+    currentSessionId = window.sessionStorage.getItem(SESSION_STORAGE_KEY)
+  }
+  return currentSessionId
+}
+
+const apiFetch = async (url: string, init: RequestInit = {}) => {
+  const headers = new Headers(init.headers)
+  const sessionId = getSessionId()
+  if (sessionId) {
+    headers.set(SESSION_HEADER, sessionId)
+  }
+  const response = await fetch(url, { ...init, headers })
+  const issued = response.headers.get(SESSION_HEADER)
+  if (issued && issued !== sessionId) {
+    currentSessionId = issued
+    if (typeof window !== 'undefined') {
+      window.sessionStorage.setItem(SESSION_STORAGE_KEY, issued)
+    }
+  }
+  return response
+}
+
 // API 호출 함수들
 export const extractLocationAPI = async (message: string) => {
-  const response = await fetch('http://localhost:8000/location/extract', {
+  const response = await apiFetch('http://localhost:8000/location/extract', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ 
@@ -23,7 +53,7 @@ export const extractLocationAPI = async (message: string) => {
 }
 
 export const recommendPlaceAPI = async (message: string, area_name:string = "", sigungu_name:string = "") => {
-  const response = await fetch('http://localhost:8000/recommend/place', {
+  const response = await apiFetch('http://localhost:8000/recommend/place', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ 
@@ -48,7 +78,7 @@ export const recommendPlaceAPI = async (message: string, area_name:string = "",
 }
 
 export const recommendRouteAPI = async (message: string) => {
-  const response = await fetch('http://localhost:8000/recommend/route', {
+  const response = await apiFetch('http://localhost:8000/recommend/route', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ 
@@ -72,7 +102,7 @@ export const recommendRouteAPI = async (message: string) => {
 
 // 이미지 대화 API 함수
 export const imageChatAPI = async (message: string, imageUrl: string) => {
-  const response = await fetch('http://localhost:8000/chat/image', {
+  const response = await apiFetch('http://localhost:8000/chat/image', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ 
@@ -127,7 +157,7 @@ export const validateImageUrl = (url: string): boolean => {
 }
 
 export const getChatHistory = async (sessionId: string) => {
-  const response = await fetch(`http://localhost:8000/chat/history/${sessionId}`, {
+  const response = await apiFetch(`http://localhost:8000/chat/history/${sessionId}`, {
     method: 'GET',
     headers: { 'Content-Type': 'application/json' }
   })
@@ -147,7 +177,7 @@ export const getChatHistory = async (sessionId: string) => {
 }
 
 export const clearSession = async (sessionId: string) => {
-  const response = await fetch(`http://localhost:8000/chat/clear/${sessionId}`, {
+  const response = await apiFetch(`http://localhost:8000/chat/clear/${sessionId}`, {
     method: 'DELETE',
     headers: { 'Content-Type': 'application/json' }
   })
@@ -168,7 +198,7 @@ export const clearSession = async (sessionId: string) => {
 
 // 쓰레기 봉투 평가 API 함수
 export const evaluateTrashbagAPI = async (prompt: string, imageBase64: string) => {
-  const response = await fetch('http://localhost:8000/evaluate/trashbag', {
+  const response = await apiFetch('http://localhost:8000/evaluate/trashbag', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ prompt, image_base64: imageBase64 })
@@ -189,7 +219,7 @@ export const evaluateTrashbagAPI = async (prompt: string, imageBase64: string) =
 }
 // 쓰레기통 위치 RAG API 함수
 export const getTrashRAGAPI = async (area_name: string, sigungu_name: string) => {
-  const response = await fetch('http://localhost:8000/location/trashRAG', {
+  const response = await apiFetch('http://localhost:8000/location/trashRAG', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({